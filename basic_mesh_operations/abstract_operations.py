@@ -1,4 +1,12 @@
 # coding: utf-8
+from collections import deque
+from timeit import default_timer
+
+import common_path  # makes shared modules importable
+from adjacency import build_vertex_adjacency, build_face_adjacency, expand_rings, build_edges
+from flips import FlipReport
+from spatial_index import SpatialGrid
+from topology import topology_report
 
 __author__ = "Michał Ciołczyk"
 
@@ -20,6 +28,9 @@ class AbstractMeshOperations(object):
         :param filename: file to read mesh from
         """
         self.filename = filename
+        self._vertex_adjacency = None
+        self._face_adjacency = None
+        self._spatial_index = None
 
     def find_vertex_neighbors(self, vertex_id):
         """
@@ -30,6 +41,89 @@ class AbstractMeshOperations(object):
         """
         raise NotImplementedError()
 
+    def find_vertices_rings(self, vertices_ids, k):
+        """
+        Returns k-ring neighbourhoods of many vertices at once.
+        :param vertices_ids: vertices ids to get neighbourhoods of
+        :param k: amount of rings
+        :return offsets, vertices ids: neighbours of vertices_ids[i] (without the vertex itself)
+         are ids[offsets[i]:offsets[i + 1]]
+        :rtype np.ndarray, np.ndarray
+        """
+        if self._vertex_adjacency is None:
+            corner_vertices, corner_faces, vertices_amount, faces_amount = self._corners()
+            self._vertex_adjacency = build_vertex_adjacency(corner_vertices, corner_faces, vertices_amount + 1)
+        return expand_rings(self._vertex_adjacency[0], self._vertex_adjacency[1], vertices_ids, k)
+
+    def find_faces_rings(self, faces_ids, k):
+        """
+        Returns k-ring neighbourhoods (faces sharing an edge) of many faces at once.
+        :param faces_ids: faces ids to get neighbourhoods of
+        :param k: amount of rings
+        :return offsets, faces ids: neighbours of faces_ids[i] (without the face itself)
+         are ids[offsets[i]:offsets[i + 1]]
+        :rtype np.ndarray, np.ndarray
+        """
+        if self._face_adjacency is None:
+            corner_vertices, corner_faces, vertices_amount, faces_amount = self._corners()
+            self._face_adjacency = build_face_adjacency(corner_vertices, corner_faces, faces_amount + 1)
+        return expand_rings(self._face_adjacency[0], self._face_adjacency[1], faces_ids, k)
+
+    def _corners(self):
+        """
+        Returns all faces' corners (used to build adjacency for k-ring queries).
+        :return corners' vertices ids, corners' faces ids (sorted), amount of vertices, amount of faces
+        :rtype np.ndarray, np.ndarray, int, int
+        """
+        raise NotImplementedError()
+
+    def _coordinates(self):
+        """
+        Returns all vertices' coordinates (used to build spatial index).
+        :return coordinates of shape (N, 3), row i holds coordinates of vertex i + 1
+        :rtype np.ndarray
+        """
+        raise NotImplementedError()
+
+    def spatial_index(self):
+        """
+        Returns spatial index over vertices (built when first needed; flips do not move vertices,
+        so it stays valid). Note that it returns indices starting from 0.
+        :return uniform hash grid over vertices' coordinates
+        :rtype SpatialGrid
+        """
+        if self._spatial_index is None:
+            self._spatial_index = SpatialGrid(self._coordinates())
+        return self._spatial_index
+
+    def find_nearest_vertices(self, points):
+        """
+        Returns the nearest vertex of many points at once.
+        :param points: points of shape (Q, 3)
+        :return vertices ids (0 if mesh has no vertices), distances to them
+        :rtype np.ndarray, np.ndarray
+        """
+        indices, distances = self.spatial_index().nearest(points)
+        return indices + 1, distances
+
+    def find_vertices_within(self, points, radius):
+        """
+        Returns vertices in distance at most radius from many points at once.
+        :param points: points of shape (Q, 3)
+        :param radius: radius of queries
+        :return offsets, vertices ids: vertices near points[i] are ids[offsets[i]:offsets[i + 1]] (sorted)
+        :rtype np.ndarray, np.ndarray
+        """
+        offsets, indices = self.spatial_index().within(points, radius)
+        return offsets, indices + 1
+
+    def _invalidate_adjacency(self):
+        """
+        Has to be called after every change of mesh connectivity.
+        """
+        self._vertex_adjacency = None
+        self._face_adjacency = None
+
     def find_vertex_faces(self, vertex_id):
         """
         Returns faces which vertex vertex_id belongs to.
@@ -58,6 +152,96 @@ class AbstractMeshOperations(object):
         """
         raise NotImplementedError()
 
+    def flip_edges(self, edges, predicate, max_flips=None):
+        """
+        Flips edges from work queue, as long as predicate accepts them (e.g. Delaunay or valence optimization,
+        see flips module).
+
+        Edge (a, b) shared by faces (a, b, c) and (b, a, d) is replaced with edge (c, d), keeping faces' orientation;
+        border edges and edges which would duplicate an existing edge are skipped. After every flip, the four edges
+        around it are queued again, since predicate may accept them now. Adjacency is updated incrementally,
+        so every flip takes O(degree) time (finding faces of an edge scans faces or half-edges around its vertices).
+        :param edges: edges (pairs of vertices ids) to start with, all edges of the mesh if None
+        :param predicate: called with vertices ids a, b, c, d; edge is flipped if it returns True
+        :param max_flips: limit of flips (unlimited if None)
+        :return report of the run (amount of tested edges and flips, flips per second)
+        :rtype FlipReport
+        """
+        start = default_timer()
+        if edges is None:
+            edges = build_edges(*self._corners()[:2])[0].tolist()
+        queue = deque()
+        queued = set()
+        for a, b in edges:
+            key = (min(a, b), max(a, b))
+            if key not in queued:
+                queued.add(key)
+                queue.append(key)
+        tested = 0
+        flips = 0
+        while queue and (max_flips is None or flips < max_flips):
+            a, b = queue.popleft()
+            queued.discard((a, b))
+            quad = self._edge_quad(a, b)
+            if quad is None:
+                continue
+            a, b, c, d, edge = quad
+            tested += 1
+            if c == d or self._has_edge(c, d) or not predicate(a, b, c, d):
+                continue
+            self._flip_quad(a, b, c, d, edge)
+            flips += 1
+            for u, v in [(a, c), (c, b), (b, d), (d, a)]:
+                key = (min(u, v), max(u, v))
+                if key not in queued:
+                    queued.add(key)
+                    queue.append(key)
+        self._invalidate_adjacency()
+        return FlipReport(tested, flips, default_timer() - start)
+
+    def _edge_quad(self, a, b):
+        """
+        Finds faces of edge (a, b) for flip_edges.
+        :return None if the edge does not exist or is not shared by two consistently oriented faces;
+         otherwise a, b, c, d (faces are (a, b, c) and (b, a, d), a and b in the given order)
+         and backend's handle of the edge
+        :rtype tuple
+        """
+        raise NotImplementedError()
+
+    def _has_edge(self, a, b):
+        """
+        Checks if vertices a and b are connected by an edge.
+        :rtype bool
+        """
+        raise NotImplementedError()
+
+    def _flip_quad(self, a, b, c, d, edge):
+        """
+        Replaces faces (a, b, c) and (b, a, d) with (c, a, d) and (d, b, c), updating adjacency incrementally
+        (k-ring adjacency is invalidated by flip_edges).
+        :param edge: backend's handle of the edge returned by _edge_quad
+        """
+        raise NotImplementedError()
+
+    def vertex_degree(self, vertex_id):
+        """
+        Returns amount of vertices connected with vertex vertex_id by an edge.
+        :param vertex_id: vertex id to get degree of
+        :rtype int
+        """
+        raise NotImplementedError()
+
+    def find_topology(self):
+        """
+        Returns topology report of the mesh: boundary edges and loops, non-manifold edges and vertices,
+        amount of connected components, Euler characteristic and genus (see topology.TopologyReport).
+        :return topology report (vertices ids start from 1, like everywhere)
+        :rtype TopologyReport
+        """
+        corner_vertices, corner_faces, vertices_amount, faces_amount = self._corners()
+        return topology_report(corner_vertices, corner_faces, vertices_amount + 1, first_vertex_id=1)
+
     def has_border(self):
         """
         Checks if mesh has border.
@@ -66,6 +250,14 @@ class AbstractMeshOperations(object):
         """
         raise NotImplementedError()
 
+    def find_border_edges(self):
+        """
+        Returns edges lying on the border of the mesh (oriented like in their faces).
+        :return list of border edges (edge is a list of two vertices ids)
+        :rtype list
+        """
+        raise NotImplementedError()
+
     def get_vertex(self, vertex_id):
         """
         Returns vertex which index is vertex_id. Indices starts from 1.
@@ -83,3 +275,19 @@ class AbstractMeshOperations(object):
         :rtype list
         """
         raise NotImplementedError()
+
+    def vertices_amount(self):
+        """
+        Returns amount of vertices (their ids are 1..amount).
+        :return amount of vertices
+        :rtype int
+        """
+        raise NotImplementedError()
+
+    def faces_amount(self):
+        """
+        Returns amount of faces (their ids are 1..amount).
+        :return amount of faces
+        :rtype int
+        """
+        raise NotImplementedError()
@@ -0,0 +1,176 @@
+# coding: utf-8
+import itertools
+
+import numpy as np
+
+__author__ = "Michał Ciołczyk"
+
+
+def flatten_faces(faces):
+    """
+    Flattens faces list (with None at index 0, like in VerticesFacesOperations) to corners arrays.
+    :param faces: list of faces (face is a list of vertices ids)
+    :return corners' vertices ids, corners' faces ids (both flat arrays)
+    :rtype np.ndarray, np.ndarray
+    """
+    lengths = np.fromiter((len(face) for face in faces[1:]), dtype=np.int64, count=len(faces) - 1)
+    corner_vertices = np.fromiter(itertools.chain.from_iterable(faces[1:]), dtype=np.int64, count=lengths.sum())
+    corner_faces = np.repeat(np.arange(1, len(faces), dtype=np.int64), lengths)
+    return corner_vertices, corner_faces
+
+
+def build_incidence(corner_vertices, corner_faces, vertices_amount):
+    """
+    Builds vertex to faces incidence index in CSR form:
+    faces of vertex v are face_ids[offsets[v]:offsets[v + 1]].
+    :param corner_vertices: corners' vertices ids
+    :param corner_faces: corners' faces ids
+    :param vertices_amount: amount of vertices ids (max vertex id + 1)
+    :return offsets, face_ids
+    :rtype np.ndarray, np.ndarray
+    """
+    order = np.argsort(corner_vertices, kind='stable')
+    offsets = np.zeros(vertices_amount + 1, dtype=np.int64)
+    np.cumsum(np.bincount(corner_vertices, minlength=vertices_amount), out=offsets[1:])
+    return offsets, corner_faces[order]
+
+
+def next_corners(corner_faces):
+    """
+    Returns the next corner (in face's orientation) of every corner.
+    :param corner_faces: corners' faces ids (sorted, like returned by flatten_faces)
+    :return next corners' indices
+    :rtype np.ndarray
+    """
+    corners = np.arange(len(corner_faces))
+    is_last = np.ones(len(corner_faces), dtype=bool)
+    is_last[:-1] = corner_faces[1:] != corner_faces[:-1]
+    is_first = np.ones(len(corner_faces), dtype=bool)
+    is_first[1:] = is_last[:-1]
+    # first corner of every corner's face (running maximum of faces' first corners)
+    first_corners = np.maximum.accumulate(np.where(is_first, corners, 0))
+    return np.where(is_last, first_corners, corners + 1)
+
+
+def build_edges(corner_vertices, corner_faces, following=None):
+    """
+    Builds undirected edges table (with a single sort of all faces' edges).
+
+    Every edge is stored once, oriented like in the first face it was found in;
+    faces of edge e are edge_faces[edge_offsets[e]:edge_offsets[e + 1]].
+    :param corner_vertices: corners' vertices ids
+    :param corner_faces: corners' faces ids (sorted, like returned by flatten_faces)
+    :param following: next corners (see next_corners), computed if not given
+    :return edges (array of shape (E, 2)), edge id of every corner's outgoing edge, edge_offsets, edge_faces
+    :rtype np.ndarray, np.ndarray, np.ndarray, np.ndarray
+    """
+    if following is None:
+        following = next_corners(corner_faces)
+    starts = corner_vertices
+    ends = corner_vertices[following]
+    keys = np.minimum(starts, ends) * (corner_vertices.max() + 1) + np.maximum(starts, ends)
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    is_first = np.ones(len(keys), dtype=bool)
+    is_first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    corner_edges = np.empty(len(keys), dtype=np.int64)
+    corner_edges[order] = np.cumsum(is_first) - 1
+    first_corners = order[is_first]
+    edges = np.stack([starts[first_corners], ends[first_corners]], axis=1)
+    edge_offsets = np.append(np.nonzero(is_first)[0], len(keys))
+    return edges, corner_edges, edge_offsets, corner_faces[order]
+
+
+def _unique(values):
+    """
+    Returns sorted unique values (sort based, which is faster than np.unique for big int arrays).
+    """
+    values = np.sort(values)
+    is_first = np.ones(len(values), dtype=bool)
+    is_first[1:] = values[1:] != values[:-1]
+    return values[is_first]
+
+
+def _csr_from_pairs(sources, targets, nodes_amount):
+    """
+    Builds adjacency in CSR form from (source, target) pairs, dropping repeated pairs.
+    :return offsets, adjacent nodes (sorted for every node)
+    :rtype np.ndarray, np.ndarray
+    """
+    keys = _unique(sources * nodes_amount + targets)
+    offsets = np.zeros(nodes_amount + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // nodes_amount, minlength=nodes_amount), out=offsets[1:])
+    return offsets, keys % nodes_amount
+
+
+def build_vertex_adjacency(corner_vertices, corner_faces, vertices_amount):
+    """
+    Builds vertex to vertices (sharing an edge) adjacency in CSR form.
+    :param corner_vertices: corners' vertices ids
+    :param corner_faces: corners' faces ids (sorted, like returned by flatten_faces)
+    :param vertices_amount: amount of vertices ids (max vertex id + 1)
+    :return offsets, adjacent vertices ids
+    :rtype np.ndarray, np.ndarray
+    """
+    edges = build_edges(corner_vertices, corner_faces)[0]
+    sources = np.concatenate([edges[:, 0], edges[:, 1]])
+    targets = np.concatenate([edges[:, 1], edges[:, 0]])
+    return _csr_from_pairs(sources, targets, vertices_amount)
+
+
+def build_face_adjacency(corner_vertices, corner_faces, faces_amount):
+    """
+    Builds face to faces (sharing an edge) adjacency in CSR form.
+    :param corner_vertices: corners' vertices ids
+    :param corner_faces: corners' faces ids (sorted, like returned by flatten_faces)
+    :param faces_amount: amount of faces ids (max face id + 1)
+    :return offsets, adjacent faces ids
+    :rtype np.ndarray, np.ndarray
+    """
+    edge_offsets, edge_faces = build_edges(corner_vertices, corner_faces)[2:]
+    counts = np.diff(edge_offsets)
+    # every face of an edge is paired with every face of the same edge
+    positions = np.arange(len(edge_faces))
+    repeats = np.repeat(counts, counts)
+    sources = np.repeat(positions, repeats)
+    block_starts = np.repeat(np.cumsum(repeats) - repeats, repeats)
+    targets = np.repeat(edge_offsets[:-1], counts * counts) + np.arange(len(sources)) - block_starts
+    sources = edge_faces[sources]
+    targets = edge_faces[targets]
+    different = sources != targets
+    return _csr_from_pairs(sources[different], targets[different], faces_amount)
+
+
+def expand_rings(offsets, adjacent, seeds, k):
+    """
+    Finds k-ring neighbourhoods of all seeds at once by frontier expansion.
+
+    Neighbours of seeds[i] (without the seed itself, sorted) are ids[rings_offsets[i]:rings_offsets[i + 1]].
+    :param offsets: adjacency offsets (CSR)
+    :param adjacent: adjacent nodes (CSR)
+    :param seeds: seeds' ids
+    :param k: ring depth
+    :return rings_offsets, ids
+    :rtype np.ndarray, np.ndarray
+    """
+    seeds = np.asarray(seeds, dtype=np.int64)
+    nodes_amount = len(offsets) - 1
+    seed_keys = np.arange(len(seeds)) * nodes_amount + seeds
+    visited = _unique(seed_keys)
+    owners = np.arange(len(seeds))
+    frontier = seeds
+    for ring in range(k):
+        degrees = offsets[frontier + 1] - offsets[frontier]
+        first_neighbours = np.repeat(offsets[frontier] - (np.cumsum(degrees) - degrees), degrees)
+        neighbours = adjacent[first_neighbours + np.arange(degrees.sum())]
+        keys = _unique(np.repeat(owners, degrees) * nodes_amount + neighbours)
+        keys = keys[~np.isin(keys, visited, assume_unique=True)]
+        if len(keys) == 0:
+            break
+        visited = np.sort(np.concatenate([visited, keys]))
+        owners = keys // nodes_amount
+        frontier = keys % nodes_amount
+    visited = visited[~np.isin(visited, seed_keys)]
+    rings_offsets = np.zeros(len(seeds) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(visited // nodes_amount, minlength=len(seeds)), out=rings_offsets[1:])
+    return rings_offsets, visited % nodes_amount
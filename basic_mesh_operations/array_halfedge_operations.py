@@ -0,0 +1,324 @@
+# coding: utf-8
+
+from __future__ import print_function
+
+import numpy as np
+
+import common_path  # makes shared modules importable
+from abstract_operations import AbstractMeshOperations
+from mesh_cache import MeshCache
+
+__author__ = "Michał Ciołczyk"
+
+
+class ArrayHalfedgeMeshOperations(AbstractMeshOperations):
+    """
+    Provides basic operations using half-edge stored in integer arrays as underlying data structure
+    (does not need CGAL).
+
+    Half-edges of face f are created as 3f, 3f + 1, 3f + 2 (their faces change after flips). Arrays:
+
+    * he_next - next half-edge in face
+
+    * he_twin - opposite half-edge (-1 on border)
+
+    * he_vertex - target vertex
+
+    * he_face - face
+
+    * vertex_halfedge - outgoing half-edge (for border vertices the first one counterclockwise)
+
+    * face_halfedge - half-edge of face
+
+    * vertex_corners - amount of outgoing half-edges (faces) of vertex, bounds circulations around it
+
+    Internally vertices and faces are indexed from 0. Only consistently oriented manifold meshes can be stored
+    (every edge has at most two faces and faces around every vertex form a single fan), ValueError is raised
+    for other ones.
+    """
+
+    def __init__(self, filename):
+        super(ArrayHalfedgeMeshOperations, self).__init__(filename)
+        if not self.filename.endswith('.obj') and not self.filename.endswith('.off'):
+            raise AttributeError("Unknown file format")
+        cache = MeshCache(self.filename)
+        vertices, faces = cache.arrays()
+        self.vertices = np.asarray(vertices)  # plain ndarray view, indexing memmap subclass is much slower
+        halfedges = cache.derived('manifold_halfedges', lambda: self._build_halfedges(faces))
+        for name, array in halfedges.items():
+            setattr(self, name, np.array(array))  # flips modify half-edges, cached arrays are read-only
+
+    def _build_halfedges(self, faces):
+        """
+        Returns half-edges arrays (see class description) built from faces array.
+
+        Raises ValueError if the mesh is not manifold or not consistently oriented.
+        """
+        faces_amount = len(faces)
+        vertices_amount = len(self.vertices)
+        halfedges = np.arange(3 * faces_amount)
+        he_vertex = np.roll(faces, -1, axis=1).ravel()
+        he_next = 3 * (halfedges // 3) + (halfedges + 1) % 3
+
+        origins = faces.ravel()
+        keys = origins * vertices_amount + he_vertex
+        twin_keys = he_vertex * vertices_amount + origins
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+        repeated = np.flatnonzero(sorted_keys[1:] == sorted_keys[:-1])
+        if len(repeated):  # edge of more than two faces or of two faces with opposite orientations
+            he = order[repeated[0]]
+            raise ValueError("Mesh is not manifold or not consistently oriented (edge %d-%d)!"
+                             % (origins[he] + 1, he_vertex[he] + 1))
+        positions = np.minimum(np.searchsorted(sorted_keys, twin_keys), len(keys) - 1)
+        he_twin = np.where(sorted_keys[positions] == twin_keys, order[positions], -1)
+
+        vertex_halfedge = -np.ones(vertices_amount, dtype=np.int64)
+        vertex_halfedge[origins] = halfedges
+        border_starts = halfedges[he_twin[he_next[he_next]] == -1]
+        vertex_halfedge[origins[border_starts]] = border_starts
+        vertex_corners = np.bincount(origins, minlength=vertices_amount)
+        fans = np.bincount(origins[self._fan_labels(he_next, he_twin, vertex_corners) == halfedges],
+                           minlength=vertices_amount)
+        if np.any(fans > 1):
+            raise ValueError("Mesh is not manifold (faces around vertex %d form %d fans)!"
+                             % (np.argmax(fans > 1) + 1, fans.max()))
+        return {
+            'he_next': he_next,
+            'he_twin': he_twin,
+            'he_vertex': he_vertex,
+            'he_face': halfedges // 3,
+            'vertex_halfedge': vertex_halfedge,
+            'face_halfedge': 3 * np.arange(faces_amount) + 2,
+            'vertex_corners': vertex_corners
+        }
+
+    @staticmethod
+    def _fan_labels(he_next, he_twin, vertex_corners):
+        """
+        Labels every half-edge with the smallest half-edge of its fan (outgoing half-edges of the same vertex
+        reachable by circulating around it in either direction).
+
+        Labels are spread with pointer jumping, every step doubles the reach of circulations.
+        """
+        halfedges = np.arange(len(he_next))
+        labels = halfedges
+        if len(halfedges) == 0:
+            return labels
+        he_prev = he_next[he_next]
+        # ends of open fans circulate to themselves
+        succ = np.where(he_twin == -1, halfedges, he_next[he_twin])
+        pred = np.where(he_twin[he_prev] == -1, halfedges, he_twin[he_prev])
+        reach = 1
+        while True:
+            labels = np.minimum(labels, np.minimum(labels[succ], labels[pred]))
+            if reach >= vertex_corners.max():
+                return labels
+            succ, pred = succ[succ], pred[pred]
+            reach *= 2
+
+    def _prev(self, he):
+        return self.he_next[self.he_next[he]]
+
+    def _origin(self, he):
+        return self.he_vertex[self._prev(he)]
+
+    def _outgoing_halfedges(self, v):
+        start = self.vertex_halfedge[v]
+        if start == -1:
+            return
+        he = start
+        for i in range(self.vertex_corners[v]):
+            yield he
+            twin = self.he_twin[he]
+            if twin == -1:
+                return
+            he = self.he_next[twin]
+            if he == start:
+                return
+
+    def _vertex_direct_neighbours(self, v):
+        neighbours = [self.he_vertex[he] for he in self._outgoing_halfedges(v)]
+        start = self.vertex_halfedge[v]
+        if start != -1 and self.he_twin[self._prev(start)] == -1:
+            neighbours.append(self.he_vertex[self.he_next[start]])
+        return neighbours
+
+    def _face_direct_neighbours(self, f):
+        he = self.face_halfedge[f]
+        neighbours = []
+        for i in range(3):
+            twin = self.he_twin[he]
+            if twin != -1:
+                neighbours.append(self.he_face[twin])
+            he = self.he_next[he]
+        return neighbours
+
+    def _face(self, f):
+        he = self.face_halfedge[f]
+        return [int(self.he_vertex[he]) + 1, int(self.he_vertex[self.he_next[he]]) + 1,
+                int(self.he_vertex[self._prev(he)]) + 1]
+
+    def find_vertex_neighbors(self, vertex_id):
+        vertex = vertex_id - 1
+        first_level_neighbours = set(self._vertex_direct_neighbours(vertex))
+
+        both_levels_neighbours = set()  # actually this set will contain the analysed vertex as well
+        both_levels_neighbours.update(first_level_neighbours)
+
+        for vn in first_level_neighbours:
+            both_levels_neighbours.update(self._vertex_direct_neighbours(vn))
+
+        both_levels_neighbours.discard(vertex)
+        return self.vertices[sorted(both_levels_neighbours)].tolist()
+
+    def find_vertex_faces(self, vertex_id):
+        return [self._face(self.he_face[he]) for he in self._outgoing_halfedges(vertex_id - 1)]
+
+    def find_face_neighbors(self, face_id):
+        face = face_id - 1
+        first_level_neighbours = set(self._face_direct_neighbours(face))
+
+        both_levels_neighbours = set()  # actually this set will contain the analysed face as well
+        both_levels_neighbours.update(first_level_neighbours)
+
+        for fn in first_level_neighbours:
+            both_levels_neighbours.update(self._face_direct_neighbours(fn))
+
+        both_levels_neighbours.discard(face)
+        return [self._face(f) for f in both_levels_neighbours]
+
+    def flip_faces(self, face1_id, face2_id):
+        f1 = face1_id - 1
+        f2 = face2_id - 1
+        h = self.face_halfedge[f1]
+        for i in range(3):
+            if self.he_twin[h] != -1 and self.he_face[self.he_twin[h]] == f2:
+                break
+            h = self.he_next[h]
+        else:
+            raise ValueError("Faces %d and %d are not adjacent!" % (face1_id, face2_id))
+        self._flip_halfedge(h)
+        self._invalidate_adjacency()
+        return self._face(f1), self._face(f2)
+
+    def _flip_halfedge(self, h):
+        """
+        Flips edge of half-edge h (which must have a twin), updating all half-edge arrays.
+        """
+        f1 = self.he_face[h]
+        # before: f1 = (h: a->b, h1: b->c, h2: c->a), f2 = (t: b->a, t1: a->d, t2: d->b)
+        t = self.he_twin[h]
+        f2 = self.he_face[t]
+        h1 = self.he_next[h]
+        h2 = self.he_next[h1]
+        t1 = self.he_next[t]
+        t2 = self.he_next[t1]
+        a, b, c, d = self.he_vertex[h2], self.he_vertex[h], self.he_vertex[h1], self.he_vertex[t1]
+        # after: f1 = (h: d->c, h2: c->a, t1: a->d), f2 = (t: c->d, t2: d->b, h1: b->c)
+        self.he_vertex[h] = c
+        self.he_vertex[t] = d
+        self.he_next[h], self.he_next[h2], self.he_next[t1] = h2, t1, h
+        self.he_next[t], self.he_next[t2], self.he_next[h1] = t2, h1, t
+        self.he_face[t1] = f1
+        self.he_face[h1] = f2
+        self.face_halfedge[f1] = h
+        self.face_halfedge[f2] = t
+        for vertex, old_he, new_he in [(a, h, t1), (b, t, h1), (c, h2, t), (d, t2, h)]:
+            if self.vertex_halfedge[vertex] == old_he:
+                self.vertex_halfedge[vertex] = new_he
+        self.vertex_corners[[a, b]] -= 1
+        self.vertex_corners[[c, d]] += 1
+
+    def _find_halfedge(self, a, b):
+        """
+        Returns half-edge a->b or b->a (vertices indexed from 0), -1 if there is no such edge.
+        """
+        for he in self._outgoing_halfedges(a):
+            if self.he_vertex[he] == b:
+                return he
+        for he in self._outgoing_halfedges(b):
+            if self.he_vertex[he] == a:
+                return he
+        return -1
+
+    def _edge_quad(self, a, b):
+        h = self._find_halfedge(a - 1, b - 1)
+        if h == -1 or self.he_twin[h] == -1:
+            return None
+        if self.he_vertex[h] != b - 1:
+            h = self.he_twin[h]  # half-edge a->b, so that a and b keep their order
+        t = self.he_twin[h]
+        return (int(self._origin(h)) + 1, int(self.he_vertex[h]) + 1, int(self.he_vertex[self.he_next[h]]) + 1,
+                int(self.he_vertex[self.he_next[t]]) + 1, h)
+
+    def _has_edge(self, a, b):
+        return self._find_halfedge(a - 1, b - 1) != -1
+
+    def _flip_quad(self, a, b, c, d, edge):
+        self._flip_halfedge(edge)
+
+    def vertex_degree(self, vertex_id):
+        return len(self._vertex_direct_neighbours(vertex_id - 1))
+
+    def has_border(self):
+        return bool(np.any(self.he_twin == -1))
+
+    def find_border_edges(self):
+        border = np.nonzero(self.he_twin == -1)[0]
+        return (np.stack([self._origin(border), self.he_vertex[border]], axis=1) + 1).tolist()
+
+    def _faces_array(self):
+        """
+        Returns all faces (indexed from 0, vertices indexed from 0) as array of shape (F, 3).
+        """
+        he = self.face_halfedge
+        return np.stack([self.he_vertex[he], self.he_vertex[self.he_next[he]], self.he_vertex[self._prev(he)]],
+                        axis=1)
+
+    def _corners(self):
+        faces_amount = len(self.face_halfedge)
+        corner_faces = np.repeat(np.arange(1, faces_amount + 1), 3)
+        return self._faces_array().ravel() + 1, corner_faces, len(self.vertices), faces_amount
+
+    def _coordinates(self):
+        return self.vertices
+
+    def get_vertex(self, vertex_id):
+        return self.vertices[vertex_id - 1].tolist()
+
+    def get_face(self, face_id):
+        return self._face(face_id - 1)
+
+    def vertices_amount(self):
+        return len(self.vertices)
+
+    def faces_amount(self):
+        return len(self.face_halfedge)
+
+
+if __name__ == "__main__":
+    operations = ArrayHalfedgeMeshOperations('data/test1.obj')
+    vertex = operations.get_vertex(3)
+    print('chosen vertex:')
+    print(vertex)
+    print('\nneighbours:')
+    for v in operations.find_vertex_neighbors(3):
+        print(v)
+
+    print('\nfacets:')
+    print(operations.find_vertex_faces(3))
+
+    print('\nmesh has border:')
+    print(operations.has_border())
+
+    print('\nface neighbours:')
+    print(operations.find_face_neighbors(3))
+
+    print('\n\nFlipping faces 2 and 3:')
+    print(operations.get_face(2))
+    print(operations.get_face(3))
+    new_f1, new_f2 = operations.flip_faces(2, 3)
+    print('\n---\n')
+    print(new_f1)
+    print(new_f2)
@@ -0,0 +1,73 @@
+# coding: utf-8
+from __future__ import division
+
+from math import acos, pi, sqrt
+
+__author__ = "Michał Ciołczyk"
+
+
+class FlipReport(object):
+    """
+    Result of AbstractMeshOperations.flip_edges: amount of tested edges, amount of flips and time of the whole run.
+    """
+
+    def __init__(self, tested, flips, seconds):
+        self.tested = tested
+        self.flips = flips
+        self.seconds = seconds
+
+    @property
+    def flips_per_second(self):
+        return self.flips / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self):
+        return '%d flips of %d tested edges in %.4f s (%.0f flips/s)' % (self.flips, self.tested, self.seconds,
+                                                                       self.flips_per_second)
+
+
+def _angle(apex, p1, p2):
+    # plain floats, numpy calls would cost more than the arithmetic on 3 coordinates
+    ux, uy, uz = p1[0] - apex[0], p1[1] - apex[1], p1[2] - apex[2]
+    vx, vy, vz = p2[0] - apex[0], p2[1] - apex[1], p2[2] - apex[2]
+    lengths = sqrt((ux * ux + uy * uy + uz * uz) * (vx * vx + vy * vy + vz * vz))
+    if lengths == 0:
+        return 0.0
+    return acos(max(-1.0, min(1.0, (ux * vx + uy * vy + uz * vz) / lengths)))
+
+
+def delaunay_predicate(operations):
+    """
+    Returns predicate flipping edges which are not locally Delaunay
+    (angles opposite to the edge sum up to more than pi).
+
+    :param operations: mesh operations the predicate is used with
+    :type operations: AbstractMeshOperations
+    :return: predicate for AbstractMeshOperations.flip_edges
+    :rtype: (int, int, int, int) -> bool
+    """
+    def predicate(a, b, c, d):
+        pa, pb, pc, pd = [operations.get_vertex(v) for v in (a, b, c, d)]
+        return _angle(pc, pa, pb) + _angle(pd, pa, pb) > pi + 1e-12
+
+    return predicate
+
+
+def valence_predicate(operations, target=6):
+    """
+    Returns predicate flipping edges when it makes degrees of the four vertices closer to target
+    (sum of squared deviations decreases).
+
+    :param operations: mesh operations the predicate is used with
+    :type operations: AbstractMeshOperations
+    :param target: optimal vertex degree
+    :type target: int
+    :return: predicate for AbstractMeshOperations.flip_edges
+    :rtype: (int, int, int, int) -> bool
+    """
+    def predicate(a, b, c, d):
+        da, db, dc, dd = [operations.vertex_degree(v) - target for v in (a, b, c, d)]
+        before = da * da + db * db + dc * dc + dd * dd
+        after = (da - 1) ** 2 + (db - 1) ** 2 + (dc + 1) ** 2 + (dd + 1) ** 2
+        return after < before
+
+    return predicate
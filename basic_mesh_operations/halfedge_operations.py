@@ -2,10 +2,14 @@
 
 from __future__ import generators, print_function
 
+import numpy as np
 from CGAL.CGAL_Polyhedron_3 import Polyhedron_3_Halfedge_around_vertex_circulator, Polyhedron_3_Facet_handle, \
     Polyhedron_3_Halfedge_around_facet_circulator, Polyhedron_3_Halfedge_handle
 
+import common_path  # makes shared modules importable
 from abstract_operations import AbstractMeshOperations
+from adjacency import build_edges
+from cgal_bridge import polyhedron_to_arrays
 from mesh_loader import ObjLoader, OffLoader
 
 __author__ = "Michał Ciołczyk, Michał Janczykowski"
@@ -26,6 +30,9 @@ class HalfedgeMeshOperations(AbstractMeshOperations):
             raise AttributeError("Unknown file format")
         self.vertices = self._create_vertices_map()
         self.facets = self._create_facets_map()
+        self.vertices_ids = self._create_reverse_map(self.vertices)
+        self.facets_ids = self._create_reverse_map(self.facets)
+        self.coordinates, self._faces = self._create_arrays()
 
     def _create_vertices_map(self):
         vertices = dict()
@@ -43,6 +50,20 @@ class HalfedgeMeshOperations(AbstractMeshOperations):
             i += 1
         return facets
 
+    # noinspection PyMethodMayBeStatic
+    def _create_reverse_map(self, handles):
+        return dict((handle, i) for i, handle in handles.items())
+
+    def _create_arrays(self):
+        """
+        Extracts all vertices' coordinates and faces at once; row i of coordinates holds coordinates of vertex i
+        (row 0 is unused), faces are in order of their ids (vertices ids start from 1).
+        """
+        vertices, faces = polyhedron_to_arrays(self.polyhedron)
+        coordinates = np.zeros((len(self.vertices) + 1, 3))
+        coordinates[1:] = vertices
+        return coordinates, faces + 1
+
     def find_vertex_neighbors(self, vertex_id):
         vertex = self.vertices[vertex_id]
         first_level_neighbours = set(self._list_vertex_direct_neighbours(vertex))
@@ -73,12 +94,20 @@ class HalfedgeMeshOperations(AbstractMeshOperations):
                 facets.append(self._facet(he.facet()))
         return facets
 
+    def _border_edges(self):
+        corner_vertices, corner_faces = self._corners()[:2]
+        edges, corner_edges, edge_offsets, edge_faces = build_edges(corner_vertices, corner_faces)
+        return edges[np.diff(edge_offsets) == 1]
+
     def has_border(self):
-        for he in self.polyhedron.halfedges():
+        for he in self.polyhedron.halfedges():  # type: Polyhedron_3_Halfedge_handle
             if he.is_border():
                 return True
         return False
 
+    def find_border_edges(self):
+        return self._border_edges().tolist()
+
     def find_face_neighbors(self, face_id):
         facet = self.facets[face_id]
         both_levels_neighbours = set()  # actually this set will contain the analysed facet as well
@@ -105,11 +134,23 @@ class HalfedgeMeshOperations(AbstractMeshOperations):
         face2 = self.facets[face2_id]  # type: Polyhedron_3_Facet_handle
         diagonal = face1.halfedge()  # type: Polyhedron_3_Halfedge_handle
         for i in range(3):
-            if not diagonal.is_border():
-                opposite = diagonal.opposite()  # type: Polyhedron_3_Halfedge_handle
-                if opposite.facet() == face2:
-                    break
+            if not diagonal.opposite().is_border() and diagonal.opposite().facet() == face2:
+                break
             diagonal = diagonal.next()
+        else:
+            raise ValueError("Faces %d and %d are not adjacent!" % (face1_id, face2_id))
+        self._flip_halfedge(diagonal)
+        self._invalidate_adjacency()
+        return self.get_face(face1_id), self.get_face(face2_id)
+
+    def _flip_halfedge(self, diagonal):
+        """
+        Flips edge of halfedge diagonal by joining its facets and splitting the joined one along the other diagonal.
+        Faces (a, b, c) and (b, a, d) become (c, a, d) and (d, b, c) and keep their ids (facets' handles change,
+        so both facets maps are updated).
+        """
+        face1_id = self.facets_ids.pop(diagonal.facet())
+        face2_id = self.facets_ids.pop(diagonal.opposite().facet())
         joined = self.polyhedron.join_facet(diagonal)
         he1 = joined.next()  # type: Polyhedron_3_Halfedge_handle
         he2 = he1.next().next()  # type: Polyhedron_3_Halfedge_handle
@@ -118,26 +159,72 @@ class HalfedgeMeshOperations(AbstractMeshOperations):
         new_face2 = he2.facet()  # type: Polyhedron_3_Facet_handle
         self.facets[face1_id] = new_face1
         self.facets[face2_id] = new_face2
-        return self._facet(new_face1), self._facet(new_face2)
+        self.facets_ids[new_face1] = face1_id
+        self.facets_ids[new_face2] = face2_id
+
+    def _find_halfedge(self, a, b):
+        """
+        Returns halfedge a->b (vertices ids), None if there is no such edge.
+        """
+        vertex = self.vertices[b]
+        target = self.vertices[a]
+        circulator = vertex.vertex_begin()  # type: Polyhedron_3_Halfedge_around_vertex_circulator
+        for i in range(vertex.vertex_degree()):
+            he = circulator.next()  # type: Polyhedron_3_Halfedge_handle
+            if he.opposite().vertex() == target:
+                return he
+        return None
+
+    def _edge_quad(self, a, b):
+        he = self._find_halfedge(a, b)
+        if he is None or he.is_border() or he.opposite().is_border():
+            return None
+        opposite = he.opposite()  # type: Polyhedron_3_Halfedge_handle
+        return (a, b, self.vertices_ids[he.next().vertex()], self.vertices_ids[opposite.next().vertex()], he)
+
+    def _has_edge(self, a, b):
+        return self._find_halfedge(a, b) is not None
+
+    def _flip_quad(self, a, b, c, d, edge):
+        self._flip_halfedge(edge)
+
+    def vertex_degree(self, vertex_id):
+        return self.vertices[vertex_id].vertex_degree()
+
+    def _invalidate_adjacency(self):
+        super(HalfedgeMeshOperations, self)._invalidate_adjacency()
+        self._faces = None
+
+    def _corners(self):
+        if self._faces is None:
+            # flips replace facets' handles, so faces are read in order of their ids, not of the polyhedron
+            faces = [self._facet(self.facets[i]) for i in range(1, len(self.facets) + 1)]
+            self._faces = np.array(faces, dtype=np.int64).reshape((-1, 3))
+        corner_faces = np.repeat(np.arange(1, len(self._faces) + 1), 3)
+        return self._faces.ravel(), corner_faces, len(self.vertices), len(self._faces)
+
+    def _coordinates(self):
+        return self.coordinates[1:]
 
     def get_vertex(self, vertex_id):
-        return self._vertex(self.vertices[vertex_id])
+        return self.coordinates[vertex_id].tolist()
 
     def get_face(self, face_id):
         return self._facet(self.facets[face_id])
 
+    def vertices_amount(self):
+        return len(self.vertices)
+
+    def faces_amount(self):
+        return len(self.facets)
+
     def _vertex(self, vertex):
-        return [float(x) for x in str(vertex.point()).split()]
+        return self.coordinates[self.vertices_ids[vertex]].tolist()
 
     def _facet(self, facet):
-        def dict_key(dict, value):
-            for key in dict:
-                if dict[key] == value:
-                    return key
-
         he = facet.halfedge()  # type: Polyhedron_3_Halfedge_handle
         vertices = [he.vertex(), he.next().vertex(), he.next().next().vertex()]
-        return list(map(lambda x: dict_key(self.vertices, x), vertices))
+        return list(map(lambda x: self.vertices_ids[x], vertices))
 
 
 def print_triangle_vertices(facet):
@@ -0,0 +1,41 @@
+# coding: utf-8
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from cgal_bridge import polyhedron_from_arrays, polyhedron_to_arrays, write_off
+from mesh_loader import OffLoader
+
+__author__ = "Michał Ciołczyk"
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MESHES = sorted(glob.glob(os.path.join(ROOT_DIRECTORY, 'vertex_clustering', 'data', '*.off')))
+
+
+def canonical_faces(faces):
+    """
+    Rotates every face to start from its smallest vertex (polyhedra may start faces from another corner).
+    """
+    first = np.argmin(faces, axis=1)
+    return faces[np.arange(len(faces))[:, np.newaxis], (first[:, np.newaxis] + np.arange(3)) % 3]
+
+
+def test_write_off_is_lossless(tmp_path):
+    rng = np.random.RandomState(0)
+    vertices = rng.standard_normal((1000, 3)) * 10.0 ** rng.randint(-30, 30, (1000, 1))
+    faces = rng.randint(0, len(vertices), (500, 3))
+    write_off(str(tmp_path / 'mesh.off'), vertices, faces)
+    result_vertices, result_faces = OffLoader(str(tmp_path / 'mesh.off')).to_arrays()
+    assert np.array_equal(result_vertices, vertices)
+    assert np.array_equal(result_faces, faces)
+
+
+@pytest.mark.parametrize('filename', MESHES, ids=os.path.basename)
+def test_polyhedron_round_trip_is_lossless(filename):
+    pytest.importorskip('CGAL.CGAL_Polyhedron_3')
+    vertices, faces = OffLoader(filename).to_arrays()
+    result_vertices, result_faces = polyhedron_to_arrays(polyhedron_from_arrays(vertices, faces))
+    assert np.array_equal(result_vertices, vertices)
+    assert np.array_equal(canonical_faces(result_faces), canonical_faces(faces))
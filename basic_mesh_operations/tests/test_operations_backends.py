@@ -0,0 +1,106 @@
+# coding: utf-8
+import glob
+import os
+
+import pytest
+
+from array_halfedge_operations import ArrayHalfedgeMeshOperations
+from flips import delaunay_predicate, valence_predicate
+from vertices_faces_operations import VerticesFacesOperations
+
+__author__ = "Michał Ciołczyk"
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MESHES = sorted(glob.glob(os.path.join(ROOT_DIRECTORY, 'vertex_clustering', 'data', '*.off')))
+NON_MANIFOLD_MESHES = ['cube.off', 'icosahedron.off']  # faces of the same vertex form several fans
+MANIFOLD_MESHES = [filename for filename in MESHES if os.path.basename(filename) not in NON_MANIFOLD_MESHES]
+QUERIES = 200
+MAX_FLIPS = 500
+
+
+@pytest.fixture(autouse=True)
+def no_mesh_cache(monkeypatch):
+    monkeypatch.setenv('MESH_CACHE_DIR', '')
+
+
+def sample_ids(amount):
+    return range(1, amount + 1, max(1, amount // QUERIES))
+
+
+def as_set(items):
+    return set(tuple(item) for item in items)
+
+
+def write_off(path, vertices, faces):
+    with open(path, 'w') as f:
+        f.write('OFF\n%d %d 0\n' % (len(vertices), len(faces)))
+        for vertex in vertices:
+            f.write('%r %r %r\n' % tuple(vertex))
+        for face in faces:
+            f.write('3 %d %d %d\n' % tuple(face))
+    return str(path)
+
+
+@pytest.mark.parametrize('filename', MANIFOLD_MESHES, ids=os.path.basename)
+def test_array_halfedge_matches_vertices_faces(filename):
+    expected = VerticesFacesOperations(filename)
+    operations = ArrayHalfedgeMeshOperations(filename)
+    vertices_amount, faces_amount = expected.vertices_amount(), expected.faces_amount()
+    assert (operations.vertices_amount(), operations.faces_amount()) == (vertices_amount, faces_amount)
+    assert operations._corners()[2:] == (vertices_amount, faces_amount)
+    for vertex_id in sample_ids(vertices_amount):
+        assert as_set(operations.find_vertex_faces(vertex_id)) == as_set(expected.find_vertex_faces(vertex_id))
+        assert len(operations.find_vertex_faces(vertex_id)) == len(expected.find_vertex_faces(vertex_id))
+        assert as_set(operations.find_vertex_neighbors(vertex_id)) == \
+            as_set(expected.find_vertex_neighbors(vertex_id))
+        assert operations.vertex_degree(vertex_id) == expected.vertex_degree(vertex_id)
+    for face_id in sample_ids(faces_amount):
+        assert operations.get_face(face_id) == list(expected.get_face(face_id))
+        assert as_set(operations.find_face_neighbors(face_id)) == as_set(expected.find_face_neighbors(face_id))
+    assert operations.has_border() == expected.has_border()
+    assert as_set(map(sorted, operations.find_border_edges())) == as_set(map(sorted, expected.find_border_edges()))
+
+
+@pytest.mark.parametrize('filename', MANIFOLD_MESHES, ids=os.path.basename)
+@pytest.mark.parametrize('predicate', [delaunay_predicate, valence_predicate])
+def test_flip_edges_match_between_backends(filename, predicate):
+    expected = VerticesFacesOperations(filename)
+    operations = ArrayHalfedgeMeshOperations(filename)
+    expected_report = expected.flip_edges(None, predicate(expected), MAX_FLIPS)
+    report = operations.flip_edges(None, predicate(operations), MAX_FLIPS)
+    assert (report.tested, report.flips) == (expected_report.tested, expected_report.flips)
+    faces_amount = expected.faces_amount()
+    for face_id in range(1, faces_amount + 1):
+        assert operations.get_face(face_id) == list(expected.get_face(face_id))
+
+
+@pytest.mark.parametrize('filename', MANIFOLD_MESHES, ids=os.path.basename)
+def test_flip_faces_match_between_backends(filename):
+    expected = VerticesFacesOperations(filename)
+    operations = ArrayHalfedgeMeshOperations(filename)
+    face_ids = list(sample_ids(expected.faces_amount()))
+    rings_offsets, rings = expected.find_faces_rings(face_ids, 1)
+    flipped = set()  # faces of every pair are not flipped with other ones before, so they stay adjacent
+    for i, face_id in enumerate(face_ids):
+        neighbours = [f for f in rings[rings_offsets[i]:rings_offsets[i + 1]].tolist() if f not in flipped]
+        if face_id in flipped or not neighbours:
+            continue
+        flipped.update([face_id, neighbours[0]])
+        assert operations.flip_faces(face_id, neighbours[0]) == \
+            tuple(list(face) for face in expected.flip_faces(face_id, neighbours[0]))
+
+
+@pytest.mark.parametrize('name', NON_MANIFOLD_MESHES)
+def test_array_halfedge_rejects_non_manifold_vertices(name):
+    with pytest.raises(ValueError):
+        ArrayHalfedgeMeshOperations(os.path.join(ROOT_DIRECTORY, 'vertex_clustering', 'data', name))
+
+
+@pytest.mark.parametrize('faces', [
+    [(0, 1, 2), (0, 1, 3), (0, 1, 4), (2, 1, 0)],  # edge 0-1 of four faces
+    [(0, 1, 2), (0, 2, 3), (0, 3, 1), (1, 3, 2), (0, 2, 4)]  # faces 0-1-2 and 0-2-4 with opposite orientations
+])
+def test_array_halfedge_rejects_non_manifold_edges(faces, tmp_path):
+    vertices = [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0), (1.0, 1.0, 1.0)]
+    with pytest.raises(ValueError):
+        ArrayHalfedgeMeshOperations(write_off(tmp_path / 'mesh.off', vertices, faces))
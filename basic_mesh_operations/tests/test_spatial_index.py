@@ -0,0 +1,19 @@
+# coding: utf-8
+import numpy as np
+import pytest
+
+from spatial_index import SpatialGrid
+
+__author__ = "Michał Ciołczyk"
+
+
+@pytest.mark.parametrize('radius', [0.0, 0.01, 0.1, 0.3, 2.0, np.inf])
+def test_within_matches_brute_force(radius):
+    rng = np.random.RandomState(0)
+    points = rng.rand(300, 3)
+    queries = rng.rand(40, 3) * 1.5 - 0.25
+    queries[:5] = points[:5]
+    offsets, indices = SpatialGrid(points, cell_size=0.05).within(queries, radius)
+    distances = np.sqrt(np.sum((queries[:, np.newaxis, :] - points[np.newaxis, :, :]) ** 2, axis=2))
+    for i in range(len(queries)):
+        assert indices[offsets[i]:offsets[i + 1]].tolist() == np.nonzero(distances[i] <= radius)[0].tolist()
@@ -0,0 +1,237 @@
+# coding: utf-8
+"""
+Topology health check of a mesh, computed with array operations on the sorted edges table.
+
+Example:
+
+    python topology.py data/test1.off
+"""
+from __future__ import print_function, division
+
+import sys
+
+import numpy as np
+
+from adjacency import build_edges, next_corners
+
+__author__ = "Michał Ciołczyk"
+
+
+def connected_components(nodes_amount, sources, targets):
+    """
+    Labels connected components of graph given by edges (sources[i], targets[i]),
+    by hooking roots of both ends onto the smaller one and compressing paths, until no edge joins two trees.
+    :param nodes_amount: amount of nodes
+    :param sources: edges' first nodes
+    :param targets: edges' second nodes
+    :return root (smallest node) of every node's component
+    :rtype np.ndarray
+    """
+    parent = np.arange(nodes_amount)
+    while True:
+        source_roots = parent[sources]
+        target_roots = parent[targets]
+        joining = source_roots != target_roots
+        if not np.any(joining):
+            return parent
+        source_roots = source_roots[joining]
+        target_roots = target_roots[joining]
+        np.minimum.at(parent, np.maximum(source_roots, target_roots), np.minimum(source_roots, target_roots))
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+
+def _follow(successors, steps_amount):
+    """
+    Pointer doubling over successors (-1 ends a chain): returns the last node reachable from every node
+    (some node of the cycle, for nodes leading to a cycle) and the distance to it.
+    """
+    nodes = np.arange(len(successors))
+    jump = np.where(successors == -1, nodes, successors)
+    distance = (successors != -1).astype(np.int64)
+    for _ in range(max(1, int(np.ceil(np.log2(max(steps_amount, 2)))) + 1)):
+        distance = distance + distance[jump]
+        jump = jump[jump]
+    return jump, distance
+
+
+def chain_boundary(boundary_edges):
+    """
+    Chains boundary edges (oriented like in their faces) into loops.
+
+    Edge u->v is followed by an edge starting in v; in vertices with several boundary edges
+    (non-manifold vertices), k-th incoming edge is followed by k-th outgoing one.
+    :param boundary_edges: boundary edges of shape (B, 2)
+    :return loops' offsets, vertices (loop i is vertices[offsets[i]:offsets[i + 1]]), is every loop closed
+    :rtype np.ndarray, np.ndarray, np.ndarray
+    """
+    edges_amount = len(boundary_edges)
+    if edges_amount == 0:
+        return np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+    starts, ends = boundary_edges[:, 0], boundary_edges[:, 1]
+    by_start = np.argsort(starts, kind='stable')
+    by_end = np.argsort(ends, kind='stable')
+    # rank of every edge among edges with the same start (end)
+    start_ranks = np.arange(edges_amount) - np.searchsorted(starts[by_start], starts[by_start])
+    end_ranks = np.arange(edges_amount) - np.searchsorted(ends[by_end], ends[by_end])
+    outgoing_keys = starts[by_start] * edges_amount + start_ranks
+    incoming_keys = ends[by_end] * edges_amount + end_ranks
+    order = np.argsort(outgoing_keys)
+    positions = np.minimum(np.searchsorted(outgoing_keys[order], incoming_keys), edges_amount - 1)
+    successors = np.full(edges_amount, -1, dtype=np.int64)
+    found = outgoing_keys[order][positions] == incoming_keys
+    successors[by_end[found]] = by_start[order[positions[found]]]
+
+    # cycles are cut before their smallest edge, so that all chains are open
+    last, _ = _follow(successors, edges_amount)
+    on_cycle = successors[last] != -1
+    smallest = np.arange(edges_amount)
+    jump = np.where(successors == -1, smallest, successors)
+    for _ in range(max(1, int(np.ceil(np.log2(max(edges_amount, 2)))) + 1)):
+        smallest = np.minimum(smallest, smallest[jump])
+        jump = jump[jump]
+    closing = on_cycle & (successors == smallest)
+    successors[closing] = -1
+
+    last, distance = _follow(successors, edges_amount)
+    loop_order = np.lexsort((-distance, last))
+    loop_ids = np.unique(last, return_inverse=True)[1].ravel()
+    offsets = np.zeros(loop_ids.max() + 2, dtype=np.int64)
+    np.cumsum(np.bincount(loop_ids, minlength=len(offsets) - 1), out=offsets[1:])
+    closed = np.zeros(len(offsets) - 1, dtype=bool)
+    closed[loop_ids[closing]] = True
+    return offsets, starts[loop_order], closed
+
+
+class TopologyReport(object):
+    """
+    Topology of a mesh (see topology_report):
+
+    * vertices, edges, faces - amounts (vertices not used by any face are counted in isolated_vertices only)
+
+    * boundary_edges - edges of a single face, oriented like in it, array of shape (B, 2)
+
+    * loops_offsets, loops_vertices, loops_closed - boundary edges chained into loops
+      (vertices of loop i are loops_vertices[loops_offsets[i]:loops_offsets[i + 1]])
+
+    * non_manifold_edges - edges of more than two faces, array of shape (M, 2)
+
+    * non_manifold_vertices - vertices on non-manifold edges or with faces not forming a single fan
+
+    * components - amount of connected components
+
+    * oriented - whether every edge of two faces goes in opposite directions in them
+
+    * euler_characteristic, genus - genus is None unless the mesh is an oriented manifold
+    """
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    @property
+    def boundary_loops(self):
+        return len(self.loops_offsets) - 1
+
+    @property
+    def is_manifold(self):
+        return len(self.non_manifold_edges) == 0 and len(self.non_manifold_vertices) == 0
+
+    def loops(self):
+        """
+        :return vertices ids of every boundary loop
+        :rtype list
+        """
+        return [self.loops_vertices[self.loops_offsets[i]:self.loops_offsets[i + 1]].tolist()
+                for i in range(self.boundary_loops)]
+
+    def __str__(self):
+        return '\n'.join([
+            'vertices: %d (isolated: %d), edges: %d, faces: %d' % (self.vertices, self.isolated_vertices,
+                                                                  self.edges, self.faces),
+            'boundary edges: %d in %d loops (%d closed)' % (len(self.boundary_edges), self.boundary_loops,
+                                                             np.count_nonzero(self.loops_closed)),
+            'non-manifold edges: %d, non-manifold vertices: %d' % (len(self.non_manifold_edges),
+                                                                   len(self.non_manifold_vertices)),
+            'components: %d, oriented: %s' % (self.components, self.oriented),
+            'Euler characteristic: %d, genus: %s' % (self.euler_characteristic, self.genus)
+        ])
+
+
+def topology_report(corner_vertices, corner_faces, vertices_amount, first_vertex_id=0):
+    """
+    Computes topology report of a mesh (see TopologyReport) given by its faces' corners.
+    :param corner_vertices: corners' vertices ids
+    :param corner_faces: corners' faces ids (sorted, like returned by flatten_faces)
+    :param vertices_amount: amount of vertices ids (max vertex id + 1)
+    :param first_vertex_id: id of the first vertex (smaller ids are not counted as isolated vertices)
+    :return topology report
+    :rtype TopologyReport
+    """
+    corner_vertices = np.asarray(corner_vertices, dtype=np.int64)
+    corner_faces = np.asarray(corner_faces, dtype=np.int64)
+    faces_amount = int(np.count_nonzero(np.diff(corner_faces))) + 1 if len(corner_faces) else 0
+    if len(corner_vertices) == 0:
+        return TopologyReport(vertices=0, edges=0, faces=0, isolated_vertices=vertices_amount - first_vertex_id,
+                              boundary_edges=np.zeros((0, 2), dtype=np.int64), loops_offsets=np.zeros(1, dtype=np.int64),
+                              loops_vertices=np.zeros(0, dtype=np.int64), loops_closed=np.zeros(0, dtype=bool),
+                              non_manifold_edges=np.zeros((0, 2), dtype=np.int64),
+                              non_manifold_vertices=np.zeros(0, dtype=np.int64), components=0, oriented=True,
+                              euler_characteristic=0, genus=0)
+    following = next_corners(corner_faces)
+    edges, corner_edges, edge_offsets, edge_faces = build_edges(corner_vertices, corner_faces, following)
+    edges_amount = len(edges)
+    edge_counts = np.diff(edge_offsets)
+
+    used = np.zeros(vertices_amount, dtype=bool)
+    used[corner_vertices] = True
+    used_amount = int(np.count_nonzero(used))
+
+    # every edge of two faces has to be used once in each direction
+    forward = corner_vertices == edges[corner_edges, 0]
+    forward_counts = np.bincount(corner_edges, forward, minlength=edges_amount)
+    oriented = bool(np.all(forward_counts[edge_counts == 2] == 1))
+
+    non_manifold_edges = edge_counts > 2
+    # link of vertex v: corner of face (u, v, w) joins v's ends of edges u-v and v-w;
+    # v is manifold if its ends of edges form a single chain (fan)
+    outgoing = corner_edges
+    incoming = np.empty_like(corner_edges)
+    incoming[following] = corner_edges
+    outgoing_ends = 2 * outgoing + (edges[outgoing, 0] != corner_vertices)
+    incoming_ends = 2 * incoming + (edges[incoming, 0] != corner_vertices)
+    link_roots = connected_components(2 * edges_amount, outgoing_ends, incoming_ends)
+    roots = np.nonzero(link_roots == np.arange(2 * edges_amount))[0]
+    fans = np.bincount(edges.ravel()[roots], minlength=vertices_amount)
+    non_manifold_vertices = fans > 1
+    non_manifold_vertices[edges[non_manifold_edges].ravel()] = True
+
+    vertex_roots = connected_components(vertices_amount, edges[:, 0], edges[:, 1])
+    components = int(np.count_nonzero(used & (vertex_roots == np.arange(vertices_amount))))
+
+    boundary_edges = edges[edge_counts == 1]
+    loops_offsets, loops_vertices, loops_closed = chain_boundary(boundary_edges)
+
+    euler_characteristic = used_amount - edges_amount + faces_amount
+    genus = None
+    if oriented and not np.any(non_manifold_vertices):
+        genus = (2 * components - (len(loops_offsets) - 1) - euler_characteristic) // 2
+    return TopologyReport(vertices=used_amount, edges=edges_amount, faces=faces_amount,
+                          isolated_vertices=int(np.count_nonzero(~used[first_vertex_id:])),
+                          boundary_edges=boundary_edges, loops_offsets=loops_offsets, loops_vertices=loops_vertices,
+                          loops_closed=loops_closed, non_manifold_edges=edges[non_manifold_edges],
+                          non_manifold_vertices=np.nonzero(non_manifold_vertices)[0], components=components,
+                          oriented=oriented, euler_characteristic=euler_characteristic, genus=genus)
+
+
+if __name__ == '__main__':
+    import common_path  # makes shared modules importable
+    from mesh_cache import MeshCache
+
+    if len(sys.argv) != 2:
+        print("Usage: python %s <mesh_filename>" % sys.argv[0])
+        exit(1)
+    vertices, faces = MeshCache(sys.argv[1]).arrays()
+    print(topology_report(faces.ravel(), np.repeat(np.arange(len(faces)), 3), len(vertices)))
@@ -1,8 +1,10 @@
 # coding: utf-8
-import itertools
+import numpy as np
 
+import common_path  # makes shared modules importable
 from abstract_operations import AbstractMeshOperations
-from mesh_loader import OffLoader, ObjLoader
+from adjacency import flatten_faces, build_incidence, build_edges
+from mesh_cache import MeshCache, loader_for_filename
 
 __author__ = "Michał Ciołczyk"
 
@@ -10,16 +12,58 @@ __author__ = "Michał Ciołczyk"
 class VerticesFacesOperations(AbstractMeshOperations):
     """
     Provides basic operations using vertices list and faces list as underlying data structure.
+
+    Faces of vertices are found in CSR incidence index; flips do not rebuild it, faces of vertices touched by
+    flips are kept in an overlay (dict of lists) instead.
     """
 
     def __init__(self, filename):
         super(VerticesFacesOperations, self).__init__(filename)
-        if self.filename.endswith('.obj'):
-            self.vertices, self.faces = ObjLoader(self.filename).to_vertices_and_faces()
-        elif self.filename.endswith('.off'):
-            self.vertices, self.faces = OffLoader(self.filename).to_vertices_and_faces()
-        else:
+        if not self.filename.endswith('.obj') and not self.filename.endswith('.off'):
             raise AttributeError("Unknown file format")
+        self._incidence = None
+        self._incidence_overlay = {}
+        self._edges = None
+        cache = MeshCache(self.filename)
+        try:
+            vertices, faces = cache.arrays()
+        except ValueError:  # not only triangles, which only the lists loaders support
+            self.vertices, self.faces = loader_for_filename(self.filename).to_vertices_and_faces()
+            self._build_indices()
+            return
+        self.vertices = [None] + vertices.tolist()
+        self.faces = [None] + (faces + 1).tolist()
+        self._set_indices(cache.derived('vertices_faces_indices', self._compute_indices))
+
+    def _compute_indices(self):
+        corner_vertices, corner_faces = flatten_faces(self.faces)
+        incidence_offsets, incidence_faces = build_incidence(corner_vertices, corner_faces, len(self.vertices))
+        edges, corner_edges, edge_offsets, edge_faces = build_edges(corner_vertices, corner_faces)
+        return {
+            'incidence_offsets': incidence_offsets,
+            'incidence_faces': incidence_faces,
+            'edges': edges,
+            'corner_edges': corner_edges,
+            'edge_offsets': edge_offsets,
+            'edge_faces': edge_faces,
+            'face_offsets': np.searchsorted(corner_faces, np.arange(len(self.faces) + 1))
+        }
+
+    def _set_indices(self, indices):
+        self._incidence = indices['incidence_offsets'], indices['incidence_faces']
+        self._incidence_overlay = {}
+        self._edges = (indices['edges'], indices['corner_edges'], indices['edge_offsets'], indices['edge_faces'],
+                       indices['face_offsets'])
+
+    def _build_indices(self):
+        self._set_indices(self._compute_indices())
+
+    def _corners(self):
+        corner_vertices, corner_faces = flatten_faces(self.faces)
+        return corner_vertices, corner_faces, len(self.vertices) - 1, len(self.faces) - 1
+
+    def _coordinates(self):
+        return np.array(self.vertices[1:], dtype=np.float64).reshape((-1, 3))
 
     def get_vertex(self, vertex_id):
         return self.vertices[vertex_id]
@@ -27,31 +71,82 @@ class VerticesFacesOperations(AbstractMeshOperations):
     def get_face(self, face_id):
         return self.faces[face_id]
 
+    def vertices_amount(self):
+        return len(self.vertices) - 1
+
+    def faces_amount(self):
+        return len(self.faces) - 1
+
     def find_vertex_faces(self, vertex_id):
         return list(map(lambda x: self.get_face(x), self._find_vertex_faces(vertex_id)))
 
     def _find_vertex_faces(self, vertex_id):
-        i = 1
-        found_faces = []
-        for face in self.faces[1:]:
-            if vertex_id in face:
-                found_faces.append(i)
-            i += 1
-        return found_faces
+        if vertex_id in self._incidence_overlay:
+            return list(self._incidence_overlay[vertex_id])
+        if self._incidence is None:
+            self._build_indices()
+        offsets, face_ids = self._incidence
+        return face_ids[offsets[vertex_id]:offsets[vertex_id + 1]].tolist()
+
+    def _overlay_faces(self, vertex_id):
+        if vertex_id not in self._incidence_overlay:
+            self._incidence_overlay[vertex_id] = self._find_vertex_faces(vertex_id)
+        return self._incidence_overlay[vertex_id]
 
     def flip_faces(self, face1_id, face2_id):
         face1 = self.faces[face1_id]
-        face1_set = set(face1)
         face2 = self.faces[face2_id]
-        face2_set = set(face2)
-        shared_vertices = face1_set & face2_set
-        remaining_vertices = (face1_set | face2_set).difference(shared_vertices)
-        new_faces = []
-        for sv in shared_vertices:
-            new_faces.append(list({sv} | remaining_vertices))
-        self.faces[face1_id] = new_faces[0]
-        self.faces[face2_id] = new_faces[1]
-        return new_faces
+        for i in range(len(face1)):
+            a, b = face1[i], face1[(i + 1) % len(face1)]
+            if b in face2 and face2[(face2.index(b) + 1) % len(face2)] == a:
+                break
+        else:
+            raise ValueError("Faces %d and %d are not adjacent!" % (face1_id, face2_id))
+        if len(face1) != 3 or len(face2) != 3:
+            raise ValueError("Only triangles can be flipped!")
+        c = face1[(i + 2) % 3]
+        d = face2[(face2.index(a) + 1) % 3]
+        self._flip_quad(a, b, c, d, (face1_id, face2_id))
+        self._invalidate_adjacency()
+        return self.faces[face1_id], self.faces[face2_id]
+
+    def _edge_faces(self, a, b):
+        return [f for f in self._find_vertex_faces(a) if b in self.faces[f]]
+
+    def _edge_quad(self, a, b):
+        edge_faces = self._edge_faces(a, b)
+        if len(edge_faces) != 2:
+            return None
+        face1_id, face2_id = edge_faces
+        if len(self.faces[face1_id]) != 3 or len(self.faces[face2_id]) != 3:
+            return None
+        if self.faces[face1_id][(self.faces[face1_id].index(a) + 1) % 3] != b:
+            face1_id, face2_id = face2_id, face1_id  # (a, b, c) is the face in which a is followed by b
+        face1 = self.faces[face1_id]
+        face2 = self.faces[face2_id]
+        if face1[(face1.index(a) + 1) % 3] != b or face2[(face2.index(b) + 1) % 3] != a:
+            return None  # faces are not consistently oriented
+        return a, b, face1[(face1.index(b) + 1) % 3], face2[(face2.index(a) + 1) % 3], (face1_id, face2_id)
+
+    def _has_edge(self, a, b):
+        return len(self._edge_faces(a, b)) > 0
+
+    def _flip_quad(self, a, b, c, d, edge):
+        face1_id, face2_id = edge
+        self.faces[face1_id] = [c, a, d]
+        self.faces[face2_id] = [d, b, c]
+        self._overlay_faces(a).remove(face2_id)
+        self._overlay_faces(b).remove(face1_id)
+        self._overlay_faces(c).append(face2_id)
+        self._overlay_faces(d).append(face1_id)
+        self._edges = None
+
+    def vertex_degree(self, vertex_id):
+        neighbours = set()
+        for face in self._find_vertex_faces(vertex_id):
+            neighbours.update(self.faces[face])
+        neighbours.discard(vertex_id)
+        return len(neighbours)
 
     def find_face_neighbors(self, face_id):
         first_level_neighbours = self._find_face_direct_neighbors(face_id)
@@ -66,46 +161,57 @@ class VerticesFacesOperations(AbstractMeshOperations):
         return list(map(lambda f_id: self.faces[f_id], both_levels_neighbours))
 
     def _find_face_direct_neighbors(self, f_id):
-        face = self.faces[f_id]
+        if self._edges is None:
+            if self._incidence_overlay:  # edges table is not updated by flips
+                face = self.faces[f_id]
+                faces = {f_id}
+                for i in range(len(face)):
+                    faces.update(self._edge_faces(face[i], face[i - 1]))
+                return faces
+            self._build_indices()
+        edges, corner_edges, edge_offsets, edge_faces, face_offsets = self._edges
         faces = set()
-        combinations = list(itertools.combinations(face, 2))
-        for vertices_pair in combinations:
-            i = 1
-            for f in self.faces[1:]:
-                if vertices_pair[0] in f and vertices_pair[1] in f:
-                    faces.add(i)
-                i += 1
+        for e in corner_edges[face_offsets[f_id]:face_offsets[f_id + 1]].tolist():
+            faces.update(edge_faces[edge_offsets[e]:edge_offsets[e + 1]].tolist())
         return faces
 
     def find_vertex_neighbors(self, vertex_id):
         def find_vertex_direct_neighbors(v_id):
             faces = self._find_vertex_faces(v_id)
             neighbors = set()
-            for face in faces[1:]:
+            for face in faces:
                 for v in self.faces[face]:
                     neighbors.add(v)
             return neighbors
 
         first_level_neighbours = find_vertex_direct_neighbors(vertex_id)
-        first_level_neighbours.remove(vertex_id)
+        first_level_neighbours.discard(vertex_id)
         both_levels_neighbours = set()  # actually this set will contain the analysed vertex as well
         both_levels_neighbours.update(first_level_neighbours)
 
         for vn in first_level_neighbours:
             both_levels_neighbours.update(find_vertex_direct_neighbors(vn))
 
-        both_levels_neighbours.remove(vertex_id)
+        both_levels_neighbours.discard(vertex_id)
         return list(map(lambda v_id: self.vertices[v_id], both_levels_neighbours))
 
+    def _build_edges(self):
+        corner_vertices, corner_faces = flatten_faces(self.faces)
+        edges, corner_edges, edge_offsets, edge_faces = build_edges(corner_vertices, corner_faces)
+        self._edges = (edges, corner_edges, edge_offsets, edge_faces,
+                       np.searchsorted(corner_faces, np.arange(len(self.faces) + 1)))
+
     def has_border(self):
-        i = 1
-        for f in self.faces[1:]:
-            direct_neighbours = self._find_face_direct_neighbors(i)
-            direct_neighbours.remove(i)
-            if len(direct_neighbours) < len(f):
-                return True
-            i += 1
-        return False
+        if self._edges is None:
+            self._build_edges()
+        edge_offsets = self._edges[2]
+        return bool(np.any(np.diff(edge_offsets) == 1))
+
+    def find_border_edges(self):
+        if self._edges is None:
+            self._build_edges()
+        edges, corner_edges, edge_offsets, edge_faces, face_offsets = self._edges
+        return edges[np.diff(edge_offsets) == 1].tolist()
 
 
 if __name__ == '__main__':
@@ -121,7 +227,7 @@ if __name__ == '__main__':
     print(operations.find_vertex_faces(3))
 
     print('\nmesh has border:')
-    print operations.has_border()
+    print(operations.has_border())
 
     print('\nface neighbours:')
     print(operations.find_face_neighbors(3))
@@ -0,0 +1,76 @@
+# coding: utf-8
+"""
+Benchmarks of vertex clustering (loading and whole clustering run) for every representative method.
+
+Epsilon is chosen relatively to the size of every mesh (fraction of its bounding box diagonal).
+"""
+from __future__ import print_function, division
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+from harness import ROOT_DIRECTORY, BenchmarkResults, add_common_arguments, default_meshes, mesh_name, \
+    time_repeated
+
+sys.path.insert(0, os.path.join(ROOT_DIRECTORY, 'vertex_clustering'))
+
+from clustering import cluster_arrays
+from main import function_names, representative_function
+from mesh_cache import MeshCache
+from mesh_loader import ObjLoader, OffLoader
+from session import ClusteringSession
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+
+def _loader(filename):
+    return ObjLoader(filename) if filename.endswith('.obj') else OffLoader(filename)
+
+
+def bench_mesh(results, filename, output_directory, args):
+    prefix = 'clustering/%s' % mesh_name(filename)
+    loader = _loader(filename)
+    results.add(prefix + '/load', time_repeated(loader.to_arrays, args.repeats, args.warmup))
+    cache = MeshCache(filename, output_directory)
+    results.add(prefix + '/load_cached', time_repeated(cache.arrays, args.repeats, max(args.warmup, 1)))
+
+    vertices, faces = loader.to_arrays()
+    epsilon = args.epsilon_fraction * float(np.linalg.norm(vertices.max(axis=0) - vertices.min(axis=0)))
+    output_filename = os.path.join(output_directory, mesh_name(filename) + '.off')
+    for function in function_names():
+        method = representative_function(function)
+        results.add('%s/%s' % (prefix, function),
+                    time_repeated(lambda: cluster_arrays(vertices, faces, epsilon, method, output_filename),
+                                  args.repeats, args.warmup))
+
+    def all_methods_in_session():
+        session = ClusteringSession(vertices, faces)
+        for function in function_names():
+            session.cluster(epsilon, representative_function(function), output_filename)
+
+    results.add(prefix + '/session_all_methods', time_repeated(all_methods_in_session, args.repeats, args.warmup))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_common_arguments(parser)
+    args = parser.parse_args(argv)
+    results = BenchmarkResults()
+    output_directory = tempfile.mkdtemp()
+    try:
+        for filename in args.meshes or default_meshes():
+            bench_mesh(results, filename, output_directory, args)
+    finally:
+        shutil.rmtree(output_directory)
+    if args.output:
+        results.save(args.output)
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
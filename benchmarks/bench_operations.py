@@ -0,0 +1,124 @@
+# coding: utf-8
+"""
+Benchmarks of basic mesh operations of every available backend.
+
+Every query operation is timed call by call on the same seeded random ids for all backends.
+"""
+from __future__ import print_function, division
+
+import argparse
+import os
+import random
+import sys
+
+from harness import ROOT_DIRECTORY, BenchmarkResults, add_common_arguments, default_meshes, mesh_name, \
+    time_calls, time_repeated
+
+sys.path.insert(0, os.path.join(ROOT_DIRECTORY, 'basic_mesh_operations'))
+
+from array_halfedge_operations import ArrayHalfedgeMeshOperations
+from flips import delaunay_predicate
+from vertices_faces_operations import VerticesFacesOperations
+
+try:
+    from halfedge_operations import HalfedgeMeshOperations
+except ImportError:  # CGAL bindings are not installed
+    HalfedgeMeshOperations = None
+
+__author__ = "Michał Ciołczyk"
+
+_RINGS_DEPTHS = [1, 2]
+
+
+def available_backends():
+    backends = [VerticesFacesOperations, ArrayHalfedgeMeshOperations]
+    if HalfedgeMeshOperations is not None:
+        backends.append(HalfedgeMeshOperations)
+    return backends
+
+
+def _sample_ids(rng, amount, queries):
+    return [rng.randint(1, amount) for _ in range(queries)]
+
+
+def _adjacent_pairs(operations, face_ids):
+    """
+    Returns pairs of adjacent faces not sharing faces with each other, so that they stay adjacent
+    after flipping the previous ones.
+    """
+    rings_offsets, rings = operations.find_faces_rings(face_ids, 1)
+    pairs = []
+    used = set()
+    for i, face_id in enumerate(face_ids):
+        for neighbour in rings[rings_offsets[i]:rings_offsets[i + 1]].tolist():
+            if face_id not in used and neighbour not in used:
+                pairs.append((face_id, neighbour))
+                used.update([face_id, neighbour])
+                break
+    return pairs
+
+
+def bench_backend(results, backend, filename, args):
+    prefix = 'operations/%s/%s' % (mesh_name(filename), backend.__name__)
+    loaded = []
+    results.add(prefix + '/load', time_repeated(lambda: loaded.append(backend(filename)), args.repeats, args.warmup))
+    # spatial index is built by the first call, so every call is timed on another loaded mesh
+    for operations in loaded[:args.warmup]:
+        operations.spatial_index()
+    results.add(prefix + '/spatial_index', time_calls(lambda operations: operations.spatial_index(),
+                                                      loaded[args.warmup:], 0))
+
+    operations = loaded[-1]
+    del loaded[:]
+    vertices_amount, faces_amount = operations.vertices_amount(), operations.faces_amount()
+    rng = random.Random(args.seed)
+    vertex_ids = _sample_ids(rng, vertices_amount, args.queries)
+    face_ids = _sample_ids(rng, faces_amount, args.queries)
+
+    for name, ids in [('get_vertex', vertex_ids), ('find_vertex_neighbors', vertex_ids),
+                      ('find_vertex_faces', vertex_ids), ('get_face', face_ids),
+                      ('find_face_neighbors', face_ids)]:
+        results.add('%s/%s' % (prefix, name), time_calls(getattr(operations, name), ids, args.warmup))
+    results.add(prefix + '/has_border', time_repeated(operations.has_border, args.repeats, args.warmup))
+    results.add(prefix + '/find_border_edges',
+                time_repeated(operations.find_border_edges, args.repeats, args.warmup))
+    results.add(prefix + '/find_topology', time_repeated(operations.find_topology, args.repeats, args.warmup))
+    points = [operations.get_vertex(vertex_id) for vertex_id in vertex_ids]
+    radius = operations.spatial_index().cell_size
+    results.add(prefix + '/find_nearest_vertices',
+                time_repeated(lambda: operations.find_nearest_vertices(points), args.repeats, args.warmup))
+    results.add(prefix + '/find_vertices_within',
+                time_repeated(lambda: operations.find_vertices_within(points, radius), args.repeats, args.warmup))
+    for k in _RINGS_DEPTHS:
+        results.add('%s/find_vertices_rings_%d' % (prefix, k),
+                    time_repeated(lambda: operations.find_vertices_rings(vertex_ids, k), args.repeats, args.warmup))
+        results.add('%s/find_faces_rings_%d' % (prefix, k),
+                    time_repeated(lambda: operations.find_faces_rings(face_ids, k), args.repeats, args.warmup))
+
+    # flips change the mesh, so they go last and are not warmed up
+    pairs = _adjacent_pairs(operations, face_ids)
+    results.add(prefix + '/flip_faces', time_calls(lambda pair: operations.flip_faces(*pair), pairs, 0))
+    # whole Delaunay pass of the bulk driver, as time per flip (inverse of its flips per second)
+    report = operations.flip_edges(None, delaunay_predicate(operations))
+    if report.flips:
+        results.add(prefix + '/flip_edges_delaunay', [report.seconds / report.flips])
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_common_arguments(parser)
+    args = parser.parse_args(argv)
+    results = BenchmarkResults()
+    for filename in args.meshes or default_meshes():
+        for backend in available_backends():
+            try:
+                bench_backend(results, backend, filename, args)
+            except ValueError as e:  # mesh is not supported by the backend (e.g. not manifold)
+                print('skipping %s on %s: %s' % (backend.__name__, mesh_name(filename), e), file=sys.stderr)
+    if args.output:
+        results.save(args.output)
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
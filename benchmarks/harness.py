@@ -0,0 +1,169 @@
+# coding: utf-8
+from __future__ import print_function, division
+
+import json
+import os
+import platform
+import sys
+from timeit import default_timer
+
+import numpy as np
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+_PERCENTILES = [10, 50, 90, 99]
+
+
+def time_calls(function, arguments, warmup):
+    """
+    Times function once for every element of arguments (after warmup calls with the first ones).
+
+    :param function: function to benchmark (takes single argument)
+    :param arguments: arguments for consecutive calls
+    :type arguments: list
+    :param warmup: amount of not measured calls before the measured ones
+    :type warmup: int
+    :return: timings in seconds
+    :rtype: list
+    """
+    for argument in arguments[:warmup]:
+        function(argument)
+    timings = []
+    for argument in arguments:
+        start = default_timer()
+        function(argument)
+        timings.append(default_timer() - start)
+    return timings
+
+
+def time_repeated(function, repeats, warmup):
+    """
+    Times function called repeats times without arguments (after warmup calls).
+
+    :param function: function to benchmark
+    :param repeats: amount of measured calls
+    :type repeats: int
+    :param warmup: amount of not measured calls before the measured ones
+    :type warmup: int
+    :return: timings in seconds
+    :rtype: list
+    """
+    return time_calls(lambda _: function(), [None] * repeats, warmup)
+
+
+def summarize(timings):
+    """
+    Returns statistics of timings: median, percentiles, min, mean and amount of runs.
+
+    :param timings: timings in seconds
+    :type timings: list
+    :rtype: dict
+    """
+    timings = np.asarray(timings, dtype=np.float64)
+    summary = dict(('p%d' % p, float(v)) for p, v in zip(_PERCENTILES, np.percentile(timings, _PERCENTILES)))
+    summary['median'] = summary['p50']
+    summary['min'] = float(timings.min())
+    summary['mean'] = float(timings.mean())
+    summary['runs'] = len(timings)
+    return summary
+
+
+class BenchmarkResults(object):
+    """
+    Collects summaries of benchmarks (identified by slash separated names) and stores them as JSON.
+    """
+
+    def __init__(self, results=None, meta=None):
+        self.results = results if results is not None else {}
+        self.meta = meta if meta is not None else {
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+        }
+
+    def add(self, name, timings):
+        summary = summarize(timings)
+        self.results[name] = summary
+        print('%-90s median %.6f s  p90 %.6f s  (%d runs)' % (name, summary['median'], summary['p90'],
+                                                                summary['runs']))
+        sys.stdout.flush()
+
+    def update(self, other):
+        self.results.update(other.results)
+
+    def save(self, filename):
+        with open(filename, 'w') as f:
+            json.dump({'meta': self.meta, 'results': self.results}, f, indent=2, sort_keys=True)
+
+    @staticmethod
+    def load(filename):
+        with open(filename) as f:
+            contents = json.load(f)
+        return BenchmarkResults(contents['results'], contents['meta'])
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares medians of results with the baseline ones.
+
+    :param results: current results
+    :type results: BenchmarkResults
+    :param baseline: stored results
+    :type baseline: BenchmarkResults
+    :param tolerance: allowed relative slow down (e.g. 0.2 means 20%)
+    :type tolerance: float
+    :return: regressions: list of (name, baseline median, current median)
+    :rtype: list
+    """
+    regressions = []
+    for name in sorted(set(results.results) & set(baseline.results)):
+        old = baseline.results[name]['median']
+        new = results.results[name]['median']
+        ratio = new / old if old > 0 else float('inf')
+        marker = 'REGRESSION' if ratio > 1 + tolerance else ''
+        print('%-90s %10.6f -> %10.6f s  x%.2f %s' % (name, old, new, ratio, marker))
+        if marker:
+            regressions.append((name, old, new))
+    return regressions
+
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_EXTERNAL_MESHES = ['Armadillo', 'HappyBuddha', 'Bunny']
+_BUNDLED_MESHES = ['Bunny', 'horse', 'cube']
+
+
+def default_meshes():
+    """
+    Returns meshes used when none are given: the external ones (data/Armadillo.off etc.) if present,
+    meshes bundled with vertex_clustering otherwise.
+
+    :rtype: list
+    """
+    external = []
+    for directory in ['data', os.path.join('basic_mesh_operations', 'data')]:
+        for name in _EXTERNAL_MESHES:
+            path = os.path.join(ROOT_DIRECTORY, directory, '%s.off' % name)
+            if os.path.exists(path):
+                external.append(path)
+    if external:
+        return external
+    return [os.path.join(ROOT_DIRECTORY, 'vertex_clustering', 'data', '%s.off' % name) for name in _BUNDLED_MESHES]
+
+
+def mesh_name(filename):
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def add_common_arguments(parser):
+    """
+    Adds arguments shared by all benchmark suites to argparse parser.
+    """
+    parser.add_argument('--meshes', nargs='+', default=None, help='input meshes (.off or .obj)')
+    parser.add_argument('--repeats', type=int, default=5, help='measured runs of whole mesh operations')
+    parser.add_argument('--queries', type=int, default=200, help='random ids used for every query operation')
+    parser.add_argument('--warmup', type=int, default=1, help='not measured runs before the measured ones')
+    parser.add_argument('--seed', type=int, default=0, help='seed of random query ids')
+    parser.add_argument('--epsilon-fraction', type=float, default=0.01,
+                        help='clustering epsilon as a fraction of mesh bounding box diagonal')
+    parser.add_argument('--output', default=None, help='JSON file to write results to')
@@ -0,0 +1,89 @@
+# coding: utf-8
+"""
+Runs benchmark suites, stores their results as JSON and compares them with a baseline.
+
+Every suite runs in a separate process (both packages have own mesh_loader module).
+Exits with status 1 if any median is slower than the baseline one by more than the tolerance.
+
+Examples:
+
+    python benchmarks/run.py --output baseline.json
+    python benchmarks/run.py --meshes data/Armadillo.off --baseline baseline.json --tolerance 0.1
+    python benchmarks/run.py --synthetic 10000 100000 1000000 --synthetic-kinds torus --suites clustering
+"""
+from __future__ import print_function, division
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from harness import BenchmarkResults, add_common_arguments, compare, default_meshes
+from synthetic_meshes import ensure_synthetic, generators
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+_SUITES = {
+    'operations': 'bench_operations.py',
+    'clustering': 'bench_clustering.py'
+}
+
+
+def run_suite(suite, suite_arguments):
+    """
+    Runs suite's script in a subprocess and returns its results.
+
+    :rtype: BenchmarkResults
+    """
+    handle, output = tempfile.mkstemp(suffix='.json')
+    os.close(handle)
+    try:
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), _SUITES[suite])
+        subprocess.check_call([sys.executable, script, '--output', output] + suite_arguments)
+        return BenchmarkResults.load(output)
+    finally:
+        os.remove(output)
+
+
+def _suite_arguments(args, meshes):
+    arguments = ['--repeats', str(args.repeats), '--queries', str(args.queries), '--warmup', str(args.warmup),
+                 '--seed', str(args.seed), '--epsilon-fraction', repr(args.epsilon_fraction)]
+    return arguments + ['--meshes'] + [os.path.abspath(filename) for filename in meshes]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_common_arguments(parser)
+    parser.add_argument('--suites', nargs='+', choices=sorted(_SUITES), default=sorted(_SUITES),
+                        help='suites to run')
+    parser.add_argument('--baseline', default=None, help='JSON results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative slow down of medians (default: 0.2)')
+    parser.add_argument('--synthetic', nargs='+', type=int, default=[], metavar='FACES',
+                        help='also benchmark synthetic meshes of these sizes (default meshes are used only without any)')
+    parser.add_argument('--synthetic-kinds', nargs='+', choices=sorted(generators), default=sorted(generators))
+    parser.add_argument('--synthetic-directory', default=os.path.join(tempfile.gettempdir(), 'synthetic_meshes'),
+                        help='directory of generated meshes (they are reused between runs)')
+    args = parser.parse_args(argv)
+
+    meshes = list(args.meshes or [])
+    if args.synthetic:
+        meshes += ensure_synthetic(args.synthetic_directory, args.synthetic_kinds, args.synthetic, args.seed)
+    meshes = meshes or default_meshes()
+
+    results = BenchmarkResults()
+    for suite in args.suites:
+        results.update(run_suite(suite, _suite_arguments(args, meshes)))
+    if args.output:
+        results.save(args.output)
+    if args.baseline:
+        regressions = compare(results, BenchmarkResults.load(args.baseline), args.tolerance)
+        if regressions:
+            print('%d regression(s) above %.0f%% tolerance' % (len(regressions), 100 * args.tolerance))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
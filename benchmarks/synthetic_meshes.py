@@ -0,0 +1,204 @@
+# coding: utf-8
+"""
+Generates deterministic (seeded) synthetic triangle meshes of chosen sizes for scaling benchmarks.
+
+Kinds of meshes:
+
+* icosphere - closed, subdivided icosahedron (20 * 4^n faces, nearest to the requested amount)
+
+* torus - closed, 2 * m * n faces
+
+* heightfield - open, noisy height field over a regular grid, 2 * (n - 1) * (m - 1) faces
+
+Vertices are displaced by seeded noise (relative to the edge length), so they are not aligned to any grid.
+
+Example:
+
+    python benchmarks/synthetic_meshes.py torus 1000000 torus.off --seed 1
+"""
+from __future__ import print_function, division
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from harness import ROOT_DIRECTORY
+
+sys.path.insert(0, os.path.join(ROOT_DIRECTORY, 'vertex_clustering'))
+
+from mesh_writer import writer_for_filename
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+_GOLDEN_RATIO = (1 + 5 ** 0.5) / 2
+_ICOSAHEDRON_VERTICES = np.array([
+    [-1, _GOLDEN_RATIO, 0], [1, _GOLDEN_RATIO, 0], [-1, -_GOLDEN_RATIO, 0], [1, -_GOLDEN_RATIO, 0],
+    [0, -1, _GOLDEN_RATIO], [0, 1, _GOLDEN_RATIO], [0, -1, -_GOLDEN_RATIO], [0, 1, -_GOLDEN_RATIO],
+    [_GOLDEN_RATIO, 0, -1], [_GOLDEN_RATIO, 0, 1], [-_GOLDEN_RATIO, 0, -1], [-_GOLDEN_RATIO, 0, 1]
+])
+_ICOSAHEDRON_FACES = np.array([
+    [0, 11, 5], [0, 5, 1], [0, 1, 7], [0, 7, 10], [0, 10, 11], [1, 5, 9], [5, 11, 4], [11, 10, 2], [10, 7, 6],
+    [7, 1, 8], [3, 9, 4], [3, 4, 2], [3, 2, 6], [3, 6, 8], [3, 8, 9], [4, 9, 5], [2, 4, 11], [6, 2, 10],
+    [8, 6, 7], [9, 8, 1]
+])
+_HEIGHTFIELD_WAVES = 8
+
+
+def _normalized(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1)[:, np.newaxis]
+
+
+def _grid_faces(rows, columns, wrap_rows, wrap_columns):
+    """
+    Triangulates grid of rows x columns vertices (vertex (i, j) has id i * columns + j),
+    optionally connecting the last row (column) with the first one.
+    """
+    i, j = np.meshgrid(np.arange(rows if wrap_rows else rows - 1),
+                       np.arange(columns if wrap_columns else columns - 1), indexing='ij')
+    i, j = i.ravel(), j.ravel()
+    next_i = (i + 1) % rows
+    next_j = (j + 1) % columns
+    a = i * columns + j
+    b = next_i * columns + j
+    c = next_i * columns + next_j
+    d = i * columns + next_j
+    return np.stack([np.stack([a, b, c], axis=1), np.stack([a, c, d], axis=1)], axis=1).reshape((-1, 3))
+
+
+def _subdivide_sphere(vertices, faces):
+    """
+    Splits every face into four (new vertices are edges' midpoints projected onto unit sphere).
+    """
+    vertices_amount = len(vertices)
+    starts = faces.T.ravel()
+    ends = faces[:, [1, 2, 0]].T.ravel()
+    keys = np.minimum(starts, ends) * vertices_amount + np.maximum(starts, ends)
+    unique_keys, midpoints = np.unique(keys, return_inverse=True)
+    midpoints = midpoints.reshape((3, -1)) + vertices_amount
+    new_vertices = _normalized(vertices[unique_keys // vertices_amount] + vertices[unique_keys % vertices_amount])
+    m01, m12, m20 = midpoints
+    a, b, c = faces.T
+    new_faces = np.stack([np.stack([a, m01, m20], axis=1), np.stack([b, m12, m01], axis=1),
+                          np.stack([c, m20, m12], axis=1), np.stack([m01, m12, m20], axis=1)], axis=1)
+    return np.concatenate([vertices, new_vertices]), new_faces.reshape((-1, 3))
+
+
+def icosphere(faces_amount, seed=0, noise=0.1):
+    """
+    Returns unit icosphere with 20 * 4^n faces (n chosen to be the nearest to faces_amount).
+
+    :param faces_amount: requested amount of faces
+    :param seed: seed of the noise
+    :param noise: amplitude of radial noise relative to the edge length
+    :return vertices array (N, 3), faces array (F, 3)
+    :rtype np.ndarray, np.ndarray
+    """
+    subdivisions = max(0, int(round(np.log(max(faces_amount, 20) / 20) / np.log(4))))
+    vertices = _normalized(_ICOSAHEDRON_VERTICES.astype(np.float64))
+    faces = _ICOSAHEDRON_FACES.astype(np.int64)
+    for _ in range(subdivisions):
+        vertices, faces = _subdivide_sphere(vertices, faces)
+    edge_length = 1.1 / 2 ** subdivisions
+    radii = 1 + noise * edge_length * np.random.RandomState(seed).uniform(-1, 1, len(vertices))
+    return vertices * radii[:, np.newaxis], faces
+
+
+def torus(faces_amount, seed=0, noise=0.1, major_radius=1.0, minor_radius=0.3):
+    """
+    Returns torus with 2 * m * n faces (m = 2n segments around the axis, n around the tube).
+
+    :param faces_amount: requested amount of faces
+    :param seed: seed of the noise
+    :param noise: amplitude of noise (along tube's normals) relative to the edge length
+    :return vertices array (N, 3), faces array (F, 3)
+    :rtype np.ndarray, np.ndarray
+    """
+    tube_segments = max(3, int(round((faces_amount / 4) ** 0.5)))
+    axis_segments = 2 * tube_segments
+    u, v = np.meshgrid(np.linspace(0, 2 * np.pi, axis_segments, endpoint=False),
+                       np.linspace(0, 2 * np.pi, tube_segments, endpoint=False), indexing='ij')
+    u, v = u.ravel(), v.ravel()
+    edge_length = 2 * np.pi * minor_radius / tube_segments
+    radii = minor_radius + noise * edge_length * np.random.RandomState(seed).uniform(-1, 1, len(u))
+    vertices = np.stack([(major_radius + radii * np.cos(v)) * np.cos(u),
+                         (major_radius + radii * np.cos(v)) * np.sin(u),
+                         radii * np.sin(v)], axis=1)
+    return vertices, _grid_faces(axis_segments, tube_segments, True, True)
+
+
+def heightfield(faces_amount, seed=0, noise=0.1):
+    """
+    Returns height field over [0, 1] x [0, 1] with 2 * (n - 1)^2 faces: sum of random waves plus noise.
+
+    :param faces_amount: requested amount of faces
+    :param seed: seed of the waves and the noise
+    :param noise: amplitude of noise relative to the edge length
+    :return vertices array (N, 3), faces array (F, 3)
+    :rtype np.ndarray, np.ndarray
+    """
+    side = max(2, int(round((faces_amount / 2) ** 0.5)) + 1)
+    random_state = np.random.RandomState(seed)
+    x, y = np.meshgrid(np.linspace(0, 1, side), np.linspace(0, 1, side), indexing='ij')
+    x, y = x.ravel(), y.ravel()
+    z = np.zeros(len(x))
+    for frequency_x, frequency_y, phase, amplitude in random_state.uniform(0, 1, (_HEIGHTFIELD_WAVES, 4)):
+        z += 0.05 * amplitude * np.sin(2 * np.pi * (4 * frequency_x * x + 4 * frequency_y * y + phase))
+    z += noise / (side - 1) * random_state.uniform(-1, 1, len(z))
+    return np.stack([x, y, z], axis=1), _grid_faces(side, side, False, False)
+
+
+generators = {
+    'icosphere': icosphere,
+    'torus': torus,
+    'heightfield': heightfield
+}
+
+
+def synthetic_filename(directory, kind, faces_amount, seed, extension='.off'):
+    return os.path.join(directory, '%s_%d_%d%s' % (kind, faces_amount, seed, extension))
+
+
+def write_synthetic(kind, faces_amount, filename, seed=0, noise=0.1):
+    """
+    Generates mesh and writes it to file (format is chosen by extension: .off, .obj or .ply).
+    """
+    vertices, faces = generators[kind](faces_amount, seed=seed, noise=noise)
+    writer_for_filename(filename).write(vertices, faces)
+    return len(vertices), len(faces)
+
+
+def ensure_synthetic(directory, kinds, faces_amounts, seed=0):
+    """
+    Returns filenames of synthetic meshes of all kinds and sizes, generating only the missing ones
+    (generation is deterministic, so existing files are reused).
+
+    :rtype: list
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    filenames = []
+    for kind in kinds:
+        for faces_amount in faces_amounts:
+            filename = synthetic_filename(directory, kind, faces_amount, seed)
+            if not os.path.exists(filename):
+                write_synthetic(kind, faces_amount, filename, seed)
+            filenames.append(filename)
+    return filenames
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('kind', choices=sorted(generators))
+    parser.add_argument('faces', type=int, help='requested amount of faces')
+    parser.add_argument('output', help='output mesh filename (.off, .obj or .ply)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--noise', type=float, default=0.1, help='noise amplitude relative to the edge length')
+    args = parser.parse_args(argv)
+    vertices_amount, faces_amount = write_synthetic(args.kind, args.faces, args.output, args.seed, args.noise)
+    print('%s: %d vertices, %d faces' % (args.output, vertices_amount, faces_amount))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,103 @@
+# coding: utf-8
+"""
+Bulk conversions between numpy arrays and CGAL Polyhedron_3.
+
+Both directions go through a temporary OFF file, which is written and parsed in bulk on the numpy side
+and read and written in C++ on the CGAL side, so no Python code runs per vertex or per face.
+Coordinates are written by numpy with %r (the shortest text parsed back to the same double)
+and by CGAL with 17 significant digits, so they survive both directions without loss.
+"""
+import os
+import tempfile
+
+import numpy as np
+
+try:
+    from CGAL.CGAL_Polyhedron_3 import Polyhedron_3
+except ImportError:  # CGAL is needed only by the conversions themselves
+    Polyhedron_3 = None
+
+from mesh_loader import OffLoader
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+_ROWS_PER_CHUNK = 1 << 16
+_CGAL_PRECISION = 17  # digits needed to write doubles without loss
+
+
+def _require_cgal():
+    if Polyhedron_3 is None:
+        raise ImportError("CGAL bindings are required to convert polyhedra!")
+
+
+def _write_rows(f, row_format, rows):
+    for start in range(0, len(rows), _ROWS_PER_CHUNK):
+        chunk = rows[start:start + _ROWS_PER_CHUNK]
+        f.write((row_format * len(chunk)) % tuple(chunk.ravel().tolist()))
+
+
+def _temporary_off():
+    handle, filename = tempfile.mkstemp(suffix='.off')
+    os.close(handle)
+    return filename
+
+
+def write_off(filename, vertices, faces):
+    """
+    Writes vertices array of shape (N, 3) and faces array of shape (F, 3) (indices start from 0) to OFF file,
+    with coordinates written without loss.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape((-1, 3))
+    faces = np.asarray(faces, dtype=np.int64).reshape((-1, 3))
+    with open(filename, 'w') as f:
+        f.write('OFF\n%d %d 0\n' % (len(vertices), len(faces)))
+        _write_rows(f, '%r %r %r\n', vertices)
+        _write_rows(f, '3 %d %d %d\n', faces)
+
+
+def point_coordinates(point):
+    """
+    Returns coordinates of CGAL point (without formatting it as a string).
+
+    :param point: point
+    :type point: Point_3
+    :rtype: tuple(float, float, float)
+    """
+    return point.x(), point.y(), point.z()
+
+
+def polyhedron_from_arrays(vertices, faces):
+    """
+    Builds polyhedron from vertices array of shape (N, 3) and faces array of shape (F, 3) (indices start from 0).
+
+    Vertices and facets of the polyhedron are in the same order as in the arrays.
+
+    :rtype: Polyhedron_3
+    """
+    _require_cgal()
+    filename = _temporary_off()
+    try:
+        write_off(filename, vertices, faces)
+        return Polyhedron_3(filename)
+    finally:
+        os.remove(filename)
+
+
+def polyhedron_to_arrays(polyhedron):
+    """
+    Extracts vertices array of shape (N, 3) and faces array of shape (F, 3) (indices start from 0)
+    of triangle polyhedron.
+
+    Rows are in order of polyhedron.vertices() and polyhedron.facets(); every face starts
+    from the target of its facet's halfedge().
+
+    :type polyhedron: Polyhedron_3
+    :rtype: np.ndarray, np.ndarray
+    """
+    _require_cgal()
+    filename = _temporary_off()
+    try:
+        polyhedron.write_to_file(filename, _CGAL_PRECISION)
+        return OffLoader(filename).to_arrays()
+    finally:
+        os.remove(filename)
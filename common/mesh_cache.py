@@ -0,0 +1,124 @@
+# coding: utf-8
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from mesh_loader import ObjLoader, OffLoader
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+CACHE_DIRECTORY_VARIABLE = 'MESH_CACHE_DIR'
+_CACHE_DIRECTORY_NAME = '.mesh_cache'
+_KEY_LENGTH = 16
+
+
+def loader_for_filename(filename):
+    if filename.endswith('.obj'):
+        return ObjLoader(filename)
+    elif filename.endswith('.off'):
+        return OffLoader(filename)
+    raise ValueError("Supporting only .obj and .off files!")
+
+
+def _load_array(filename):
+    try:
+        return np.load(filename, mmap_mode='r')
+    except ValueError:  # empty arrays cannot be memory-mapped
+        return np.load(filename)
+
+
+class MeshCache(object):
+    """
+    Binary sidecar cache of parsed mesh arrays (and of arrays derived from them, like adjacency tables).
+
+    Arrays are stored as .npy files in <cache directory>/<mesh filename>-<key>, where key depends on
+    the mesh file's absolute path, size and modification time (so modified files are parsed again).
+    They are loaded memory-mapped and read-only, so loading is almost instant and processes share the same pages.
+
+    Cache directory is taken from MESH_CACHE_DIR environment variable (empty value disables caching),
+    .mesh_cache next to the mesh file is used by default. If it is not writable, mesh is just parsed.
+    """
+
+    def __init__(self, filename, directory=None):
+        self.filename = filename
+        if directory is None:
+            directory = os.environ.get(CACHE_DIRECTORY_VARIABLE)
+        if directory is None:
+            directory = os.path.join(os.path.dirname(os.path.abspath(filename)), _CACHE_DIRECTORY_NAME)
+        self.directory = directory
+        self.path = None
+        if directory:
+            stat = os.stat(filename)
+            source = '%s\0%d\0%r' % (os.path.abspath(filename), stat.st_size, stat.st_mtime)
+            key = hashlib.sha1(source.encode('utf-8')).hexdigest()[:_KEY_LENGTH]
+            self.path = os.path.join(directory, '%s-%s' % (os.path.basename(filename), key))
+
+    def arrays(self):
+        """
+        Returns vertices array of shape (N, 3) and faces array of shape (F, 3) (see AbstractMeshLoader.to_arrays),
+        parsing the mesh only if it is not cached yet.
+        :return vertices array (float), faces array (int)
+        :rtype np.ndarray, np.ndarray
+        """
+        arrays = self.derived('mesh', lambda: dict(zip(['vertices', 'faces'],
+                                                       loader_for_filename(self.filename).to_arrays())))
+        return arrays['vertices'], arrays['faces']
+
+    def derived(self, name, build):
+        """
+        Returns arrays stored in cache under name, building (and storing) them if they are not cached yet.
+
+        :param name: name of the arrays group
+        :type name: string
+        :param build: function returning dict of arrays (called only if they are not cached)
+        :return: dict of (read-only) arrays
+        :rtype: dict
+        """
+        arrays = self._load(name)
+        if arrays is None:
+            arrays = build()
+            self._store(name, arrays)
+        return arrays
+
+    def _load(self, name):
+        if self.path is None:
+            return None
+        try:
+            with open(os.path.join(self.path, name + '.json')) as f:
+                names = json.load(f)
+            return dict((array_name, _load_array(os.path.join(self.path, '%s.%s.npy' % (name, array_name))))
+                        for array_name in names)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _store(self, name, arrays):
+        if self.path is None:
+            return
+        try:
+            if not os.path.isdir(self.path):
+                self._remove_stale_sidecars()
+                os.makedirs(self.path)
+            for array_name, array in arrays.items():
+                self._write_atomically('%s.%s.npy' % (name, array_name), lambda f: np.save(f, array))
+            # the list of arrays is written last, so incomplete groups are never loaded
+            self._write_atomically(name + '.json', lambda f: f.write(json.dumps(sorted(arrays)).encode('utf-8')))
+        except (IOError, OSError):
+            pass
+
+    def _write_atomically(self, filename, write):
+        handle, temporary_filename = tempfile.mkstemp(dir=self.path)
+        with os.fdopen(handle, 'wb') as f:
+            write(f)
+        os.rename(temporary_filename, os.path.join(self.path, filename))
+
+    def _remove_stale_sidecars(self):
+        prefix = os.path.basename(self.filename) + '-'
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.listdir(self.directory):
+            if entry.startswith(prefix) and len(entry) == len(prefix) + _KEY_LENGTH:
+                shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
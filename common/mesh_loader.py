@@ -0,0 +1,339 @@
+# coding: utf-8
+
+from __future__ import print_function
+
+import itertools
+import re
+
+import numpy as np
+
+try:
+    from CGAL.CGAL_Polyhedron_3 import Polyhedron_3
+except ImportError:  # CGAL is needed only for to_polyhedron
+    Polyhedron_3 = None
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+_COMMENT_RE = re.compile(r'#[^\n]*')
+_OFF_HEADER_RE = re.compile(r'\s*(?:OFF)?\s*(\d+)\s+(\d+)\s+(\d+)')
+_OBJ_VERTEX_RE = re.compile(r'^[ \t]*v[ \t]+([^\n]*)', re.MULTILINE)
+_OBJ_FACE_RE = re.compile(r'^[ \t]*f[ \t]+([^\n]*)', re.MULTILINE)
+_OBJ_FACE_ATTRIBUTES_RE = re.compile(r'/\S*')
+_LINES_PER_CHUNK = 1 << 16
+
+
+def _parse_numbers(text, dtype):
+    """
+    Parses whitespace separated numbers in bulk.
+
+    :param text: text containing only numbers and whitespace
+    :param dtype: numpy type of the result
+    :return: flat array of parsed numbers
+    :rtype: np.ndarray
+    """
+    if not text.strip():  # np.fromstring parses whitespace only text as [-1]
+        return np.zeros(0, dtype=dtype)
+    return np.fromstring(text, dtype=dtype, sep=' ')
+
+
+def _tokens_per_line(text, lines_amount):
+    """
+    Counts whitespace separated tokens of every line of text (lines are separated by single newlines).
+    """
+    characters = np.frombuffer(text.encode('utf-8'), dtype=np.uint8)
+    blank = (characters == ord(' ')) | (characters == ord('\t')) | (characters == ord('\r'))
+    newline = characters == ord('\n')
+    separator = blank | newline
+    token_starts = ~separator
+    token_starts[1:] &= separator[:-1]
+    lines = np.cumsum(newline)
+    return np.bincount(lines[token_starts], minlength=lines_amount)
+
+
+def _parse_lines(lines, dtype):
+    """
+    Parses whitespace separated numbers of lines in bulk.
+
+    :param lines: lines containing only numbers and whitespace, joined with newlines
+    :type lines: string
+    :param dtype: numpy type of the result
+    :return: flat array of parsed numbers, amount of numbers in every line
+    :rtype: np.ndarray, np.ndarray
+    """
+    counts = _tokens_per_line(lines, lines.count('\n') + 1) if lines else np.zeros(0, dtype=np.int64)
+    values = _parse_numbers(lines, dtype)
+    if values.size != counts.sum():  # np.fromstring silently stops at the first malformed number
+        line = np.searchsorted(np.cumsum(counts), values.size, side='right')
+        raise ValueError("Malformed number in line: %s" % lines.split('\n')[line])
+    return values, counts
+
+
+def _obj_vertices(values, counts):
+    """
+    Converts numbers of OBJ vertex lines to (N, 3) array; numbers after x, y, z (w or colors) are ignored.
+    """
+    if counts.size and counts.min() < 3:
+        raise ValueError("Vertices must have x, y and z coordinates!")
+    if np.all(counts == 3):
+        return values.reshape((-1, 3))
+    starts = np.cumsum(counts) - counts
+    return values[starts[:, np.newaxis] + np.arange(3)]
+
+
+def _obj_triangles(values, counts):
+    """
+    Converts numbers of OBJ face lines to (F, 3) array (indices start from 0); polygons are split into triangles
+    fanned around their first vertex.
+    """
+    if counts.size and counts.min() < 3:
+        raise ValueError("Faces must have at least 3 vertices!")
+    if np.all(counts == 3):
+        return values.reshape((-1, 3)) - 1
+    triangles_counts = counts - 2
+    firsts = np.repeat(np.cumsum(counts) - counts, triangles_counts)
+    fan_positions = np.arange(len(firsts)) - np.repeat(np.cumsum(triangles_counts) - triangles_counts,
+                                                       triangles_counts)
+    return np.stack([values[firsts], values[firsts + fan_positions + 1], values[firsts + fan_positions + 2]],
+                    axis=1) - 1
+
+
+def _read_chunks(f, lines_per_chunk):
+    """
+    Yields text of consecutive chunks of lines_per_chunk lines of opened file.
+    """
+    while True:
+        lines = list(itertools.islice(f, lines_per_chunk))
+        if not lines:
+            return
+        yield ''.join(lines)
+
+
+def _require_cgal():
+    if Polyhedron_3 is None:
+        raise ImportError("CGAL bindings are required to build polyhedron!")
+
+
+def _triangles_from_off_block(values, faces_amount):
+    """
+    Converts flat OFF faces block (``n i j k`` rows) to (F, 3) array.
+
+    :param values: flat array of face block numbers
+    :param faces_amount: expected amount of faces
+    :return: faces array
+    :rtype: np.ndarray
+    """
+    if values.size != 4 * faces_amount:
+        raise ValueError("Only triangle meshes are supported by the array loader!")
+    values = values.reshape((faces_amount, 4))
+    if np.any(values[:, 0] != 3):
+        raise ValueError("Only triangle meshes are supported by the array loader!")
+    return np.ascontiguousarray(values[:, 1:])
+
+
+class AbstractMeshLoader(object):
+    def __init__(self, filename):
+        self.filename = filename
+
+    def to_polyhedron(self):
+        """
+        Returns CGAL polyhedron representation of the object
+        :return CGAL polyhedron
+        :rtype Polyhedron_3
+        """
+        raise NotImplementedError()
+
+    def to_vertices_and_faces(self):
+        """
+        Returns vertices list and faces list.
+        :return vertices list, faces list
+        :rtype list, list
+        """
+        raise NotImplementedError()
+
+    def to_arrays(self):
+        """
+        Returns vertices array of shape (N, 3) and faces array of shape (F, 3).
+
+        Unlike to_vertices_and_faces, indices start from 0 and there is no padding.
+        Only triangle meshes are supported (polygons of OBJ files are split into triangles,
+        fanned around their first vertex).
+        :return vertices array (float), faces array (int)
+        :rtype np.ndarray, np.ndarray
+        """
+        raise NotImplementedError()
+
+    def iter_arrays(self, lines_per_chunk=_LINES_PER_CHUNK):
+        """
+        Reads file chunk by chunk (in a single pass, without keeping it in memory)
+        and yields its vertices and faces in order of the file.
+
+        Faces reference only already yielded vertices. Indices start from 0, faces are triangles like in to_arrays.
+        :param lines_per_chunk: amount of lines of file parsed at once
+        :return generator of ('vertices', array of shape (n, 3)) and ('faces', array of shape (m, 3))
+        """
+        raise NotImplementedError()
+
+
+class ObjLoader(AbstractMeshLoader):
+    def __init__(self, filename):
+        super(ObjLoader, self).__init__(filename)
+        self._vertices = None
+        self._faces = None
+
+    @property
+    def vertices(self):
+        if self._vertices is None:
+            self._read_lists()
+        return self._vertices
+
+    @property
+    def faces(self):
+        if self._faces is None:
+            self._read_lists()
+        return self._faces
+
+    # noinspection PyTypeChecker
+    def _read_lists(self):
+        self._vertices = [None]
+        self._faces = [None]
+        with open(self.filename) as f:
+            for line in f:
+                line_contents = line.strip()
+                if line_contents.startswith('#'):
+                    continue
+                line_contents = line_contents.split()
+                if not line_contents:
+                    continue
+                if line_contents[0] == "v":
+                    self._vertices.append([float(x) for x in line_contents[1:]])
+                if line_contents[0] == "f":
+                    self._faces.append([int(x) for x in line_contents[1:]])
+
+    def to_vertices_and_faces(self):
+        return self.vertices, self.faces
+
+    def to_arrays(self):
+        with open(self.filename) as f:
+            contents = f.read()
+        return self._parse_block(contents)
+
+    @staticmethod
+    def _parse_block(text):
+        vertices = _obj_vertices(*_parse_lines('\n'.join(_OBJ_VERTEX_RE.findall(text)), np.float64))
+        faces_lines = _OBJ_FACE_ATTRIBUTES_RE.sub('', '\n'.join(_OBJ_FACE_RE.findall(text)))
+        return vertices, _obj_triangles(*_parse_lines(faces_lines, np.int64))
+
+    def iter_arrays(self, lines_per_chunk=_LINES_PER_CHUNK):
+        with open(self.filename) as f:
+            for text in _read_chunks(f, lines_per_chunk):
+                # faces reference only earlier vertices, so chunk's vertices may be yielded before its faces
+                vertices, faces = self._parse_block(text)
+                if vertices.size:
+                    yield 'vertices', vertices
+                if faces.size:
+                    yield 'faces', faces
+
+    def to_polyhedron(self):
+        _require_cgal()
+        from cgal_bridge import polyhedron_from_arrays  # imported here, since cgal_bridge uses this module
+        return polyhedron_from_arrays(*self.to_arrays())
+
+
+class OffLoader(AbstractMeshLoader):
+    def __init__(self, filename):
+        super(OffLoader, self).__init__(filename)
+
+    def to_polyhedron(self):
+        _require_cgal()
+        return Polyhedron_3(self.filename)
+
+    # noinspection PyTypeChecker
+    def to_vertices_and_faces(self):
+        vertices = [None]
+        faces = [None]
+        with open(self.filename) as f:
+            read_amounts = False
+            vertices_amount = 0
+            vertices_read = 0
+            for line in f:
+                line_contents = line.strip()
+                if line_contents == 'OFF' or line_contents.startswith('#'):
+                    continue
+                line_contents = line_contents.split()
+                if not line_contents:
+                    continue
+                if not read_amounts:
+                    amounts = [int(x) for x in line_contents]
+                    vertices_amount = amounts[0]
+                    read_amounts = True
+                elif vertices_read < vertices_amount:
+                    vertices.append([float(x) for x in line_contents])
+                    vertices_read += 1
+                else:
+                    faces.append([int(x) + 1 for x in line_contents[1:]])
+        return vertices, faces
+
+    def to_arrays(self):
+        with open(self.filename) as f:
+            contents = f.read()
+        if '#' in contents:
+            contents = _COMMENT_RE.sub('', contents)
+        header = _OFF_HEADER_RE.match(contents)
+        if header is None:
+            raise ValueError("Missing OFF header in %s!" % self.filename)
+        vertices_amount, faces_amount = int(header.group(1)), int(header.group(2))
+        values = _parse_numbers(contents[header.end():], np.float64)
+        vertices = values[:3 * vertices_amount]
+        if vertices.size != 3 * vertices_amount:
+            raise ValueError("Unexpected end of file in %s!" % self.filename)
+        faces = _triangles_from_off_block(values[3 * vertices_amount:].astype(np.int64), faces_amount)
+        return vertices.reshape((vertices_amount, 3)), faces
+
+    def iter_arrays(self, lines_per_chunk=_LINES_PER_CHUNK):
+        with open(self.filename) as f:
+            header = None
+            header_text = ''
+            values = np.zeros(0)
+            vertices_values_left = faces_left = 0
+            for text in _read_chunks(f, lines_per_chunk):
+                if '#' in text:
+                    text = _COMMENT_RE.sub('', text)
+                if header is None:
+                    header_text += text
+                    header = _OFF_HEADER_RE.match(header_text)
+                    if header is None:
+                        if len(header_text.split()) < 4:  # header may span several (short) chunks
+                            continue
+                        raise ValueError("Missing OFF header in %s!" % self.filename)
+                    vertices_values_left, faces_left = 3 * int(header.group(1)), int(header.group(2))
+                    text = header_text[header.end():]
+                values = np.concatenate([values, _parse_numbers(text, np.float64)])
+                if vertices_values_left:
+                    taken = min(vertices_values_left, len(values) - len(values) % 3)
+                    if taken:
+                        yield 'vertices', values[:taken].reshape((-1, 3))
+                        values = values[taken:]
+                        vertices_values_left -= taken
+                if not vertices_values_left:
+                    faces_read = min(faces_left, len(values) // 4)
+                    if faces_read:
+                        yield 'faces', _triangles_from_off_block(values[:4 * faces_read].astype(np.int64), faces_read)
+                        values = values[4 * faces_read:]
+                        faces_left -= faces_read
+            if header is None or vertices_values_left or faces_left:
+                raise ValueError("Unexpected end of file in %s!" % self.filename)
+
+
+if __name__ == "__main__":
+    obj = ObjLoader("data/test1.obj")
+    obj_vertices, obj_faces = obj.to_vertices_and_faces()
+    obj_polyhedron = obj.to_polyhedron()
+    print(obj_vertices)
+    print(obj_faces)
+    print(obj_polyhedron)
+    off = OffLoader("data/test1.off")
+    off_vertices, off_faces = off.to_vertices_and_faces()
+    off_polyhedron = off.to_polyhedron()
+    print(off_vertices)
+    print(off_faces)
+    print(off_polyhedron)
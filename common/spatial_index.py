@@ -0,0 +1,217 @@
+# coding: utf-8
+"""
+Uniform hash grid over points, answering batched nearest neighbour and radius queries.
+
+Points are sorted by their cells once, so every cell is a contiguous segment of the sorted points and a query
+only looks at points of the cells around it. Queries are answered for many points at once, in chunks,
+with array operations only.
+"""
+from __future__ import division
+
+import numpy as np
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+_CANDIDATE_CELLS_PER_CHUNK = 1 << 18  # (query, cell) pairs looked up at once
+_BRUTE_FORCE_PAIRS_PER_CHUNK = 1 << 22  # (query, point) pairs compared at once
+_MAX_RINGS = 4  # rings of cells searched for nearest points, before comparing with all points
+_MAX_REACH = 4  # cells searched around queries within radius, before comparing with all points
+_POINTS_PER_CELL = 2.0
+
+
+def default_cell_size(points):
+    """
+    Returns cell size giving about _POINTS_PER_CELL points per occupied cell, for points lying on a surface
+    (area is estimated with the two largest extents of the bounding box).
+
+    :param points: points of shape (N, 3)
+    :type points: np.ndarray
+    :rtype: float
+    """
+    if len(points) == 0:
+        return 1.0
+    extents = np.sort(points.max(axis=0) - points.min(axis=0))
+    cell_size = np.sqrt(_POINTS_PER_CELL * extents[2] * extents[1] / len(points))
+    if cell_size == 0:
+        cell_size = _POINTS_PER_CELL * extents[2] / len(points)
+    return float(cell_size) if cell_size > 0 else 1.0
+
+
+def _shell(ring):
+    """
+    Returns offsets of cells in Chebyshev distance ring from the central cell, of shape (M, 3).
+    """
+    side = np.arange(-ring, ring + 1)
+    offsets = np.stack(np.meshgrid(side, side, side, indexing='ij'), axis=-1).reshape((-1, 3))
+    return offsets[np.abs(offsets).max(axis=1) == ring]
+
+
+def _chunks(amount, size):
+    for start in range(0, amount, max(1, size)):
+        yield start, min(start + max(1, size), amount)
+
+
+class SpatialGrid(object):
+    """
+    Uniform hash grid over points of shape (N, 3) (indices of returned points start from 0).
+
+    Distances are Euclidean; among points at the same distance, the one with the smallest index is the nearest.
+    The points are not copied, so they must not change while the grid is used.
+    """
+
+    def __init__(self, points, cell_size=None):
+        """
+        :param points: points of shape (N, 3)
+        :param cell_size: size of grid cells (by default chosen with default_cell_size)
+        """
+        self.points = np.asarray(points, dtype=np.float64).reshape((-1, 3))
+        self.cell_size = float(cell_size) if cell_size is not None else default_cell_size(self.points)
+        if self.cell_size <= 0:
+            raise ValueError("Cell size must be positive!")
+        cells = self._cells(self.points)
+        if len(cells):
+            self._origin = cells.min(axis=0)
+            self._shape = cells.max(axis=0) - self._origin + 1
+        else:
+            self._origin = np.zeros(3, dtype=np.int64)
+            self._shape = np.ones(3, dtype=np.int64)
+        if float(np.prod(self._shape.astype(np.float64))) >= 2 ** 62:
+            raise ValueError("Cell size is too small for the points' extent!")
+        keys = self._keys(cells - self._origin)
+        self._order = np.argsort(keys, kind='stable')
+        self._cell_keys, self._cell_starts = np.unique(keys[self._order], return_index=True)
+        self._cell_ends = np.append(self._cell_starts[1:], len(keys))
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cells(self, points):
+        with np.errstate(invalid='ignore'):
+            return np.floor(points / self.cell_size).astype(np.int64)
+
+    def _keys(self, cells):
+        return (cells[:, 0] * self._shape[1] + cells[:, 1]) * self._shape[2] + cells[:, 2]
+
+    def _query_cells(self, queries):
+        """
+        Returns cells of queries, relative to the grid's origin (they may lie outside of the grid).
+        """
+        return self._cells(queries) - self._origin
+
+    def _candidates(self, query_cells, offsets):
+        """
+        Returns (query, point) pairs for all points in cells query_cells[q] + offsets.
+
+        :return: queries (positions in query_cells), points indices
+        :rtype: np.ndarray, np.ndarray
+        """
+        cells = query_cells[:, np.newaxis, :] + offsets[np.newaxis, :, :]
+        inside = np.all((cells >= 0) & (cells < self._shape), axis=2)
+        queries = np.nonzero(inside)[0]
+        keys = self._keys(cells[inside])
+        positions = np.minimum(np.searchsorted(self._cell_keys, keys), len(self._cell_keys) - 1)
+        found = self._cell_keys[positions] == keys
+        queries, positions = queries[found], positions[found]
+        starts = self._cell_starts[positions]
+        counts = self._cell_ends[positions] - starts
+        first_pairs = np.cumsum(counts) - counts
+        pairs = np.arange(int(counts.sum())) - np.repeat(first_pairs, counts)
+        return np.repeat(queries, counts), self._order[np.repeat(starts, counts) + pairs]
+
+    def nearest(self, queries):
+        """
+        Finds the nearest point of every query point.
+
+        Rings of cells around every query are searched until no point outside of them can be nearer;
+        queries without an answer after _MAX_RINGS rings (far from all points) are compared with all points.
+
+        :param queries: query points of shape (Q, 3)
+        :type queries: np.ndarray
+        :return: indices of the nearest points (-1 if there are no points), distances to them
+        :rtype: np.ndarray, np.ndarray
+        """
+        queries = np.asarray(queries, dtype=np.float64).reshape((-1, 3))
+        best_indices = np.full(len(queries), -1, dtype=np.int64)
+        best_dist_sqr = np.full(len(queries), np.inf)
+        if len(self.points) == 0:
+            return best_indices, best_dist_sqr
+        query_cells = self._query_cells(queries)
+        active = np.arange(len(queries))
+        for ring in range(_MAX_RINGS + 1):
+            offsets = _shell(ring)
+            for start, end in _chunks(len(active), _CANDIDATE_CELLS_PER_CHUNK // len(offsets)):
+                chunk = active[start:end]
+                pairs_queries, pairs_points = self._candidates(query_cells[chunk], offsets)
+                self._update_nearest(queries, chunk[pairs_queries], pairs_points, best_indices, best_dist_sqr)
+            # points outside of searched rings are further than ring * cell_size
+            active = active[~(best_dist_sqr[active] < (ring * self.cell_size) ** 2)]
+            if len(active) == 0:
+                break
+        for start, end in _chunks(len(active), _BRUTE_FORCE_PAIRS_PER_CHUNK // len(self.points)):
+            chunk = active[start:end]
+            pairs_queries = np.repeat(chunk, len(self.points))
+            pairs_points = np.tile(np.arange(len(self.points)), len(chunk))
+            self._update_nearest(queries, pairs_queries, pairs_points, best_indices, best_dist_sqr)
+        return best_indices, np.sqrt(best_dist_sqr)
+
+    def _update_nearest(self, queries, pairs_queries, pairs_points, best_indices, best_dist_sqr):
+        if len(pairs_queries) == 0:
+            return
+        dist_sqr = np.sum((self.points[pairs_points] - queries[pairs_queries]) ** 2, axis=1)
+        order = np.lexsort((pairs_points, dist_sqr, pairs_queries))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = pairs_queries[order[1:]] != pairs_queries[order[:-1]]
+        order = order[first]
+        targets, indices, dist_sqr = pairs_queries[order], pairs_points[order], dist_sqr[order]
+        better = (dist_sqr < best_dist_sqr[targets]) | \
+                 ((dist_sqr == best_dist_sqr[targets]) & (indices < best_indices[targets]))
+        best_indices[targets[better]] = indices[better]
+        best_dist_sqr[targets[better]] = dist_sqr[better]
+
+    def within(self, queries, radius):
+        """
+        Finds all points in distance at most radius from every query point.
+
+        Cells within radius around every query are searched; if radius spans more than _MAX_REACH cells,
+        queries are compared with all points instead.
+
+        :param queries: query points of shape (Q, 3)
+        :type queries: np.ndarray
+        :param radius: radius of queries
+        :type radius: float
+        :return: offsets, points indices: points near queries[i] are indices[offsets[i]:offsets[i + 1]] (sorted)
+        :rtype: np.ndarray, np.ndarray
+        """
+        queries = np.asarray(queries, dtype=np.float64).reshape((-1, 3))
+        offsets = np.zeros(len(queries) + 1, dtype=np.int64)
+        if len(self.points) == 0 or radius < 0:
+            return offsets, np.zeros(0, dtype=np.int64)
+        found_queries = []
+        found_points = []
+        for pairs_queries, pairs_points in self._within_candidates(queries, radius):
+            dist_sqr = np.sum((self.points[pairs_points] - queries[pairs_queries]) ** 2, axis=1)
+            near = dist_sqr <= radius * radius
+            found_queries.append(pairs_queries[near])
+            found_points.append(pairs_points[near])
+        found_queries = np.concatenate(found_queries) if found_queries else np.zeros(0, dtype=np.int64)
+        found_points = np.concatenate(found_points) if found_points else np.zeros(0, dtype=np.int64)
+        order = np.lexsort((found_points, found_queries))
+        np.cumsum(np.bincount(found_queries, minlength=len(queries)), out=offsets[1:])
+        return offsets, found_points[order]
+
+    def _within_candidates(self, queries, radius):
+        """
+        Yields chunks of (query, point) pairs including all points within radius from queries.
+        """
+        reach = np.ceil(radius / self.cell_size)
+        if reach > _MAX_REACH:
+            for start, end in _chunks(len(queries), _BRUTE_FORCE_PAIRS_PER_CHUNK // len(self.points)):
+                yield np.repeat(np.arange(start, end), len(self.points)), \
+                    np.tile(np.arange(len(self.points)), end - start)
+            return
+        side = np.arange(-int(reach), int(reach) + 1)
+        cube = np.stack(np.meshgrid(side, side, side, indexing='ij'), axis=-1).reshape((-1, 3))
+        query_cells = self._query_cells(queries)
+        for start, end in _chunks(len(queries), _CANDIDATE_CELLS_PER_CHUNK // len(cube)):
+            pairs_queries, pairs_points = self._candidates(query_cells[start:end], cube)
+            yield pairs_queries + start, pairs_points
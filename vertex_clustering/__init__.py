@@ -1,5 +1,11 @@
 # coding: utf-8
 
-from main import cluster_mesh
+import common_path  # makes shared modules importable
+from epsilon_search import EpsilonSearch
+from main import cluster_mesh, cluster_mesh_lod
+from session import ClusteringSession
+from spatial_index import SpatialGrid
+from stats import ClusteringStats
+from streaming import cluster_mesh_streaming
 
 __author__ = "Michał Ciołczyk, Michał Janczykowski"
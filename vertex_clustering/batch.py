@@ -0,0 +1,181 @@
+# coding: utf-8
+"""
+Runs vertex clustering for all combinations of meshes (globs), epsilons and methods on a pool of workers.
+
+All jobs of a mesh run in a single task, so every mesh is loaded only once and its jobs share
+a ClusteringSession (clusters of equal epsilons and face planes).
+Outputs newer than their input meshes are skipped.
+Result of every job is printed as a JSON line as soon as all jobs of its mesh finish
+(as soon as the job finishes, with a single worker).
+
+Example:
+
+    python batch.py --meshes "data/*.off" --epsilons 0.003 0.01 --methods mean quadric --output-directory out
+"""
+from __future__ import print_function, division
+
+import argparse
+import collections
+import glob
+import json
+import multiprocessing
+import os
+import sys
+from timeit import default_timer
+
+from main import function_names, representative_function
+from mesh_writer import output_extensions
+from session import ClusteringSession
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+_loaded_mesh = {}
+
+
+def output_filename(output_directory, mesh_filename, method, epsilon, extension):
+    """
+    Returns output filename of job, e.g. out/Bunny_mean_0.003.off.
+    """
+    mesh_name = os.path.splitext(os.path.basename(mesh_filename))[0]
+    return os.path.join(output_directory, '%s_%s_%r%s' % (mesh_name, method, epsilon, extension))
+
+
+def is_up_to_date(mesh_filename, filename):
+    return os.path.exists(filename) and os.path.getmtime(filename) >= os.path.getmtime(mesh_filename)
+
+
+def _load_mesh(mesh_filename):
+    """
+    Returns mesh's session and loading time, loading only meshes other than the previous one.
+    """
+    key = (mesh_filename, os.path.getmtime(mesh_filename))
+    if _loaded_mesh.get('key') != key:
+        _loaded_mesh.clear()
+        start = default_timer()
+        _loaded_mesh.update(key=key, session=ClusteringSession.from_file(mesh_filename),
+                            seconds=default_timer() - start)
+        return _loaded_mesh['session'], _loaded_mesh['seconds']
+    return _loaded_mesh['session'], 0.0
+
+
+def run_job(job):
+    """
+    Runs single clustering job: (mesh filename, method, epsilon, output filename).
+
+    :return: job's report
+    :rtype: dict
+    """
+    mesh_filename, method, epsilon, filename = job
+    report = {'mesh': mesh_filename, 'method': method, 'epsilon': epsilon, 'output': filename}
+    try:
+        session, report['load_seconds'] = _load_mesh(mesh_filename)
+        start = default_timer()
+        result_vertices, result_faces = session.cluster(epsilon, representative_function(method), filename)
+        report.update(status='done', seconds=default_timer() - start, input_vertices=len(session.vertices),
+                      input_faces=len(session.faces), vertices=len(result_vertices), faces=len(result_faces),
+                      bytes=os.path.getsize(filename))
+    except Exception as e:
+        report.update(status='failed', error='%s: %s' % (type(e).__name__, e))
+    return report
+
+
+def run_mesh_jobs(jobs):
+    """
+    Runs jobs of a single mesh one after another (the mesh is loaded once for all of them).
+
+    :return: jobs' reports
+    :rtype: list
+    """
+    return [run_job(job) for job in jobs]
+
+
+def group_by_mesh(jobs):
+    """
+    Groups jobs by their mesh, keeping order of meshes and of jobs of every mesh.
+
+    :rtype: list
+    """
+    groups = collections.OrderedDict()
+    for job in jobs:
+        groups.setdefault(job[0], []).append(job)
+    return list(groups.values())
+
+
+def make_jobs(mesh_filenames, epsilons, methods, output_directory, extension, force=False):
+    """
+    Returns jobs to run (grouped by mesh) and reports of skipped (up to date) jobs.
+
+    :rtype: list, list
+    """
+    jobs = []
+    skipped = []
+    for mesh_filename in mesh_filenames:
+        for method in methods:
+            for epsilon in epsilons:
+                filename = output_filename(output_directory, mesh_filename, method, epsilon, extension)
+                if not force and is_up_to_date(mesh_filename, filename):
+                    skipped.append({'mesh': mesh_filename, 'method': method, 'epsilon': epsilon, 'output': filename,
+                                    'status': 'skipped'})
+                else:
+                    jobs.append((mesh_filename, method, epsilon, filename))
+    return jobs, skipped
+
+
+def run_batch(jobs, workers, report):
+    """
+    Runs jobs on a pool of workers, one task per mesh (in this process if workers is 1), calling report
+    with every job's report as soon as all jobs of its mesh finish (as soon as the job finishes, in this process).
+
+    :return: amount of failed jobs
+    :rtype: int
+    """
+    failed = 0
+    if workers > 1:
+        pool = multiprocessing.Pool(workers)
+        results = pool.imap_unordered(run_mesh_jobs, group_by_mesh(jobs))
+    else:
+        pool = None
+        results = ([run_job(job)] for job in jobs)
+    try:
+        for job_reports in results:
+            for job_report in job_reports:
+                failed += job_report['status'] == 'failed'
+                report(job_report)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return failed
+
+
+def _print_report(job_report):
+    print(json.dumps(job_report, sort_keys=True))
+    sys.stdout.flush()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--meshes', nargs='+', required=True, help='globs of input meshes (.off or .obj)')
+    parser.add_argument('--epsilons', nargs='+', type=float, required=True)
+    parser.add_argument('--methods', nargs='+', choices=function_names(), default=function_names())
+    parser.add_argument('--output-directory', default='out')
+    parser.add_argument('--format', choices=output_extensions(), default='.off', help='output format')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--force', action='store_true', help='run jobs with up to date outputs too')
+    args = parser.parse_args(argv)
+
+    mesh_filenames = sorted(set(filename for pattern in args.meshes for filename in glob.glob(pattern)
+                                if filename.endswith('.off') or filename.endswith('.obj')))
+    if not mesh_filenames:
+        parser.error("No .off or .obj meshes match %s" % ' '.join(args.meshes))
+    if not os.path.isdir(args.output_directory):
+        os.makedirs(args.output_directory)
+    jobs, skipped = make_jobs(mesh_filenames, args.epsilons, args.methods, args.output_directory, args.format,
+                              args.force)
+    for job_report in skipped:
+        _print_report(job_report)
+    return 1 if run_batch(jobs, min(args.workers, max(len(jobs), 1)), _print_report) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
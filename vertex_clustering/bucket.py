@@ -1,8 +1,15 @@
 # coding: utf-8
 import numpy as np
 
+import common_path  # makes shared modules importable
+from cgal_bridge import point_coordinates
+
 __author__ = "Michał Ciołczyk, Michał Janczykowski"
 
+_CELL_BITS = 21
+_CELL_OFFSET = 1 << (_CELL_BITS - 1)
+_CELL_MASK = (1 << _CELL_BITS) - 1
+
 
 def _round_point_no_nearest(point, epsilon):
     """
@@ -21,7 +28,128 @@ def get_bucket_for_vertex(vertex, epsilon):
     :type epsilon: float
     :return: cluster's center for vertex
     """
-    return tuple(_round_point_no_nearest([float(x) for x in str(vertex.point()).split()], epsilon))
+    return tuple(_round_point_no_nearest(point_coordinates(vertex.point()), epsilon))
+
+
+def quantize_vertices(vertices, epsilon):
+    """
+    Returns clusters' cells indices for all vertices at once.
+
+    Cell with indices (i, j, k) is centered in (i * epsilon, j * epsilon, k * epsilon),
+    which gives the same cells as _round_point_no_nearest.
+
+    :param vertices: vertices coordinates
+    :type vertices: np.ndarray
+    :param epsilon: epsilon used in algorithm (see docs)
+    :type epsilon: float
+    :return: cells indices of shape (N, 3)
+    :rtype: np.ndarray
+    """
+    with np.errstate(invalid='ignore'):
+        return np.rint(np.asarray(vertices, dtype=np.float64) / epsilon).astype(np.int64)
+
+
+def pack_cells(cells):
+    """
+    Packs cells indices into single integer keys (21 bits per axis).
+
+    :param cells: cells indices of shape (N, 3)
+    :type cells: np.ndarray
+    :return: keys of shape (N,)
+    :rtype: np.ndarray
+    """
+    shifted = cells + _CELL_OFFSET
+    if shifted.size and (shifted.min() < 0 or shifted.max() > _CELL_MASK):
+        raise ValueError("Epsilon is too small for the mesh extent!")
+    return (shifted[:, 0] << (2 * _CELL_BITS)) | (shifted[:, 1] << _CELL_BITS) | shifted[:, 2]
+
+
+def unpack_keys(keys):
+    """
+    Inverse of pack_cells.
+
+    :param keys: keys of shape (N,)
+    :type keys: np.ndarray
+    :return: cells indices of shape (N, 3)
+    :rtype: np.ndarray
+    """
+    cells = np.empty((len(keys), 3), dtype=np.int64)
+    cells[:, 0] = (keys >> (2 * _CELL_BITS)) & _CELL_MASK
+    cells[:, 1] = (keys >> _CELL_BITS) & _CELL_MASK
+    cells[:, 2] = keys & _CELL_MASK
+    return cells - _CELL_OFFSET
+
+
+def assign_clusters(vertices, epsilon):
+    """
+    Assigns all vertices to clusters.
+
+    Clusters are numbered in order of their first vertex, just like buckets in cluster.
+
+    :param vertices: vertices coordinates of shape (N, 3)
+    :type vertices: np.ndarray
+    :param epsilon: epsilon used in algorithm (see docs)
+    :type epsilon: float
+    :return: clusters' cells indices of shape (K, 3), cluster id for every vertex of shape (N,)
+    :rtype: np.ndarray, np.ndarray
+    """
+    return number_by_first_appearance(pack_cells(quantize_vertices(vertices, epsilon)))
+
+
+def number_by_first_appearance(keys):
+    """
+    Numbers distinct keys in order of their first appearance.
+
+    :return: distinct keys' cells indices of shape (K, 3), id of every key of shape (N,)
+    :rtype: np.ndarray, np.ndarray
+    """
+    unique_keys, first_positions, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first_positions)
+    ranks = np.empty_like(order)
+    ranks[order] = np.arange(len(order))
+    return unpack_keys(unique_keys[order]), ranks[inverse.ravel()]
+
+
+def coarsen_cells(cells, ratio):
+    """
+    Merges clusters' cells into cells ratio times bigger (ratio must be odd).
+
+    Coarse cell (I, J, K) is centered in (I, J, K) * ratio * epsilon and covers exactly
+    ratio^3 fine cells, so clusters are the same as assign_clusters with epsilon * ratio would give
+    (and they are numbered in the same order, if fine clusters are numbered by first vertex).
+
+    :param cells: clusters' cells indices of shape (K, 3)
+    :type cells: np.ndarray
+    :param ratio: odd ratio of coarse and fine epsilon
+    :type ratio: int
+    :return: coarse cells indices of shape (K', 3), coarse cluster id of every fine cluster of shape (K,)
+    :rtype: np.ndarray, np.ndarray
+    """
+    return number_by_first_appearance(pack_cells(np.floor_divide(cells + ratio // 2, ratio)))
+
+
+def apply_representatives_fallback(representatives, cells, epsilon):
+    """
+    Vectorized version of Bucket.representative check: representatives which left
+    their cluster's cell and are further than 5 * epsilon from its center are replaced with the center.
+
+    :param representatives: representatives of shape (K, 3)
+    :type representatives: np.ndarray
+    :param cells: clusters' cells indices of shape (K, 3)
+    :type cells: np.ndarray
+    :param epsilon: epsilon used in algorithm (see docs)
+    :type epsilon: float
+    :return: corrected representatives
+    :rtype: np.ndarray
+    """
+    representatives = np.array(representatives, dtype=np.float64)
+    centers = cells * epsilon
+    moved = np.any(quantize_vertices(representatives, epsilon) != cells, axis=1)
+    with np.errstate(invalid='ignore'):
+        too_far = np.linalg.norm(representatives - centers, axis=1) > 5 * epsilon
+    fallback = moved & too_far
+    representatives[fallback] = centers[fallback]
+    return representatives
 
 
 class Bucket(object):
@@ -36,16 +164,19 @@ class Bucket(object):
         self.coordinates = coordinates
         self.representative_function = representative_function
         self.original_vertices = []
+        self.original_points = []
         self._representative = None
         self.epsilon = epsilon
 
-    def append(self, vertex):
+    def append(self, vertex, point=None):
         """
         Adds vertex to cluster
 
         :param vertex: vertex to add
+        :param point: vertex's coordinates, if already known (read from the vertex otherwise)
         """
         self.original_vertices.append(vertex)
+        self.original_points.append(tuple(point) if point is not None else point_coordinates(vertex.point()))
 
     @property
     def representative(self):
@@ -57,9 +188,8 @@ class Bucket(object):
         if not self._representative:
             self._representative = self.representative_function(self)
             if tuple(_round_point_no_nearest(self._representative, self.epsilon)) != self.coordinates:
-                representative_np = np.array(list(self._representative))
-                coordinates_np = np.array(list(self.coordinates))
-                norm = np.linalg.norm(representative_np - coordinates_np)
-                if norm > 5 * self.epsilon:
+                # plain floats, numpy calls would cost more than the arithmetic on 3 coordinates
+                dist_sqr = sum((r - c) ** 2 for r, c in zip(self._representative, self.coordinates))
+                if dist_sqr > (5 * self.epsilon) ** 2:
                     self._representative = self.coordinates
         return self._representative
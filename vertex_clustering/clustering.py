@@ -2,109 +2,203 @@
 from __future__ import print_function, generators
 
 import sys
-from CGAL.CGAL_Polyhedron_3 import Polyhedron_3
-from CGAL.CGAL_Polyhedron_3 import Polyhedron_3_Facet_handle
 
-import time
+try:
+    from CGAL.CGAL_Polyhedron_3 import Polyhedron_3
+    from CGAL.CGAL_Polyhedron_3 import Polyhedron_3_Facet_handle
+except ImportError:  # CGAL is needed only by cluster
+    Polyhedron_3 = Polyhedron_3_Facet_handle = None
 
-from bucket import get_bucket_for_vertex
+import common_path  # makes shared modules importable
+from bucket import assign_clusters, apply_representatives_fallback
+from cgal_bridge import polyhedron_to_arrays
+from mesh_cache import MeshCache
 from mesh_loader import *
+from mesh_writer import writer_for_filename
 from representative_functions import *
+from stats import ClusteringStats
 
 __author__ = "Michał Ciołczyk, Michał Janczykowski"
 
 
-def cluster(mesh, epsilon, representative_method, filename):
+def cluster(mesh, epsilon, representative_method, filename, stats=None):
     """
     Performs vertex clustering on mesh using parameters epsilon and representative_method.
 
-    Saves output mesh to file: filename.
+    Saves output mesh to file: filename (format is chosen by extension: .off, .obj or .ply).
 
     :param mesh: input mesh
     :param epsilon: epsilon used in algorithm (see docs)
     :param representative_method: representative method used in algorithm (see docs)
     :param filename: filename of the ouput mesh
+    :param stats: statistics to add to (new ones are created by default)
 
     :type mesh: Polyhedron_3
     :type epsilon: float
     :type filename: string
     :type representative_method: (Bucket) -> tuple(float, float, float)
+    :type stats: ClusteringStats
+    :return: statistics of the run
+    :rtype: ClusteringStats
     """
+    if stats is None:
+        stats = ClusteringStats()
     buckets = {}
 
-    for v in mesh.vertices():
-        b = get_bucket_for_vertex(v, epsilon)
-        if b not in buckets:
-            bucket = Bucket(b, representative_method, epsilon)
-            buckets[b] = bucket
-        buckets[b].append(v)
+    with stats.stage('bucketing'):
+        # coordinates and faces are extracted in bulk, buckets' centers are the ones of get_bucket_for_vertex
+        vertices, faces = polyhedron_to_arrays(mesh)
+        centers = [tuple(center) for center in (np.rint(vertices / epsilon) * epsilon).tolist()]
+        for v, point, b in zip(mesh.vertices(), vertices.tolist(), centers):
+            if b not in buckets:
+                bucket = Bucket(b, representative_method, epsilon)
+                buckets[b] = bucket
+            buckets[b].append(v, point)
+    stats.count('buckets', len(buckets))
 
     # build result mesh
     result_vertices = []
     result_faces = []
 
     bucket_coords_to_ids = {}
-    for i, bucket in enumerate(buckets.values()):
-        coords = bucket.coordinates
-        representative = bucket.representative
-        bucket_coords_to_ids[coords] = i
-        result_vertices.append(representative)
+    with stats.stage('representatives'):
+        for i, bucket in enumerate(buckets.values()):
+            coords = bucket.coordinates
+            representative = bucket.representative
+            bucket_coords_to_ids[coords] = i
+            result_vertices.append(representative)
 
     faces_set = set()
-    for f in mesh.facets():  # type: Polyhedron_3_Facet_handle
-        circulator = f.facet_begin()  # type: Polyhedron_3_Halfedge_around_facet_circulator
-        edge_list = []
-        for i in range(f.facet_degree()):
-            he = circulator.next()  # type: Polyhedron_3_Halfedge_handle
-            b = he.vertex()
-            b = get_bucket_for_vertex(b, epsilon)
-            edge_list.append(b)
-        edge_set = set(edge_list)
-        if len(edge_set) != 3:
-            continue
-        if len(edge_list) != 3:
-            continue
-
-        n = len(edge_list)
-        triangle_already_added = False
-        for permutation in [[edge_list[i - j] for i in range(n)] for j in range(n)]:
-            if tuple(permutation) in faces_set:
-                triangle_already_added = True
-                break
-            faces_set.add(tuple(permutation))
-
-        if triangle_already_added:
-            continue
-
-        face = []
-        for b in edge_list:
-            v = bucket_coords_to_ids[b]
-            face.append(v)
-        result_faces.append(face)
-
-    with open(filename, 'w') as f:
-        print('OFF', file=f)
-        print('%d %d 0' % (len(result_vertices), len(result_faces)), file=f)
-        print('', file=f)
-        for v in result_vertices:
-            print('%.10f %.10f %.10f' % (v[0], v[1], v[2]), file=f)
-        print('', file=f)
-        for face in result_faces:
-            print('3 %d %d %d' % (face[0], face[1], face[2]), file=f)
-        print('', file=f)
+    dropped_faces = duplicate_faces = 0
+    with stats.stage('faces'):
+        for face in faces.tolist():
+            edge_list = [centers[v] for v in face]
+            edge_set = set(edge_list)
+            if len(edge_set) != 3:
+                dropped_faces += 1
+                continue
+            if len(edge_list) != 3:
+                dropped_faces += 1
+                continue
+
+            n = len(edge_list)
+            triangle_already_added = False
+            for permutation in [[edge_list[i - j] for i in range(n)] for j in range(n)]:
+                if tuple(permutation) in faces_set:
+                    triangle_already_added = True
+                    break
+                faces_set.add(tuple(permutation))
+
+            if triangle_already_added:
+                duplicate_faces += 1
+                continue
+
+            face = []
+            for b in edge_list:
+                v = bucket_coords_to_ids[b]
+                face.append(v)
+            result_faces.append(face)
+    stats.count('dropped_faces', dropped_faces)
+    stats.count('duplicate_faces', duplicate_faces)
+
+    with stats.stage('writing'):
+        writer_for_filename(filename).write(result_vertices, result_faces)
+    return stats
+
+
+def cluster_arrays(vertices, faces, epsilon, representative_method, filename, stats=None):
+    """
+    Performs vertex clustering on mesh given as arrays using parameters epsilon and representative_method.
+
+    Saves output mesh to file: filename (format is chosen by extension: .off, .obj or .ply).
+
+    :param vertices: input mesh vertices of shape (N, 3)
+    :param faces: input mesh faces of shape (F, 3) (indices start from 0)
+    :param epsilon: epsilon used in algorithm (see docs)
+    :param representative_method: batched representative method used in algorithm (see docs)
+    :param filename: filename of the ouput mesh
+    :param stats: statistics to add to, if given (see ClusteringStats)
+
+    :type vertices: np.ndarray
+    :type faces: np.ndarray
+    :type epsilon: float
+    :type filename: string
+    :type representative_method: (np.ndarray, np.ndarray, np.ndarray, np.ndarray, float) -> np.ndarray
+    :type stats: ClusteringStats
+    :return: output mesh vertices of shape (K, 3) and faces of shape (F', 3)
+    :rtype: np.ndarray, np.ndarray
+    """
+    if stats is None:
+        stats = ClusteringStats()
+    with stats.stage('bucketing'):
+        cells, cluster_ids = assign_clusters(vertices, epsilon)
+    stats.count('buckets', len(cells))
+    with stats.stage('representatives'):
+        result_vertices = representative_method(vertices, faces, cluster_ids, cells, epsilon)
+        result_vertices = apply_representatives_fallback(result_vertices, cells, epsilon)
+
+    with stats.stage('faces'):
+        result_faces = rebuild_faces(faces, cluster_ids, stats)
+
+    with stats.stage('writing'):
+        writer_for_filename(filename).write(result_vertices, result_faces)
+    return result_vertices, result_faces
+
+
+def rebuild_faces(faces, cluster_ids, stats=None):
+    """
+    Maps faces to clusters, drops collapsed triangles and triangles already added.
+
+    Like in cluster, triangles are duplicates only when one is a rotation of the other
+    (reversed triangles are kept); the first occurrence is kept, in its original rotation.
+
+    :param faces: input mesh faces of shape (F, 3)
+    :type faces: np.ndarray
+    :param cluster_ids: cluster id for every vertex of shape (N,)
+    :type cluster_ids: np.ndarray
+    :param stats: statistics to count dropped and duplicate faces in, if given
+    :type stats: ClusteringStats
+    :return: result mesh faces of shape (F', 3)
+    :rtype: np.ndarray
+    """
+    return unique_triangles(cluster_ids[faces], stats)
+
+
+def unique_triangles(clustered_faces, stats=None):
+    """
+    Drops collapsed triangles and repeated triangles (see rebuild_faces) from faces mapped to clusters.
+
+    :param clustered_faces: faces of shape (F, 3) (clusters ids)
+    :type clustered_faces: np.ndarray
+    :param stats: statistics to count dropped and duplicate faces in, if given
+    :type stats: ClusteringStats
+    :return: result mesh faces of shape (F', 3)
+    :rtype: np.ndarray
+    """
+    a, b, c = clustered_faces[:, 0], clustered_faces[:, 1], clustered_faces[:, 2]
+    clustered_faces = clustered_faces[(a != b) & (b != c) & (c != a)]
+
+    rotations = np.argmin(clustered_faces, axis=1)[:, np.newaxis] + np.arange(3)
+    canonical_faces = np.take_along_axis(clustered_faces, rotations % 3, axis=1)
+    if len(canonical_faces) == 0 or canonical_faces.max() < 1 << 21:
+        keys = (canonical_faces[:, 0] << 42) | (canonical_faces[:, 1] << 21) | canonical_faces[:, 2]
+        _, first_occurrences = np.unique(keys, return_index=True)
+    else:
+        _, first_occurrences = np.unique(canonical_faces, axis=0, return_index=True)
+    first_occurrences.sort()
+    if stats is not None:
+        stats.count('dropped_faces', len(a) - len(clustered_faces))
+        stats.count('duplicate_faces', len(clustered_faces) - len(first_occurrences))
+    return clustered_faces[first_occurrences]
 
 
 if __name__ == "__main__":
-    mesh = OffLoader("data/%s.off" % sys.argv[1]).to_polyhedron()
-    start_time = time.time()
-    cluster(mesh, 0.01, quadric_errors_representative, "out/%s_quad.off" % sys.argv[1])
-    print(time.time() - start_time)
-    start_time = time.time()
-    cluster(mesh, 0.01, mean_representative, "out/%s_mean.off" % sys.argv[1])
-    print(time.time() - start_time)
-    start_time = time.time()
-    cluster(mesh, 0.01, median_representative, "out/%s_median.off" % sys.argv[1])
-    print(time.time() - start_time)
-    start_time = time.time()
-    cluster(mesh, 0.01, dummy_representative, "out/%s_dummy.off" % sys.argv[1])
-    print(time.time() - start_time)
+    from session import ClusteringSession
+
+    session = ClusteringSession.from_file("data/%s.off" % sys.argv[1])
+    for name, method in [("quad", quadric_errors_representatives), ("mean", mean_representatives),
+                         ("median", median_representatives), ("dummy", dummy_representatives)]:
+        stats = ClusteringStats()
+        session.cluster(0.01, method, "out/%s_%s.off" % (sys.argv[1], name), stats)
+        print(name)
+        print(stats)
@@ -0,0 +1,16 @@
+# coding: utf-8
+"""
+Makes modules shared by both packages (in ../common: mesh loaders, mesh cache, spatial index, CGAL bridge)
+importable by plain names.
+
+Every module using the shared ones imports this module first.
+"""
+import os
+import sys
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+COMMON_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'common')
+
+if COMMON_DIRECTORY not in sys.path:
+    sys.path.append(COMMON_DIRECTORY)
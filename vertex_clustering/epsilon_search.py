@@ -0,0 +1,197 @@
+# coding: utf-8
+"""
+Search of epsilon giving wanted amount of output vertices (clusters) or faces.
+
+Probes only quantize vertices and count distinct cells (and distinct clustered faces), representatives
+are not computed. Vertices (and faces) are kept sorted by keys of the previous probe, so keys of the next probe
+are nearly sorted and the stable (adaptive) sort of them is several times faster than sorting keys in mesh order.
+"""
+from __future__ import division
+
+from math import exp, log, sqrt
+
+import numpy as np
+
+from bucket import quantize_vertices, pack_cells
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+VERTICES = 'vertices'
+FACES = 'faces'
+
+_MAX_PROBES = 64
+_TOLERANCE = 1e-3
+_BRACKET_FACTOR = 4.0
+
+
+def _distinct_sorted(keys):
+    """
+    Sorts keys (stable sort, fast for nearly sorted keys) and marks first occurrences.
+
+    :return: sorting permutation, whether every sorted key differs from the previous one
+    :rtype: np.ndarray, np.ndarray
+    """
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    is_first = np.ones(len(keys), dtype=bool)
+    is_first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    return order, is_first
+
+
+class EpsilonSearch(object):
+    """
+    Finds epsilon for which vertex clustering gives (at most) target amount of output vertices or faces.
+
+    Amounts are the ones of cluster_arrays: vertices are clusters, faces are clustered faces without collapsed
+    and repeated ones (see rebuild_faces). Every probed epsilon is remembered, so next searches
+    (e.g. for other targets) reuse all earlier probes.
+    """
+
+    def __init__(self, vertices, faces=None):
+        """
+        :param vertices: input mesh vertices of shape (N, 3)
+        :param faces: input mesh faces of shape (F, 3) (needed only for faces targets)
+        """
+        self.vertices = np.asarray(vertices, dtype=np.float64).reshape((-1, 3))
+        self.faces = None if faces is None else np.asarray(faces, dtype=np.int64).reshape((-1, 3))
+        self.probes = 0
+        self._vertex_order = np.arange(len(self.vertices))
+        self._sorted_vertices = self.vertices
+        self._sorted_faces = None if faces is None else np.ascontiguousarray(self.faces.T)  # faces' columns
+        self._amounts = {VERTICES: {}, FACES: {}}
+
+    def amount(self, epsilon, target_kind=VERTICES):
+        """
+        Returns amount of output vertices or faces of clustering with epsilon.
+
+        :param epsilon: epsilon used in algorithm (see docs)
+        :type epsilon: float
+        :param target_kind: VERTICES or FACES
+        :type target_kind: string
+        :rtype: int
+        """
+        if target_kind not in self._amounts:
+            raise ValueError("Target must be one of: %s." % str([VERTICES, FACES]))
+        if target_kind == FACES and self.faces is None:
+            raise ValueError("Faces are needed to search for amount of faces!")
+        epsilon = float(epsilon)
+        if epsilon not in self._amounts[target_kind]:
+            self._probe(epsilon, target_kind == FACES)
+        return self._amounts[target_kind][epsilon]
+
+    def _probe(self, epsilon, count_faces):
+        self.probes += 1
+        order, is_first = _distinct_sorted(pack_cells(quantize_vertices(self._sorted_vertices, epsilon)))
+        self._sorted_vertices = self._sorted_vertices[order]
+        self._vertex_order = self._vertex_order[order]
+        self._amounts[VERTICES][epsilon] = int(np.count_nonzero(is_first))
+        if not count_faces:
+            return
+
+        # clusters are numbered in order of cells here, amount of faces does not depend on the numbering
+        cluster_ids = np.empty(len(self.vertices), dtype=np.int64)
+        cluster_ids[self._vertex_order] = np.cumsum(is_first) - 1
+        a, b, c = cluster_ids[self._sorted_faces]
+        kept = (a != b) & (b != c) & (c != a)
+        a, b, c = a[kept], b[kept], c[kept]
+        # rotation starting from the smallest cluster, like in rebuild_faces
+        a_first = (a < b) & (a < c)
+        b_first = (b < c) & (b < a)
+        canonical_faces = (np.where(a_first, a, np.where(b_first, b, c)),
+                           np.where(a_first, b, np.where(b_first, c, a)),
+                           np.where(a_first, c, np.where(b_first, a, b)))
+        if np.count_nonzero(is_first) <= 1 << 21:
+            keys = (canonical_faces[0] << 42) | (canonical_faces[1] << 21) | canonical_faces[2]
+            order, is_first = _distinct_sorted(keys)
+            # faces kept by this probe go last, sorted, since mostly the same ones are kept by the next probe
+            kept_positions = np.flatnonzero(kept)
+            permutation = np.concatenate([np.flatnonzero(~kept), kept_positions[order]])
+            self._sorted_faces = np.take(self._sorted_faces, permutation, axis=1)
+            faces_amount = np.count_nonzero(is_first)
+        else:
+            faces_amount = len(np.unique(np.stack(canonical_faces, axis=1), axis=0))
+        self._amounts[FACES][epsilon] = int(faces_amount)
+
+    def _initial_epsilon(self, target):
+        """
+        Guess for surface meshes: target cells of size epsilon cover half of the bounding box's surface.
+        """
+        extents = self.vertices.max(axis=0) - self.vertices.min(axis=0)
+        area = extents[0] * extents[1] + extents[1] * extents[2] + extents[2] * extents[0]
+        if area > 0:
+            return sqrt(area / target)
+        return max(float(extents.max()), 1.0) / target
+
+    def find_epsilon(self, target, target_kind=VERTICES, tolerance=_TOLERANCE, max_probes=_MAX_PROBES):
+        """
+        Finds epsilon giving exactly target output vertices or faces or, if none is found,
+        (nearly) the smallest epsilon giving less than target.
+
+        Epsilon is bracketed by multiplying it by _BRACKET_FACTOR, then the bracket is narrowed
+        with interpolation of log(amount) against log(epsilon), alternated with bisection,
+        until the amount equals target or bracket is tolerance wide (relatively).
+        The returned epsilon never gives more than target. ValueError is raised if the target cannot be reached
+        (it is bigger than the amount given by the smallest epsilon usable for the mesh extent)
+        or if no epsilon giving at most target is found in max_probes probes.
+
+        :param target: wanted amount of output vertices or faces
+        :type target: int
+        :param target_kind: VERTICES or FACES
+        :type target_kind: string
+        :param tolerance: relative width of the final bracket
+        :type tolerance: float
+        :param max_probes: maximum amount of probes (not counting remembered ones)
+        :type max_probes: int
+        :rtype: float
+        """
+        if target < 1:
+            raise ValueError("Target amount must be positive!")
+        if len(self.vertices) == 0:
+            raise ValueError("Mesh has no vertices!")
+        last_probe = self.probes + max_probes
+
+        def amount(epsilon):
+            return self.amount(epsilon, target_kind)
+
+        def check_probes():
+            if self.probes >= last_probe:
+                raise ValueError("No epsilon giving at most %d output %s found in %d probes!"
+                                 % (target, target_kind, max_probes))
+
+        upper = self._initial_epsilon(target)
+        while True:
+            try:
+                amount(upper)
+                break
+            except ValueError:  # epsilon is too small for the mesh extent
+                check_probes()
+                upper *= _BRACKET_FACTOR
+        if amount(upper) > target:
+            while amount(upper) > target:
+                check_probes()
+                lower, upper = upper, upper * _BRACKET_FACTOR
+        else:
+            lower = upper / _BRACKET_FACTOR
+            while amount(upper) != target and self.probes < last_probe:
+                try:
+                    if amount(lower) > target:
+                        break
+                except ValueError:  # epsilon is too small for the mesh extent
+                    raise ValueError("Target amount %d cannot be reached, clustering gives at most %d output %s!"
+                                     % (target, amount(upper), target_kind))
+                lower, upper = lower / _BRACKET_FACTOR, lower
+
+        bisect = False
+        while amount(upper) != target and upper > lower * (1 + tolerance) and self.probes < last_probe:
+            if bisect:
+                fraction = 0.5
+            else:
+                lower_log, upper_log = log(amount(lower)), log(max(amount(upper), 0.5))
+                fraction = min(max((lower_log - log(target)) / (lower_log - upper_log), 0.05), 0.95)
+            bisect = not bisect
+            epsilon = exp(log(lower) + fraction * (log(upper) - log(lower)))
+            if amount(epsilon) > target:
+                lower = epsilon
+            else:
+                upper = epsilon
+        return upper
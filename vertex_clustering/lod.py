@@ -0,0 +1,186 @@
+# coding: utf-8
+from __future__ import print_function
+
+import numpy as np
+
+from bucket import assign_clusters, apply_representatives_fallback, coarsen_cells
+from clustering import rebuild_faces
+from mesh_writer import writer_for_filename
+from representative_functions import dummy_representatives, mean_representatives, median_representatives, \
+    quadric_errors_representatives, face_planes, cluster_quadrics, solve_quadrics
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+
+def _merge(values, parents, clusters_amount):
+    """
+    Sums per cluster values of children clusters into their parents.
+
+    :param values: values of shape (K, ...)
+    :param parents: parent cluster id of every cluster of shape (K,)
+    :param clusters_amount: amount of parent clusters
+    :return: values of shape (K', ...)
+    :rtype: np.ndarray
+    """
+    flat_values = values.reshape((len(values), -1))
+    merged = np.empty((clusters_amount, flat_values.shape[1]))
+    for i in range(flat_values.shape[1]):
+        merged[:, i] = np.bincount(parents, flat_values[:, i], minlength=clusters_amount)
+    return merged.reshape((clusters_amount,) + values.shape[1:])
+
+
+class _CenterStatistics(object):
+    def __init__(self, vertices, faces, cluster_ids, cells, epsilon):
+        pass
+
+    def representatives(self, cells, epsilon):
+        return cells * epsilon
+
+    def coarsen(self, parents, clusters_amount):
+        pass
+
+
+class _MeanStatistics(object):
+    """
+    Keeps clusters' vertices counts and coordinates sums.
+    """
+
+    def __init__(self, vertices, faces, cluster_ids, cells, epsilon):
+        self.counts = np.bincount(cluster_ids, minlength=len(cells)).astype(np.float64)
+        self.sums = _merge(vertices, cluster_ids, len(cells))
+        # the finest level is exactly the same as the one given by cluster_arrays
+        self.finest = mean_representatives(vertices, faces, cluster_ids, cells, epsilon)
+
+    def representatives(self, cells, epsilon):
+        if self.finest is not None:
+            return self.finest
+        return self.sums / self.counts[:, np.newaxis]
+
+    def coarsen(self, parents, clusters_amount):
+        self.finest = None
+        self.counts = _merge(self.counts, parents, clusters_amount)
+        self.sums = _merge(self.sums, parents, clusters_amount)
+
+
+class _MedianStatistics(object):
+    """
+    Medians cannot be merged, so they are recomputed at every level (only from clusters' ids).
+    """
+
+    def __init__(self, vertices, faces, cluster_ids, cells, epsilon):
+        self.vertices = vertices
+        self.faces = faces
+        self.cluster_ids = cluster_ids
+
+    def representatives(self, cells, epsilon):
+        return median_representatives(self.vertices, self.faces, self.cluster_ids, cells, epsilon)
+
+    def coarsen(self, parents, clusters_amount):
+        self.cluster_ids = parents[self.cluster_ids]
+
+
+class _QuadricStatistics(object):
+    """
+    Keeps quadrics of faces lying inside single clusters (they stay inside single clusters at all coarser levels,
+    so they are just merged) and clusters of corners of the remaining faces.
+
+    Faces spanning several clusters are counted once for every distinct cluster they touch at every level,
+    like in quadric_errors_representatives.
+    """
+
+    def __init__(self, vertices, faces, cluster_ids, cells, epsilon):
+        normals, distances = face_planes(vertices, faces)
+        self.A = np.zeros((len(cells), 3, 3))
+        self.b = np.zeros((len(cells), 3))
+        self.face_clusters = cluster_ids[faces]
+        self.normals = normals
+        self.distances = distances
+        self._settle_faces(len(cells))
+
+    def _settle_faces(self, clusters_amount):
+        settled = (self.face_clusters[:, 0] == self.face_clusters[:, 1]) & \
+                  (self.face_clusters[:, 0] == self.face_clusters[:, 2])
+        A, b = cluster_quadrics(self.face_clusters[settled], self.normals[settled], self.distances[settled],
+                                clusters_amount)
+        self.A += A
+        self.b += b
+        self.face_clusters = self.face_clusters[~settled]
+        self.normals = self.normals[~settled]
+        self.distances = self.distances[~settled]
+
+    def representatives(self, cells, epsilon):
+        A, b = cluster_quadrics(self.face_clusters, self.normals, self.distances, len(cells))
+        return solve_quadrics(self.A + A, self.b + b)
+
+    def coarsen(self, parents, clusters_amount):
+        self.A = _merge(self.A, parents, clusters_amount)
+        self.b = _merge(self.b, parents, clusters_amount)
+        self.face_clusters = parents[self.face_clusters]
+        self._settle_faces(clusters_amount)
+
+
+_statistics_map = {
+    dummy_representatives: _CenterStatistics,
+    mean_representatives: _MeanStatistics,
+    median_representatives: _MedianStatistics,
+    quadric_errors_representatives: _QuadricStatistics
+}
+
+
+def lod_levels(vertices, faces, epsilon, levels, representative_method, ratio=3):
+    """
+    Generates levels of detail from a single clustering pass: clusters are assigned once at the finest epsilon,
+    every coarser level (with epsilon ratio times bigger) merges children clusters and their statistics.
+
+    Level l is the same as cluster_arrays with epsilon * ratio^l would give, up to the summation order
+    and vertices lying exactly on cells' boundaries (rounding half to even may put them in another cell).
+
+    :param vertices: input mesh vertices of shape (N, 3)
+    :param faces: input mesh faces of shape (F, 3) (indices start from 0)
+    :param epsilon: the finest epsilon
+    :param levels: amount of levels
+    :param representative_method: batched representative method (one of dummy_representatives,
+     mean_representatives, median_representatives, quadric_errors_representatives)
+    :param ratio: odd ratio of epsilons of consecutive levels
+
+    :type vertices: np.ndarray
+    :type faces: np.ndarray
+    :type epsilon: float
+    :type levels: int
+    :type ratio: int
+    :return: generator of (epsilon, vertices, faces) of consecutive levels (from the finest one)
+    """
+    if ratio < 3 or ratio % 2 == 0:
+        raise ValueError("Ratio of levels' epsilons must be odd and at least 3!")
+    if representative_method not in _statistics_map:
+        raise ValueError("Representative method does not support levels of detail!")
+    cells, cluster_ids = assign_clusters(vertices, epsilon)
+    statistics = _statistics_map[representative_method](vertices, faces, cluster_ids, cells, epsilon)
+    result_faces = rebuild_faces(faces, cluster_ids)
+    for level in range(levels):
+        if level > 0:
+            cells, parents = coarsen_cells(cells, ratio)
+            epsilon *= ratio
+            statistics.coarsen(parents, len(cells))
+            result_faces = rebuild_faces(result_faces, parents)
+        result_vertices = apply_representatives_fallback(statistics.representatives(cells, epsilon), cells, epsilon)
+        yield epsilon, result_vertices, result_faces
+
+
+def cluster_lod(vertices, faces, epsilon, levels, representative_method, filename_pattern, ratio=3):
+    """
+    Performs vertex clustering for all levels of detail (see lod_levels) and saves them to files.
+
+    :param filename_pattern: output filename with %d placeholder for the level (0 is the finest),
+     e.g. out/bunny_%d.off; format is chosen by extension: .off, .obj or .ply
+    :type filename_pattern: string
+    :return: filenames of the levels
+    :rtype: list
+    """
+    filenames = []
+    for level, (_, result_vertices, result_faces) in enumerate(
+            lod_levels(vertices, faces, epsilon, levels, representative_method, ratio)):
+        filename = filename_pattern % level
+        writer_for_filename(filename).write(result_vertices, result_faces)
+        filenames.append(filename)
+    return filenames
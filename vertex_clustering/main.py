@@ -3,53 +3,218 @@ from __future__ import print_function
 
 import sys
 
-from clustering import cluster
-from mesh_loader import ObjLoader, OffLoader
+import common_path  # makes shared modules importable
+from clustering import cluster_arrays
+from epsilon_search import EpsilonSearch, VERTICES, FACES
+from lod import cluster_lod
+from mesh_cache import MeshCache
+from mesh_writer import writer_for_filename
+from parallel import cluster_arrays_parallel
 from representative_functions import *
+from stats import ClusteringStats
+from streaming import cluster_mesh_streaming
 
 __author__ = "Michał Ciołczyk, Michał Janczykowski"
 
 _functions = ["center", "mean", "median", "quadric"]
 _functions_map = {
-    "center": dummy_representative,
-    "mean": mean_representative,
-    "median": median_representative,
-    "quadric": quadric_errors_representative
+    "center": dummy_representatives,
+    "mean": mean_representatives,
+    "median": median_representatives,
+    "quadric": quadric_errors_representatives
 }
 
 
-def cluster_mesh(mesh_filename, epsilon, function, output_filename):
+def function_names():
+    """
+    Returns names of representative functions accepted by cluster_mesh.
+
+    :rtype: list
+    """
+    return list(_functions)
+
+
+def representative_function(function):
+    """
+    Returns batched representative method of representative function's name.
+
+    :param function: name of representative function (one of function_names())
+    :type function: string
+    :rtype: function
+    """
+    if function not in _functions:
+        raise ValueError("Function must be in: %s." % str(_functions))
+    return _functions_map[function]
+
+
+def _load_arrays(mesh_filename):
+    if not mesh_filename.endswith('.obj') and not mesh_filename.endswith('.off'):
+        raise ValueError("Supporting only .obj and .off files!")
+    return MeshCache(mesh_filename).arrays()
+
+
+def cluster_mesh(mesh_filename, epsilon, function, output_filename, workers=1, profile_stages=None,
+                 profile_directory='.', target_vertices=None, target_faces=None, trace_memory=False):
     """
     Performs vertex clustering on mesh.
 
+    Instead of epsilon, target amount of output vertices or faces may be given: epsilon is then found
+    by EpsilonSearch (counting clusters and faces only) and just the chosen one is clustered.
+
     :param mesh_filename: input mesh filename
     :type mesh_filename: string
-    :param epsilon: epsilon used in algorithm (see docs)
+    :param epsilon: epsilon used in algorithm (see docs); None if target_vertices or target_faces is given
     :type epsilon: float
     :param function: representative method used in algorithm (see docs);
      must be one of: ["center", "mean", "median", "quadric"]
     :type function: string
-    :param output_filename: output mesh filename
+    :param output_filename: output mesh filename; format is chosen by extension: .off, .obj or .ply (binary)
     :type output_filename: string
+    :param workers: amount of processes clustering slabs of the grid in parallel (output does not depend on it)
+    :type workers: int
+    :param profile_stages: names of stages (e.g. ["loading", "representatives"]) or "all" to run under cProfile;
+     profiles of all calls of a stage are dumped to <profile_directory>/<stage>.prof at the end
+    :type profile_stages: list
+    :param profile_directory: directory of dumped profiles
+    :type profile_directory: string
+    :param target_vertices: wanted (maximum) amount of output vertices
+    :type target_vertices: int
+    :param target_faces: wanted (maximum) amount of output faces
+    :type target_faces: int
+    :param trace_memory: whether to trace peak memory of every stage (slows down allocations)
+    :type trace_memory: bool
+    :return: statistics of the run (stages' times and peak memory, buckets, dropped and duplicate faces;
+     epsilon and amount of probes of the search, if target was given)
+    :rtype: ClusteringStats
     """
     if function not in _functions:
         raise ValueError("Function must be in: %s." % str(_functions))
-    epsilon = float(epsilon)
+    targets = [(kind, int(target)) for kind, target in [(VERTICES, target_vertices), (FACES, target_faces)]
+               if target is not None]
+    if len(targets) > 1:
+        raise ValueError("Only one of target vertices and target faces may be given!")
+    if not targets:
+        epsilon = float(epsilon)
     if not mesh_filename.endswith('.obj') and not mesh_filename.endswith('.off'):
         raise ValueError("Supporting only .obj and .off files!")
+    writer_for_filename(output_filename)  # fails fast on unsupported output format
     method = _functions_map[function]
-    if mesh_filename.endswith('.obj'):
-        mesh_loader = ObjLoader(mesh_filename)
+    stats = ClusteringStats(profile_stages, profile_directory, trace_memory)
+    with stats.stage('loading'):
+        vertices, faces = _load_arrays(mesh_filename)
+    stats.count('input_vertices', len(vertices))
+    stats.count('input_faces', len(faces))
+    if targets:
+        target_kind, target = targets[0]
+        with stats.stage('epsilon_search'):
+            search = EpsilonSearch(vertices, faces)
+            epsilon = search.find_epsilon(target, target_kind)
+        stats.count('epsilon_probes', search.probes)
+        stats.record('epsilon', epsilon)
+    workers = int(workers)
+    if workers > 1:
+        _, result_faces = cluster_arrays_parallel(vertices, faces, epsilon, method, output_filename, workers, stats)
     else:
-        mesh_loader = OffLoader(mesh_filename)
-    mesh = mesh_loader.to_polyhedron()
-    cluster(mesh, epsilon, method, output_filename)
+        _, result_faces = cluster_arrays(vertices, faces, epsilon, method, output_filename, stats)
+    stats.count('output_faces', len(result_faces))
+    stats.dump_profiles()
+    return stats
+
+
+def cluster_mesh_lod(mesh_filename, epsilon, function, output_pattern, levels, ratio=3):
+    """
+    Performs vertex clustering on mesh for several levels of detail at once
+    (epsilon of level l is epsilon * ratio^l, see lod.lod_levels).
+
+    :param mesh_filename: input mesh filename
+    :type mesh_filename: string
+    :param epsilon: the finest epsilon
+    :type epsilon: float
+    :param function: representative method used in algorithm (see docs);
+     must be one of: ["center", "mean", "median", "quadric"]
+    :type function: string
+    :param output_pattern: output mesh filename with %d placeholder for the level (0 is the finest)
+    :type output_pattern: string
+    :param levels: amount of levels
+    :type levels: int
+    :param ratio: odd ratio of epsilons of consecutive levels
+    :type ratio: int
+    :return: filenames of the levels
+    :rtype: list
+    """
+    if function not in _functions:
+        raise ValueError("Function must be in: %s." % str(_functions))
+    if '%d' not in output_pattern:
+        raise ValueError("Output filename must contain %d placeholder for the level!")
+    writer_for_filename(output_pattern)  # fails fast on unsupported output format
+    vertices, faces = _load_arrays(mesh_filename)
+    return cluster_lod(vertices, faces, float(epsilon), int(levels), _functions_map[function], output_pattern,
+                       int(ratio))
+
+
+def _pop_option(argv, name, default=None):
+    """
+    Removes option name and its value from argv, returning the value (or default, if there is no such option).
+    """
+    if name not in argv[:-1]:
+        return default
+    position = argv.index(name)
+    value = argv[position + 1]
+    del argv[position:position + 2]
+    return value
 
 
 if __name__ == '__main__':
-    argv = sys.argv
+    argv = list(sys.argv)
+    workers = _pop_option(argv, '--workers')
+    target_vertices = _pop_option(argv, '--target-vertices')
+    target_faces = _pop_option(argv, '--target-faces')
+    profile_stages = _pop_option(argv, '--profile')
+    print_stats = '--stats' in argv
+    if print_stats:
+        argv.remove('--stats')
+    streaming = '--streaming' in argv
+    if streaming:
+        argv.remove('--streaming')
+    if target_vertices is not None or target_faces is not None:
+        if len(argv) > 4:
+            print("Target amount of vertices or faces cannot be combined with epsilon or levels of detail")
+            exit(1)
+        argv.insert(2, None)  # epsilon is searched for
     if len(argv) < 5:
-        print("Usage: python %s <mesh_filename> <epsilon> <method> <output_filename>" % argv[0])
+        print("Usage: python %s [--workers <n>] [--stats] [--profile <stages>] <mesh_filename> <epsilon> <method> "
+              "<output_filename> [<levels> [<ratio>]]" % argv[0])
+        print("   or: python %s [--workers <n>] [--stats] [--profile <stages>] "
+              "(--target-vertices <n> | --target-faces <n>) <mesh_filename> <method> <output_filename>" % argv[0])
+        print("   or: python %s --streaming <mesh_filename> <epsilon> <method> <output_filename>" % argv[0])
         print("\tWhere method is one of: %s" % str(_functions))
+        print("\tOutput format is chosen by extension: .off, .obj or .ply (binary)")
+        print("\tWith levels, output_filename must contain %d placeholder for the level (0 is the finest);")
+        print("\tepsilon of level l is epsilon * ratio^l (ratio must be odd, default 3);")
+        print("\tlevels are clustered in a single process, without --stats and --profile")
+        print("\tWith --workers, slabs of the grid are clustered by n processes (output is the same)")
+        print("\tWith --stats, times and peak memory of stages, counts of buckets and dropped faces are printed;")
+        print("\t--profile runs comma-separated stages (or all) under cProfile and dumps <stage>.prof files")
+        print("\tWith --target-vertices or --target-faces, epsilon giving at most n output vertices (faces)")
+        print("\tis searched for by counting clusters only, then the mesh is clustered once with it")
+        print("\tWith --streaming, the mesh file is read in a single pass, keeping only output-sized data in memory;")
+        print("\tmethod must be center, mean or quadric")
+        exit(1)
+    if streaming and (len(argv) > 5 or workers is not None or print_stats or profile_stages is not None
+                      or target_vertices is not None or target_faces is not None):
+        print("Streaming cannot be combined with levels of detail, target amounts, --workers, --stats or --profile")
         exit(1)
-    cluster_mesh(argv[1], argv[2], argv[3], argv[4])
+    if len(argv) > 5 and (workers is not None or print_stats or profile_stages is not None):
+        print("Levels of detail cannot be combined with --workers, --stats or --profile")
+        exit(1)
+    if streaming:
+        cluster_mesh_streaming(argv[1], argv[2], argv[3], argv[4])
+    elif len(argv) > 5:
+        cluster_mesh_lod(argv[1], argv[2], argv[3], argv[4], argv[5], *argv[6:7])
+    else:
+        if profile_stages is not None and profile_stages != 'all':
+            profile_stages = profile_stages.split(',')
+        stats = cluster_mesh(argv[1], argv[2], argv[3], argv[4], workers or 1, profile_stages,
+                             target_vertices=target_vertices, target_faces=target_faces, trace_memory=print_stats)
+        if print_stats:
+            print(stats)
@@ -0,0 +1,140 @@
+# coding: utf-8
+
+from __future__ import print_function
+
+import numpy as np
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+_ROWS_PER_CHUNK = 1 << 16
+
+
+def _write_rows(f, row_format, rows):
+    """
+    Formats rows of array in bulk (chunk by chunk) and writes them to text file.
+
+    :param f: opened text file
+    :param row_format: format of single row (with newline)
+    :type row_format: string
+    :param rows: array of shape (N, M)
+    :type rows: np.ndarray
+    """
+    for start in range(0, len(rows), _ROWS_PER_CHUNK):
+        chunk = rows[start:start + _ROWS_PER_CHUNK]
+        f.write((row_format * len(chunk)) % tuple(chunk.ravel().tolist()))
+
+
+class AbstractMeshWriter(object):
+    def __init__(self, filename):
+        self.filename = filename
+
+    def write(self, vertices, faces):
+        """
+        Writes mesh to file.
+        :param vertices: vertices array of shape (N, 3)
+        :param faces: faces array of shape (F, 3) (indices start from 0)
+        :type vertices: np.ndarray
+        :type faces: np.ndarray
+        """
+        raise NotImplementedError()
+
+
+class OffWriter(AbstractMeshWriter):
+    def __init__(self, filename):
+        super(OffWriter, self).__init__(filename)
+
+    def write(self, vertices, faces):
+        vertices = np.asarray(vertices, dtype=np.float64).reshape((-1, 3))
+        faces = np.asarray(faces, dtype=np.int64).reshape((-1, 3))
+        with open(self.filename, 'w') as f:
+            f.write('OFF\n%d %d 0\n\n' % (len(vertices), len(faces)))
+            _write_rows(f, '%.10f %.10f %.10f\n', vertices)
+            f.write('\n')
+            _write_rows(f, '3 %d %d %d\n', faces)
+            f.write('\n')
+
+
+class ObjWriter(AbstractMeshWriter):
+    def __init__(self, filename):
+        super(ObjWriter, self).__init__(filename)
+
+    def write(self, vertices, faces):
+        vertices = np.asarray(vertices, dtype=np.float64).reshape((-1, 3))
+        faces = np.asarray(faces, dtype=np.int64).reshape((-1, 3))
+        with open(self.filename, 'w') as f:
+            _write_rows(f, 'v %.10f %.10f %.10f\n', vertices)
+            _write_rows(f, 'f %d %d %d\n', faces + 1)
+
+
+class PlyWriter(AbstractMeshWriter):
+    def __init__(self, filename, binary=True):
+        """
+        :param filename: output filename
+        :param binary: if True, writes binary little endian PLY, ASCII PLY otherwise
+        """
+        super(PlyWriter, self).__init__(filename)
+        self.binary = binary
+
+    def _header(self, vertices_amount, faces_amount):
+        return '\n'.join([
+            'ply',
+            'format %s 1.0' % ('binary_little_endian' if self.binary else 'ascii'),
+            'element vertex %d' % vertices_amount,
+            'property double x',
+            'property double y',
+            'property double z',
+            'element face %d' % faces_amount,
+            'property list uchar int vertex_indices',
+            'end_header',
+            ''
+        ])
+
+    def write(self, vertices, faces):
+        vertices = np.asarray(vertices, dtype=np.float64).reshape((-1, 3))
+        faces = np.asarray(faces, dtype=np.int64).reshape((-1, 3))
+        header = self._header(len(vertices), len(faces))
+        if not self.binary:
+            with open(self.filename, 'w') as f:
+                f.write(header)
+                _write_rows(f, '%.10f %.10f %.10f\n', vertices)
+                _write_rows(f, '3 %d %d %d\n', faces)
+            return
+        binary_faces = np.empty(len(faces), dtype=[('n', '<u1'), ('vertices', '<i4', (3,))])
+        binary_faces['n'] = 3
+        binary_faces['vertices'] = faces
+        with open(self.filename, 'wb') as f:
+            f.write(header.encode('ascii'))
+            f.write(vertices.astype('<f8').tobytes())
+            f.write(binary_faces.tobytes())
+
+
+_writers_map = {
+    '.off': OffWriter,
+    '.obj': ObjWriter,
+    '.ply': PlyWriter
+}
+
+
+def writer_for_filename(filename):
+    """
+    Returns mesh writer matching filename's extension.
+
+    :param filename: output mesh filename
+    :type filename: string
+    :return: mesh writer
+    :rtype: AbstractMeshWriter
+    """
+    for extension, writer in _writers_map.items():
+        if filename.endswith(extension):
+            return writer(filename)
+    raise ValueError("Supporting only %s output files!" % ", ".join(sorted(_writers_map)))
+
+
+def output_extensions():
+    """
+    Returns extensions of supported output files (e.g. '.off').
+
+    :rtype: list
+    """
+    return sorted(_writers_map)
+
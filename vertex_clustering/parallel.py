@@ -0,0 +1,182 @@
+# coding: utf-8
+from __future__ import print_function
+
+import multiprocessing
+
+import numpy as np
+
+from bucket import quantize_vertices, pack_cells, number_by_first_appearance, apply_representatives_fallback
+from clustering import rebuild_faces
+from mesh_writer import writer_for_filename
+from representative_functions import quadric_errors_representatives
+from stats import ClusteringStats
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+_worker_state = {}
+
+
+def split_slabs(vertices, epsilon, slabs_amount):
+    """
+    Splits grid into slabs along x axis (between cells, so every cell belongs to a single slab),
+    with about the same amount of vertices in every slab.
+
+    :param vertices: vertices coordinates of shape (N, 3)
+    :type vertices: np.ndarray
+    :param epsilon: epsilon used in algorithm (see docs)
+    :type epsilon: float
+    :param slabs_amount: requested amount of slabs
+    :type slabs_amount: int
+    :return: slab of every vertex of shape (N,), amount of slabs
+    :rtype: np.ndarray, int
+    """
+    cells_x = quantize_vertices(vertices[:, :1], epsilon)[:, 0]
+    if len(cells_x) == 0:
+        return cells_x, 0
+    bounds = np.unique(np.percentile(cells_x, np.linspace(0, 100, slabs_amount + 1)[1:-1]).astype(np.int64))
+    return np.searchsorted(bounds, cells_x, side='right'), len(bounds) + 1
+
+
+def _partition(labels, labels_amount):
+    """
+    Returns positions grouped by label (in increasing order within every group) and bounds of the groups.
+    """
+    order = np.argsort(labels, kind='stable')
+    bounds = np.zeros(labels_amount + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=labels_amount), out=bounds[1:])
+    return order, bounds
+
+
+def _slab_tasks(vertices, faces, vertex_slabs, slabs_vertices_ids, with_faces):
+    """
+    Yields the part of the mesh the worker of every slab needs: coordinates of slab's vertices and,
+    if with_faces is set, faces with a corner in the slab (in their order) as rows of slab's vertices
+    followed by coordinates of their corners from other slabs.
+
+    :return: generator of (slab vertices, other corners or None, faces or None)
+    """
+    slabs_amount = len(slabs_vertices_ids)
+    if with_faces:
+        corner_slabs = np.sort(vertex_slabs[faces], axis=1)
+        # every distinct slab of face's corners gets the face
+        is_distinct = np.ones(corner_slabs.shape, dtype=bool)
+        is_distinct[:, 1:] = corner_slabs[:, 1:] != corner_slabs[:, :-1]
+        pairs_faces = np.nonzero(is_distinct)[0]
+        faces_order, faces_bounds = _partition(corner_slabs[is_distinct], slabs_amount)
+        faces_order = pairs_faces[faces_order]
+    for slab in range(slabs_amount):
+        vertices_ids = slabs_vertices_ids[slab]
+        slab_vertices = vertices[vertices_ids]
+        if not with_faces:
+            yield slab_vertices, None, None
+            continue
+        corners = faces[faces_order[faces_bounds[slab]:faces_bounds[slab + 1]]]
+        in_slab = vertex_slabs[corners] == slab
+        other_corners, other_rows = np.unique(corners[~in_slab], return_inverse=True)
+        slab_faces = np.empty(corners.shape, dtype=np.int64)
+        slab_faces[in_slab] = np.searchsorted(vertices_ids, corners[in_slab])
+        slab_faces[~in_slab] = len(vertices_ids) + other_rows.ravel()
+        yield slab_vertices, vertices[other_corners], slab_faces
+
+
+def _init_worker(epsilon, representative_method):
+    _worker_state.update(epsilon=epsilon, representative_method=representative_method)
+
+
+def _cluster_slab(task):
+    """
+    Clusters vertices of single slab (numbering clusters locally, in order of their first vertex).
+
+    :param task: slab vertices, corners from other slabs and faces (or None), see _slab_tasks
+    :return: local clusters' cells, local cluster id of every slab's vertex, position of first vertex
+     of every cluster, clusters' representatives
+    :rtype: np.ndarray, np.ndarray, np.ndarray, np.ndarray
+    """
+    slab_vertices, other_corners, slab_faces = task
+    epsilon = _worker_state['epsilon']
+    representative_method = _worker_state['representative_method']
+
+    cells, cluster_ids = number_by_first_appearance(pack_cells(quantize_vertices(slab_vertices, epsilon)))
+    # every cluster's id is bigger than ids of all vertices before its first vertex
+    seen_clusters = np.maximum.accumulate(cluster_ids)
+    is_first = np.ones(len(cluster_ids), dtype=bool)
+    is_first[1:] = seen_clusters[1:] != seen_clusters[:-1]
+    first_positions = np.flatnonzero(is_first)
+
+    if slab_faces is not None:
+        # corners from other slabs go to an extra (dropped) cluster; faces keep their order,
+        # so quadrics are summed exactly like in a single process
+        all_cluster_ids = np.concatenate([cluster_ids, np.full(len(other_corners), len(cells), dtype=np.int64)])
+        representatives = representative_method(np.concatenate([slab_vertices, other_corners]), slab_faces,
+                                                all_cluster_ids,
+                                                np.concatenate([cells, np.zeros((1, 3), dtype=np.int64)]),
+                                                epsilon)[:-1]
+    else:
+        representatives = representative_method(slab_vertices, None, cluster_ids, cells, epsilon)
+    representatives = apply_representatives_fallback(representatives, cells, epsilon)
+    return cells, cluster_ids, first_positions, representatives
+
+
+def cluster_arrays_parallel(vertices, faces, epsilon, representative_method, filename, workers, stats=None):
+    """
+    Performs vertex clustering in a pool of workers processes: grid is split into slabs (see split_slabs),
+    every slab is clustered by a worker, then clusters are numbered globally and faces are rebuilt.
+
+    Output is the same as the one of cluster_arrays.
+
+    :param vertices: input mesh vertices of shape (N, 3)
+    :param faces: input mesh faces of shape (F, 3) (indices start from 0)
+    :param epsilon: epsilon used in algorithm (see docs)
+    :param representative_method: batched representative method used in algorithm (see docs)
+    :param filename: filename of the ouput mesh
+    :param workers: amount of workers processes
+    :param stats: statistics to add to, if given (see ClusteringStats; slabs are not profiled in workers)
+
+    :type vertices: np.ndarray
+    :type faces: np.ndarray
+    :type epsilon: float
+    :type filename: string
+    :type representative_method: (np.ndarray, np.ndarray, np.ndarray, np.ndarray, float) -> np.ndarray
+    :type workers: int
+    :type stats: ClusteringStats
+    :return: output mesh vertices of shape (K, 3) and faces of shape (F', 3)
+    :rtype: np.ndarray, np.ndarray
+    """
+    if stats is None:
+        stats = ClusteringStats()
+    with stats.stage('slabs'):
+        vertex_slabs, slabs_amount = split_slabs(vertices, epsilon, workers)
+        vertices_order, vertices_bounds = _partition(vertex_slabs, slabs_amount)
+        slabs_vertices_ids = [vertices_order[vertices_bounds[slab]:vertices_bounds[slab + 1]]
+                              for slab in range(slabs_amount)]
+        tasks = _slab_tasks(vertices, faces, vertex_slabs, slabs_vertices_ids,
+                            representative_method is quadric_errors_representatives)
+        pool = multiprocessing.Pool(workers, _init_worker, (epsilon, representative_method))
+        try:
+            # tasks are generated while workers cluster the previous slabs
+            slabs = list(pool.imap(_cluster_slab, tasks))
+        finally:
+            pool.close()
+            pool.join()
+
+    with stats.stage('numbering'):
+        # clusters are numbered globally in order of their first vertex, like in assign_clusters
+        first_vertices = np.concatenate([np.zeros(0, dtype=np.int64)] +
+                                        [vertices_ids[slab[2]]
+                                         for vertices_ids, slab in zip(slabs_vertices_ids, slabs)])
+        order = np.argsort(first_vertices)
+        ranks = np.empty_like(order)
+        ranks[order] = np.arange(len(order))
+        cluster_ids = np.empty(len(vertices), dtype=np.int64)
+        offset = 0
+        for vertices_ids, (cells, slab_cluster_ids, _, _) in zip(slabs_vertices_ids, slabs):
+            cluster_ids[vertices_ids] = ranks[offset + slab_cluster_ids]
+            offset += len(cells)
+        result_vertices = np.concatenate([np.zeros((0, 3))] + [slab[3] for slab in slabs])[order]
+    stats.count('buckets', len(result_vertices))
+
+    with stats.stage('faces'):
+        result_faces = rebuild_faces(faces, cluster_ids, stats)
+    with stats.stage('writing'):
+        writer_for_filename(filename).write(result_vertices, result_faces)
+    return result_vertices, result_faces
@@ -1,17 +1,21 @@
 # coding: utf-8
 from __future__ import print_function, generators
 
-from functools import reduce
-from math import fsum
-
 import numpy as np
-from CGAL.CGAL_Polyhedron_3 import Polyhedron_3_Halfedge_around_facet_circulator
-from CGAL.CGAL_Polyhedron_3 import Polyhedron_3_Halfedge_around_vertex_circulator
-from CGAL.CGAL_Polyhedron_3 import Polyhedron_3_Halfedge_handle
-from CGAL.CGAL_Polyhedron_3 import Polyhedron_3_Vertex_handle
 from numpy.linalg import pinv, norm
 
+try:
+    from CGAL.CGAL_Polyhedron_3 import Polyhedron_3_Halfedge_around_facet_circulator
+    from CGAL.CGAL_Polyhedron_3 import Polyhedron_3_Halfedge_around_vertex_circulator
+    from CGAL.CGAL_Polyhedron_3 import Polyhedron_3_Halfedge_handle
+    from CGAL.CGAL_Polyhedron_3 import Polyhedron_3_Vertex_handle
+except ImportError:  # CGAL is needed only by the per-bucket functions
+    Polyhedron_3_Halfedge_around_facet_circulator = Polyhedron_3_Halfedge_around_vertex_circulator = None
+    Polyhedron_3_Halfedge_handle = Polyhedron_3_Vertex_handle = None
+
+import common_path  # makes shared modules importable
 from bucket import Bucket
+from cgal_bridge import point_coordinates
 
 __author__ = "Michał Ciołczyk, Michał Janczykowski"
 
@@ -28,6 +32,26 @@ def dummy_representative(bucket):
     return bucket.coordinates
 
 
+def dummy_representatives(vertices, faces, cluster_ids, cells, epsilon):
+    """
+    Dummy representative function for all clusters at once.
+
+    :param vertices: vertices coordinates of shape (N, 3)
+    :type vertices: np.ndarray
+    :param faces: faces of shape (F, 3)
+    :type faces: np.ndarray
+    :param cluster_ids: cluster id for every vertex of shape (N,)
+    :type cluster_ids: np.ndarray
+    :param cells: clusters' cells indices of shape (K, 3)
+    :type cells: np.ndarray
+    :param epsilon: epsilon used in algorithm (see docs)
+    :type epsilon: float
+    :return: clusters' representatives coordinates of shape (K, 3)
+    :rtype: np.ndarray
+    """
+    return cells * epsilon
+
+
 def mean_representative(bucket):
     """
     Mean representative function.
@@ -40,17 +64,74 @@ def mean_representative(bucket):
     n = len(bucket.original_vertices)
     if 0 == n:
         return bucket.coordinates
-    xs = []
-    ys = []
-    zs = []
-    for vertex in bucket.original_vertices:  # type: Polyhedron_3_Vertex_handle
-        vertex = [float(x) for x in str(vertex.point()).split()]
-        xs.append(vertex[0])
-        ys.append(vertex[1])
-        zs.append(vertex[2])
+    xs, ys, zs = zip(*bucket.original_points)
     return tuple([np.average(xs), np.average(ys), np.average(zs)])
 
 
+def cluster_segments(cluster_ids, clusters_amount):
+    """
+    Groups vertices by clusters.
+
+    :param cluster_ids: cluster id for every vertex of shape (N,)
+    :type cluster_ids: np.ndarray
+    :param clusters_amount: amount of clusters
+    :type clusters_amount: int
+    :return: vertices ids sorted by cluster (stable), first position and size of every cluster's segment
+    :rtype: np.ndarray, np.ndarray, np.ndarray
+    """
+    order = np.argsort(cluster_ids, kind='stable')
+    counts = np.bincount(cluster_ids, minlength=clusters_amount)
+    starts = np.zeros(clusters_amount, dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+    return order, starts, counts
+
+
+def mean_representatives(vertices, faces, cluster_ids, cells, epsilon):
+    """
+    Mean representative function for all clusters at once.
+
+    :param vertices: vertices coordinates of shape (N, 3)
+    :type vertices: np.ndarray
+    :param faces: faces of shape (F, 3)
+    :type faces: np.ndarray
+    :param cluster_ids: cluster id for every vertex of shape (N,)
+    :type cluster_ids: np.ndarray
+    :param cells: clusters' cells indices of shape (K, 3)
+    :type cells: np.ndarray
+    :param epsilon: epsilon used in algorithm (see docs)
+    :type epsilon: float
+    :return: clusters' representatives coordinates of shape (K, 3)
+    :rtype: np.ndarray
+    """
+    return segments_means(vertices, *cluster_segments(cluster_ids, len(cells)))
+
+
+def segments_means(vertices, order, starts, counts):
+    """
+    Means of vertices of all clusters given by their segments (see mean_representatives).
+
+    Segments are summed sequentially (np.bincount), so means may differ from np.average
+    of mean_representative in the last bits.
+
+    :param vertices: vertices coordinates of shape (N, 3)
+    :type vertices: np.ndarray
+    :param order: vertices ids sorted by cluster (stable) of shape (N,)
+    :type order: np.ndarray
+    :param starts: first position of every cluster's segment of shape (K,)
+    :type starts: np.ndarray
+    :param counts: size of every cluster's segment of shape (K,)
+    :type counts: np.ndarray
+    :return: clusters' means of shape (K, 3)
+    :rtype: np.ndarray
+    """
+    segments = np.repeat(np.arange(len(counts)), counts)
+    sorted_vertices = vertices[order]
+    representatives = np.empty((len(counts), 3))
+    for i in range(3):
+        representatives[:, i] = np.bincount(segments, sorted_vertices[:, i], minlength=len(counts)) / counts
+    return representatives
+
+
 def median_representative(bucket):
     """
     Mean representative function.
@@ -63,19 +144,66 @@ def median_representative(bucket):
     n = len(bucket.original_vertices)
     if 0 == n:
         return bucket.coordinates
-    xs = []
-    ys = []
-    zs = []
-    points = []
-    for vertex in bucket.original_vertices:  # type: Polyhedron_3_Vertex_handle
-        vertex = [float(x) for x in str(vertex.point()).split()]
-        points.append(tuple([vertex[0], vertex[1], vertex[2]]))
-        xs.append(vertex[0])
-        ys.append(vertex[1])
-        zs.append(vertex[2])
-    mean = tuple([np.median(xs), np.median(ys), np.median(zs)])
-    dist_sqr = lambda v1, v2: fsum([(v1[0] - v2[0]) ** 2, (v1[1] - v2[1]) ** 2, (v1[2] - v2[2]) ** 2])
-    return reduce(lambda acc, v: acc if dist_sqr(acc, mean) < dist_sqr(v, mean) else v, points)
+    points = np.array(bucket.original_points, dtype=np.float64)
+    dist_sqr = np.sum((points - np.median(points, axis=0)) ** 2, axis=1)
+    # the last of the closest points, like in a linear scan keeping the current one only when it is closer
+    return tuple(points[n - 1 - np.argmin(dist_sqr[::-1])].tolist())
+
+
+def median_representatives(vertices, faces, cluster_ids, cells, epsilon):
+    """
+    Median representative function for all clusters at once.
+
+    Like median_representative, returns the original vertex closest to the per-coordinate median
+    (the last one in case of a tie).
+
+    :param vertices: vertices coordinates of shape (N, 3)
+    :type vertices: np.ndarray
+    :param faces: faces of shape (F, 3)
+    :type faces: np.ndarray
+    :param cluster_ids: cluster id for every vertex of shape (N,)
+    :type cluster_ids: np.ndarray
+    :param cells: clusters' cells indices of shape (K, 3)
+    :type cells: np.ndarray
+    :param epsilon: epsilon used in algorithm (see docs)
+    :type epsilon: float
+    :return: clusters' representatives coordinates of shape (K, 3)
+    :rtype: np.ndarray
+    """
+    return segments_medians(vertices, cluster_ids, *cluster_segments(cluster_ids, len(cells)))
+
+
+def segments_medians(vertices, cluster_ids, order, starts, counts):
+    """
+    Vertices closest to per-coordinate medians of all clusters given by their segments
+    (see median_representatives).
+
+    :param vertices: vertices coordinates of shape (N, 3)
+    :type vertices: np.ndarray
+    :param cluster_ids: cluster id for every vertex of shape (N,)
+    :type cluster_ids: np.ndarray
+    :param order: vertices ids sorted by cluster (stable) of shape (N,)
+    :type order: np.ndarray
+    :param starts: first position of every cluster's segment of shape (K,)
+    :type starts: np.ndarray
+    :param counts: size of every cluster's segment of shape (K,)
+    :type counts: np.ndarray
+    :return: clusters' representatives coordinates of shape (K, 3)
+    :rtype: np.ndarray
+    """
+    lower_middles = starts + (counts - 1) // 2
+    upper_middles = starts + counts // 2
+    medians = np.empty((len(counts), 3))
+    for i in range(3):
+        sorted_coordinates = vertices[np.lexsort((vertices[:, i], cluster_ids)), i]
+        medians[:, i] = (sorted_coordinates[lower_middles] + sorted_coordinates[upper_middles]) / 2
+
+    sorted_vertices = vertices[order]
+    sorted_clusters = cluster_ids[order]
+    dist_sqr = np.sum((sorted_vertices - medians[sorted_clusters]) ** 2, axis=1)
+    is_closest = dist_sqr == np.minimum.reduceat(dist_sqr, starts)[sorted_clusters]
+    closest_positions = np.where(is_closest, np.arange(len(order)), -1)
+    return sorted_vertices[np.maximum.reduceat(closest_positions, starts)]
 
 
 def quadric_errors_representative(bucket):
@@ -103,7 +231,7 @@ def quadric_errors_representative(bucket):
             vertices = []
             for j in range(3):
                 facet_he = facet_circulator.next()  # type: Polyhedron_3_Halfedge_handle
-                vertices.append(tuple([float(x) for x in str(facet_he.vertex().point()).split()]))
+                vertices.append(point_coordinates(facet_he.vertex().point()))
 
             triangle_already_added = False
             n = len(vertices)
@@ -133,3 +261,103 @@ def quadric_errors_representative(bucket):
     pinv_A = pinv(A)
     representative = np.dot(pinv_A, b)
     return tuple([representative[0][0], representative[1][0], representative[2][0]])
+
+
+def face_planes(vertices, faces):
+    """
+    Computes planes of all faces at once.
+
+    Degenerate (zero area) faces get zero normals, so they do not contribute to quadrics.
+
+    :param vertices: vertices coordinates of shape (N, 3)
+    :type vertices: np.ndarray
+    :param faces: faces of shape (F, 3)
+    :type faces: np.ndarray
+    :return: unit normals of shape (F, 3), distances of planes from origin of shape (F,)
+    :rtype: np.ndarray, np.ndarray
+    """
+    p1 = vertices[faces[:, 0]]
+    p2 = vertices[faces[:, 1]]
+    p3 = vertices[faces[:, 2]]
+    normals = np.cross(p2 - p1, p3 - p1)
+    normals_norms = norm(normals, axis=1)
+    degenerate = normals_norms == 0
+    normals_norms[degenerate] = 1
+    normals /= normals_norms[:, np.newaxis]
+    normals[degenerate] = 0
+    distances = np.einsum('ij,ij->i', normals, p1)
+    return normals, distances
+
+
+def cluster_quadrics(face_clusters, normals, distances, clusters_amount):
+    """
+    Sums faces' quadrics into per cluster systems A x = b.
+
+    Every face is counted once for every (distinct) cluster it touches.
+
+    :param face_clusters: cluster id of every face corner of shape (F, 3)
+    :type face_clusters: np.ndarray
+    :param normals: faces' unit normals of shape (F, 3)
+    :type normals: np.ndarray
+    :param distances: faces' planes distances from origin of shape (F,)
+    :type distances: np.ndarray
+    :param clusters_amount: amount of clusters
+    :type clusters_amount: int
+    :return: A of shape (K, 3, 3), b of shape (K, 3)
+    :rtype: np.ndarray, np.ndarray
+    """
+    corners_mask = np.ones(face_clusters.shape, dtype=bool)
+    corners_mask[:, 1] = face_clusters[:, 1] != face_clusters[:, 0]
+    corners_mask[:, 2] = (face_clusters[:, 2] != face_clusters[:, 0]) & (face_clusters[:, 2] != face_clusters[:, 1])
+    pairs_faces = np.nonzero(corners_mask)[0]
+    pairs_clusters = face_clusters[corners_mask]
+    pairs_normals = normals[pairs_faces]
+
+    A = np.empty((clusters_amount, 3, 3))
+    b = np.empty((clusters_amount, 3))
+    for i in range(3):
+        for j in range(i, 3):
+            A[:, i, j] = np.bincount(pairs_clusters, pairs_normals[:, i] * pairs_normals[:, j],
+                                     minlength=clusters_amount)
+            A[:, j, i] = A[:, i, j]
+        b[:, i] = np.bincount(pairs_clusters, distances[pairs_faces] * pairs_normals[:, i],
+                              minlength=clusters_amount)
+    return A, b
+
+
+def solve_quadrics(A, b):
+    """
+    Solves all clusters' systems A x = b at once (using stacked pseudo-inverse).
+
+    :param A: matrices of shape (K, 3, 3)
+    :type A: np.ndarray
+    :param b: vectors of shape (K, 3)
+    :type b: np.ndarray
+    :return: solutions of shape (K, 3)
+    :rtype: np.ndarray
+    """
+    if len(A) == 0:
+        return np.zeros((0, 3))
+    return np.matmul(pinv(A), b[:, :, np.newaxis])[:, :, 0]
+
+
+def quadric_errors_representatives(vertices, faces, cluster_ids, cells, epsilon):
+    """
+    Quadric errors representative function for all clusters at once.
+
+    :param vertices: vertices coordinates of shape (N, 3)
+    :type vertices: np.ndarray
+    :param faces: faces of shape (F, 3)
+    :type faces: np.ndarray
+    :param cluster_ids: cluster id for every vertex of shape (N,)
+    :type cluster_ids: np.ndarray
+    :param cells: clusters' cells indices of shape (K, 3)
+    :type cells: np.ndarray
+    :param epsilon: epsilon used in algorithm (see docs)
+    :type epsilon: float
+    :return: clusters' representatives coordinates of shape (K, 3)
+    :rtype: np.ndarray
+    """
+    normals, distances = face_planes(vertices, faces)
+    A, b = cluster_quadrics(cluster_ids[faces], normals, distances, len(cells))
+    return solve_quadrics(A, b)
@@ -0,0 +1,208 @@
+# coding: utf-8
+from __future__ import print_function
+
+import numpy as np
+
+import common_path  # makes shared modules importable
+from bucket import assign_clusters, apply_representatives_fallback
+from clustering import rebuild_faces
+from epsilon_search import EpsilonSearch
+from mesh_cache import MeshCache
+from mesh_writer import writer_for_filename
+from representative_functions import dummy_representatives, mean_representatives, median_representatives, \
+    quadric_errors_representatives, cluster_segments, segments_means, segments_medians, face_planes, \
+    cluster_quadrics, solve_quadrics
+from spatial_index import SpatialGrid
+from stats import ClusteringStats
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+
+def _read_only(array):
+    """
+    Returns read-only view of array (the array itself is not changed).
+    """
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class _Assignment(object):
+    """
+    Clusters of all vertices for single epsilon and everything derived from them (computed when first needed).
+    """
+
+    def __init__(self, cells, cluster_ids):
+        self.cells = cells
+        self.cluster_ids = cluster_ids
+        self.segments = None
+        self.face_clusters = None
+        self.faces = None
+        self.dropped_faces = 0
+        self.duplicate_faces = 0
+        self.representatives = {}
+
+
+class ClusteringSession(object):
+    """
+    Vertex clustering of a single mesh, run many times with different epsilons and representative methods.
+
+    Work that does not depend on the method is done once and cached: face planes (for quadrics), spatial index,
+    epsilon search and, for every epsilon, clusters of vertices, their segments, faces mapped to clusters
+    and rebuilt output faces.
+    Representatives are cached for every (epsilon, method), so repeated runs only write the output.
+
+    Results are the same as the ones of cluster_arrays. Returned arrays are shared with the cache (read-only).
+    Input arrays are not copied, so they must not change while the session is used.
+    """
+
+    def __init__(self, vertices, faces):
+        # not copied (e.g. memory-mapped arrays of MeshCache), unless they have other dtypes
+        self.vertices = _read_only(np.asarray(vertices, dtype=np.float64).reshape((-1, 3)))
+        self.faces = _read_only(np.asarray(faces, dtype=np.int64).reshape((-1, 3)))
+        self._face_planes = None
+        self._spatial_index = None
+        self._epsilon_search = None
+        self._assignments = {}
+
+    @classmethod
+    def from_file(cls, mesh_filename):
+        """
+        Creates session of mesh loaded from .off or .obj file (through MeshCache).
+        """
+        return cls(*MeshCache(mesh_filename).arrays())
+
+    def face_planes(self):
+        """
+        :return: faces' unit normals of shape (F, 3), distances of planes from origin of shape (F,)
+        :rtype: np.ndarray, np.ndarray
+        """
+        if self._face_planes is None:
+            self._face_planes = tuple(_read_only(array) for array in face_planes(self.vertices, self.faces))
+        return self._face_planes
+
+    def spatial_index(self):
+        """
+        :return: spatial index over input vertices (for nearest vertex and radius queries)
+        :rtype: SpatialGrid
+        """
+        if self._spatial_index is None:
+            self._spatial_index = SpatialGrid(self.vertices)
+        return self._spatial_index
+
+    def epsilon_search(self):
+        """
+        :return: search of epsilon for target amounts of output vertices or faces (remembering all probes)
+        :rtype: EpsilonSearch
+        """
+        if self._epsilon_search is None:
+            self._epsilon_search = EpsilonSearch(self.vertices, self.faces)
+        return self._epsilon_search
+
+    def _assignment(self, epsilon, stats):
+        epsilon = float(epsilon)
+        if epsilon not in self._assignments:
+            with stats.stage('bucketing'):
+                self._assignments[epsilon] = _Assignment(*assign_clusters(self.vertices, epsilon))
+        return self._assignments[epsilon]
+
+    def clusters(self, epsilon, stats=None):
+        """
+        :return: clusters' cells indices of shape (K, 3), cluster id for every vertex of shape (N,)
+        :rtype: np.ndarray, np.ndarray
+        """
+        assignment = self._assignment(epsilon, stats or ClusteringStats())
+        return assignment.cells, assignment.cluster_ids
+
+    def _segments(self, assignment):
+        if assignment.segments is None:
+            assignment.segments = cluster_segments(assignment.cluster_ids, len(assignment.cells))
+        return assignment.segments
+
+    def _face_clusters(self, assignment):
+        if assignment.face_clusters is None:
+            assignment.face_clusters = assignment.cluster_ids[self.faces]
+        return assignment.face_clusters
+
+    def _representatives(self, assignment, epsilon, representative_method):
+        if representative_method is dummy_representatives:
+            return dummy_representatives(self.vertices, self.faces, assignment.cluster_ids, assignment.cells,
+                                         epsilon)
+        elif representative_method is mean_representatives:
+            return segments_means(self.vertices, *self._segments(assignment))
+        elif representative_method is median_representatives:
+            return segments_medians(self.vertices, assignment.cluster_ids, *self._segments(assignment))
+        elif representative_method is quadric_errors_representatives:
+            normals, distances = self.face_planes()
+            return solve_quadrics(*cluster_quadrics(self._face_clusters(assignment), normals, distances,
+                                                    len(assignment.cells)))
+        return representative_method(self.vertices, self.faces, assignment.cluster_ids, assignment.cells, epsilon)
+
+    def representatives(self, epsilon, representative_method, stats=None):
+        """
+        :return: clusters' representatives coordinates of shape (K, 3)
+        :rtype: np.ndarray
+        """
+        if stats is None:
+            stats = ClusteringStats()
+        epsilon = float(epsilon)
+        assignment = self._assignment(epsilon, stats)
+        if representative_method not in assignment.representatives:
+            with stats.stage('representatives'):
+                representatives = self._representatives(assignment, epsilon, representative_method)
+                representatives = apply_representatives_fallback(representatives, assignment.cells, epsilon)
+            assignment.representatives[representative_method] = _read_only(representatives)
+        return assignment.representatives[representative_method]
+
+    def result_faces(self, epsilon, stats=None):
+        """
+        :return: result mesh faces of shape (F', 3) (see rebuild_faces)
+        :rtype: np.ndarray
+        """
+        if stats is None:
+            stats = ClusteringStats()
+        assignment = self._assignment(epsilon, stats)
+        if assignment.faces is None:
+            with stats.stage('faces'):
+                faces_stats = ClusteringStats()
+                assignment.faces = _read_only(rebuild_faces(self.faces, assignment.cluster_ids, faces_stats))
+            assignment.dropped_faces = faces_stats.counters['dropped_faces']
+            assignment.duplicate_faces = faces_stats.counters['duplicate_faces']
+        return assignment.faces
+
+    def cluster(self, epsilon, representative_method, filename=None, stats=None):
+        """
+        Performs vertex clustering (like cluster_arrays), reusing everything cached by previous runs.
+
+        :param epsilon: epsilon used in algorithm (see docs)
+        :type epsilon: float
+        :param representative_method: batched representative method used in algorithm (see docs)
+        :type representative_method: (np.ndarray, np.ndarray, np.ndarray, np.ndarray, float) -> np.ndarray
+        :param filename: filename of the ouput mesh (nothing is written if it is None)
+        :type filename: string
+        :param stats: statistics to add to, if given (cached stages are not measured again)
+        :type stats: ClusteringStats
+        :return: output mesh vertices of shape (K, 3) and faces of shape (F', 3)
+        :rtype: np.ndarray, np.ndarray
+        """
+        if stats is None:
+            stats = ClusteringStats()
+        result_vertices = self.representatives(epsilon, representative_method, stats)
+        result_faces = self.result_faces(epsilon, stats)
+        assignment = self._assignments[float(epsilon)]
+        stats.count('buckets', len(assignment.cells))
+        stats.count('dropped_faces', assignment.dropped_faces)
+        stats.count('duplicate_faces', assignment.duplicate_faces)
+        if filename is not None:
+            with stats.stage('writing'):
+                writer_for_filename(filename).write(result_vertices, result_faces)
+        return result_vertices, result_faces
+
+    def forget(self, epsilon=None):
+        """
+        Drops cached clusters (and everything derived from them) of epsilon, or of all epsilons if it is None.
+        """
+        if epsilon is None:
+            self._assignments.clear()
+        else:
+            self._assignments.pop(float(epsilon), None)
@@ -0,0 +1,152 @@
+# coding: utf-8
+from __future__ import print_function
+
+import cProfile
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+from timeit import default_timer
+
+try:
+    import tracemalloc
+except ImportError:  # not available before Python 3.4
+    tracemalloc = None
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+ALL_STAGES = 'all'
+
+
+class ClusteringStats(object):
+    """
+    Collects statistics of clustering: wall time, calls count and (if trace_memory is set) peak memory
+    of every stage, counters (e.g. buckets, dropped and duplicate faces) and other values (e.g. chosen epsilon).
+
+    Peak memory of a stage is the most memory allocated by Python and numpy (traced with tracemalloc)
+    above the amount allocated when the stage started; tracing slows down allocations, so it is optional.
+    Memory of other processes (e.g. workers) is not traced.
+
+    Stages listed in profile_stages (or all of them, if it is ALL_STAGES) are run under cProfile, one profile
+    per stage accumulating all its calls; dump_profiles writes them to <profile_directory>/<stage>.prof
+    (see pstats module).
+    """
+
+    def __init__(self, profile_stages=None, profile_directory='.', trace_memory=False):
+        self.stages = OrderedDict()
+        self.counters = OrderedDict()
+        self.values = OrderedDict()
+        self.profiles = OrderedDict()
+        self._profilers = OrderedDict()
+        if profile_stages is None:
+            profile_stages = []
+        elif profile_stages != ALL_STAGES:
+            profile_stages = list(profile_stages)
+        self.profile_stages = profile_stages
+        self.profile_directory = profile_directory
+        self.trace_memory = trace_memory and tracemalloc is not None
+        self._traced_stages = []  # [memory at start, peak seen before inner stages] of running stages
+        self._started_tracing = False
+
+    def _is_profiled(self, name):
+        return self.profile_stages == ALL_STAGES or name in self.profile_stages
+
+    def _start_tracing(self):
+        if not self._traced_stages:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._traced_stages:
+            outer = self._traced_stages[-1]
+            outer[1] = max(outer[1], peak)
+        tracemalloc.reset_peak()
+        self._traced_stages.append([current, current])
+
+    def _stop_tracing(self):
+        """
+        Returns peak memory allocated since the start of the innermost stage, above the memory at its start.
+        """
+        start, seen_peak = self._traced_stages.pop()
+        peak = max(seen_peak, tracemalloc.get_traced_memory()[1])
+        if self._traced_stages:
+            outer = self._traced_stages[-1]
+            outer[1] = max(outer[1], peak)
+            tracemalloc.reset_peak()
+        elif self._started_tracing:
+            tracemalloc.stop()
+        return peak - start
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measures (and profiles, if requested) code run inside the with block as stage name.
+        """
+        profile = None
+        if self._is_profiled(name):
+            profile = self._profilers.setdefault(name, cProfile.Profile())
+        if self.trace_memory:
+            self._start_tracing()
+        start = default_timer()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            elapsed = default_timer() - start
+            stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            stage['seconds'] += elapsed
+            stage['calls'] += 1
+            if self.trace_memory:
+                stage['peak_memory'] = max(stage.get('peak_memory', 0), self._stop_tracing())
+
+    def dump_profiles(self):
+        """
+        Dumps profiles of profiled stages to <profile_directory>/<stage>.prof.
+
+        :return: filenames of the profiles by stages
+        :rtype: dict
+        """
+        if self._profilers and not os.path.isdir(self.profile_directory):
+            os.makedirs(self.profile_directory)
+        for name, profile in self._profilers.items():
+            filename = os.path.join(self.profile_directory, '%s.prof' % name)
+            profile.dump_stats(filename)
+            self.profiles[name] = filename
+        return dict(self.profiles)
+
+    def count(self, name, value):
+        """
+        Adds value to counter name.
+        """
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def record(self, name, value):
+        """
+        Records value (not summed like counters) under name.
+        """
+        self.values[name] = value
+
+    def as_dict(self):
+        return {
+            'stages': dict(self.stages),
+            'counters': dict(self.counters),
+            'values': dict(self.values),
+            'profiles': dict(self.profiles)
+        }
+
+    def __str__(self):
+        lines = []
+        for name, stage in self.stages.items():
+            line = '%-16s %10.4f s  (%d calls)' % (name, stage['seconds'], stage['calls'])
+            if 'peak_memory' in stage:
+                line += '  peak %.1f MB' % (stage['peak_memory'] / float(1 << 20))
+            lines.append(line)
+        for name, value in self.counters.items():
+            lines.append('%-16s %10d' % (name, value))
+        for name, value in self.values.items():
+            lines.append('%-16s %10g' % (name, value))
+        for name, filename in self.profiles.items():
+            lines.append('profile of %s: %s' % (name, filename))
+        return '\n'.join(lines)
@@ -0,0 +1,296 @@
+# coding: utf-8
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+import common_path  # makes shared modules importable
+from bucket import quantize_vertices, pack_cells, unpack_keys, apply_representatives_fallback
+from clustering import unique_triangles
+from mesh_loader import ObjLoader, OffLoader
+from mesh_writer import writer_for_filename
+from representative_functions import face_planes, cluster_quadrics, solve_quadrics
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+_LINES_PER_CHUNK = 1 << 16
+
+
+def _grown(array, size):
+    """
+    Returns array with at least size rows (capacity grows twice, new rows are zeros).
+    """
+    if len(array) >= size:
+        return array
+    grown = np.zeros((max(size, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class _ClustersTable(object):
+    """
+    Numbers grid cells chunk by chunk in order of their first vertex (just like assign_clusters).
+
+    Keeps only the keys of already seen cells, so its size depends on the output mesh only. Keys are kept
+    in sorted runs, each more than twice as long as the next one: new keys of a chunk form a run, which is
+    merged with the previous ones when that would break the rule, so every key is merged O(log K) times
+    and a lookup searches O(log K) runs.
+    """
+
+    def __init__(self):
+        self.runs = []
+        self.new_keys = []
+        self.amount = 0
+
+    def _find(self, keys):
+        """
+        Returns ids of keys (-1 for not seen ones).
+        """
+        ids = np.full(len(keys), -1, dtype=np.int64)
+        for run_keys, run_ids in self.runs:
+            positions = np.minimum(np.searchsorted(run_keys, keys), len(run_keys) - 1)
+            found = run_keys[positions] == keys
+            ids[found] = run_ids[positions[found]]
+        return ids
+
+    def _add_run(self, sorted_keys, sorted_ids):
+        self.runs.append((sorted_keys, sorted_ids))
+        while len(self.runs) > 1 and len(self.runs[-2][0]) <= 2 * len(self.runs[-1][0]):
+            (keys_a, ids_a), (keys_b, ids_b) = self.runs.pop(), self.runs.pop()
+            keys = np.concatenate([keys_a, keys_b])
+            order = np.argsort(keys, kind='mergesort')
+            self.runs.append((keys[order], np.concatenate([ids_a, ids_b])[order]))
+
+    def cluster_ids(self, keys):
+        """
+        Returns cluster id for every key, numbering the keys seen for the first time.
+        """
+        unique_keys, first_positions, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        unique_ids = self._find(unique_keys)
+        new = np.nonzero(unique_ids < 0)[0]
+        new_in_order = new[np.argsort(first_positions[new])]
+        unique_ids[new_in_order] = self.amount + np.arange(len(new))
+
+        if len(new):
+            self._add_run(unique_keys[new], unique_ids[new])
+        self.new_keys.append(unique_keys[new_in_order])
+        self.amount += len(new)
+        return unique_ids[inverse.ravel()]
+
+    def cells(self):
+        """
+        Returns clusters' cells indices of shape (K, 3).
+        """
+        return unpack_keys(np.concatenate(self.new_keys + [np.zeros(0, dtype=np.int64)]))
+
+
+class _VerticesStore(object):
+    """
+    Stores cluster id (and optionally coordinates) of every read vertex in files in directory,
+    which are memory-mapped for reading faces (so they do not need to fit in memory).
+    """
+
+    def __init__(self, directory, store_coordinates):
+        self.store_coordinates = store_coordinates
+        self.clusters_filename = os.path.join(directory, 'clusters.bin')
+        self.coordinates_filename = os.path.join(directory, 'coordinates.bin')
+        self.clusters_file = open(self.clusters_filename, 'wb')
+        self.coordinates_file = open(self.coordinates_filename, 'wb') if store_coordinates else None
+        self.amount = 0
+        self.mapped_amount = 0
+        self.clusters = self.coordinates = None
+
+    def append(self, cluster_ids, vertices):
+        self.clusters_file.write(np.ascontiguousarray(cluster_ids, dtype=np.int64).tobytes())
+        if self.store_coordinates:
+            self.coordinates_file.write(np.ascontiguousarray(vertices, dtype=np.float64).tobytes())
+        self.amount += len(cluster_ids)
+
+    def arrays(self):
+        """
+        Returns memory-mapped clusters ids of shape (N,) and coordinates of shape (N, 3) (or None)
+        of all vertices appended so far.
+        """
+        if self.mapped_amount != self.amount and self.amount:
+            self.clusters_file.flush()
+            self.clusters = np.memmap(self.clusters_filename, dtype=np.int64, mode='r', shape=(self.amount,))
+            if self.store_coordinates:
+                self.coordinates_file.flush()
+                self.coordinates = np.memmap(self.coordinates_filename, dtype=np.float64, mode='r',
+                                             shape=(self.amount, 3))
+            self.mapped_amount = self.amount
+        return self.clusters, self.coordinates
+
+    def close(self):
+        self.clusters = self.coordinates = None
+        self.clusters_file.close()
+        if self.coordinates_file is not None:
+            self.coordinates_file.close()
+
+
+class _FacesCollector(object):
+    """
+    Collects result faces chunk by chunk, dropping duplicates from time to time
+    (so that it keeps about as many faces as the output mesh has).
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.compacted_amount = 0
+        self.amount = 0
+
+    def append(self, clustered_faces):
+        faces = unique_triangles(clustered_faces)
+        self.chunks.append(faces)
+        self.amount += len(faces)
+        if self.amount > 2 * self.compacted_amount + len(clustered_faces):
+            self._compact()
+
+    def _compact(self):
+        self.chunks = [unique_triangles(np.concatenate(self.chunks))]
+        self.amount = self.compacted_amount = len(self.chunks[0])
+
+    def faces(self):
+        if not self.chunks:
+            return np.zeros((0, 3), dtype=np.int64)
+        self._compact()
+        return self.chunks[0]
+
+
+class _CenterAccumulators(object):
+    needs_coordinates = False
+
+    def add_vertices(self, vertices, cluster_ids, clusters_amount):
+        pass
+
+    def add_faces(self, coordinates, faces, face_clusters, clusters_amount):
+        pass
+
+    def representatives(self, cells, epsilon):
+        return cells * epsilon
+
+
+class _MeanAccumulators(object):
+    needs_coordinates = False
+
+    def __init__(self):
+        self.counts = np.zeros(0)
+        self.sums = np.zeros((0, 3))
+
+    def add_vertices(self, vertices, cluster_ids, clusters_amount):
+        self.counts = _grown(self.counts, clusters_amount)
+        self.sums = _grown(self.sums, clusters_amount)
+        self.counts[:clusters_amount] += np.bincount(cluster_ids, minlength=clusters_amount)
+        for i in range(3):
+            self.sums[:clusters_amount, i] += np.bincount(cluster_ids, vertices[:, i], minlength=clusters_amount)
+
+    def add_faces(self, coordinates, faces, face_clusters, clusters_amount):
+        pass
+
+    def representatives(self, cells, epsilon):
+        return self.sums[:len(cells)] / self.counts[:len(cells), np.newaxis]
+
+
+class _QuadricAccumulators(object):
+    needs_coordinates = True
+
+    def __init__(self):
+        self.A = np.zeros((0, 3, 3))
+        self.b = np.zeros((0, 3))
+
+    def add_vertices(self, vertices, cluster_ids, clusters_amount):
+        pass
+
+    def add_faces(self, coordinates, faces, face_clusters, clusters_amount):
+        self.A = _grown(self.A, clusters_amount)
+        self.b = _grown(self.b, clusters_amount)
+        normals, distances = face_planes(coordinates, faces)
+        A, b = cluster_quadrics(face_clusters, normals, distances, clusters_amount)
+        self.A[:clusters_amount] += A
+        self.b[:clusters_amount] += b
+
+    def representatives(self, cells, epsilon):
+        return solve_quadrics(_grown(self.A, len(cells))[:len(cells)], _grown(self.b, len(cells))[:len(cells)])
+
+
+_accumulators_map = {
+    "center": _CenterAccumulators,
+    "mean": _MeanAccumulators,
+    "quadric": _QuadricAccumulators
+}
+_streaming_functions = ["center", "mean", "quadric"]
+
+
+def cluster_mesh_streaming(mesh_filename, epsilon, function, output_filename, lines_per_chunk=_LINES_PER_CHUNK,
+                           temporary_directory=None):
+    """
+    Performs out-of-core vertex clustering: reads mesh file in a single pass, chunk by chunk,
+    keeping only per cluster accumulators in memory (cluster id of every vertex is kept in a memory-mapped
+    temporary file, coordinates too for quadric method).
+
+    Gives the same clusters and faces as cluster_mesh (representatives may differ by summation order).
+
+    :param mesh_filename: input mesh filename (.off or .obj)
+    :type mesh_filename: string
+    :param epsilon: epsilon used in algorithm (see docs)
+    :type epsilon: float
+    :param function: representative method used in algorithm (see docs);
+     must be one of: ["center", "mean", "quadric"] (median needs all clusters' vertices at once)
+    :type function: string
+    :param output_filename: output mesh filename; format is chosen by extension: .off, .obj or .ply (binary)
+    :type output_filename: string
+    :param lines_per_chunk: amount of lines of input file parsed at once
+    :type lines_per_chunk: int
+    :param temporary_directory: directory for temporary files (system's default if None)
+    :type temporary_directory: string
+    """
+    if function not in _streaming_functions:
+        raise ValueError("Function must be in: %s." % str(_streaming_functions))
+    epsilon = float(epsilon)
+    if mesh_filename.endswith('.obj'):
+        mesh_loader = ObjLoader(mesh_filename)
+    elif mesh_filename.endswith('.off'):
+        mesh_loader = OffLoader(mesh_filename)
+    else:
+        raise ValueError("Supporting only .obj and .off files!")
+    writer = writer_for_filename(output_filename)
+
+    accumulators = _accumulators_map[function]()
+    clusters_table = _ClustersTable()
+    faces_collector = _FacesCollector()
+    directory = tempfile.mkdtemp(dir=temporary_directory)
+    vertices_store = _VerticesStore(directory, accumulators.needs_coordinates)
+    try:
+        for kind, chunk in mesh_loader.iter_arrays(lines_per_chunk):
+            if kind == 'vertices':
+                cluster_ids = clusters_table.cluster_ids(pack_cells(quantize_vertices(chunk, epsilon)))
+                accumulators.add_vertices(chunk, cluster_ids, clusters_table.amount)
+                vertices_store.append(cluster_ids, chunk)
+            else:
+                if len(chunk) and (chunk.min() < 0 or chunk.max() >= vertices_store.amount):
+                    raise ValueError("Faces must refer to vertices given before them in streamed mesh files!")
+                vertex_clusters, coordinates = vertices_store.arrays()
+                face_clusters = vertex_clusters[chunk]
+                accumulators.add_faces(coordinates, chunk, face_clusters, clusters_table.amount)
+                faces_collector.append(face_clusters)
+    finally:
+        vertices_store.close()
+        shutil.rmtree(directory)
+
+    cells = clusters_table.cells()
+    result_vertices = apply_representatives_fallback(accumulators.representatives(cells, epsilon), cells, epsilon)
+    writer.write(result_vertices, faces_collector.faces())
+
+
+if __name__ == '__main__':
+    argv = sys.argv
+    if len(argv) < 5:
+        print("Usage: python %s <mesh_filename> <epsilon> <method> <output_filename>" % argv[0])
+        print("\tWhere method is one of: %s" % str(_streaming_functions))
+        print("\tOutput format is chosen by extension: .off, .obj or .ply (binary)")
+        exit(1)
+    cluster_mesh_streaming(argv[1], argv[2], argv[3], argv[4])
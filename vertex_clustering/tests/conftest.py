@@ -0,0 +1,9 @@
+# coding: utf-8
+import os
+import sys
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+# modules of the package import each other by plain names
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import common_path  # makes shared modules importable
@@ -0,0 +1,23 @@
+# coding: utf-8
+import os
+
+import pytest
+
+from batch import make_jobs, run_batch
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_every_mesh_is_loaded_once(workers, tmp_path, monkeypatch):
+    monkeypatch.setenv('MESH_CACHE_DIR', '')
+    meshes = [os.path.join(DATA_DIRECTORY, name) for name in ['sphere.off', 'torus.off', 'test1.off']]
+    jobs, _ = make_jobs(meshes, [0.05, 0.1, 0.2], ['center', 'mean'], str(tmp_path), '.off')
+    reports = []
+    assert run_batch(jobs, workers, reports.append) == 0
+    assert sorted(report['output'] for report in reports) == sorted(job[3] for job in jobs)
+    for mesh in meshes:
+        loads = [report for report in reports if report['mesh'] == mesh and report['load_seconds'] > 0]
+        assert len(loads) == 1
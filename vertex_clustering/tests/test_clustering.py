@@ -0,0 +1,132 @@
+# coding: utf-8
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from bucket import assign_clusters
+from clustering import cluster_arrays, rebuild_faces
+from lod import lod_levels
+from mesh_loader import OffLoader
+from parallel import cluster_arrays_parallel
+from representative_functions import dummy_representatives, mean_representatives, median_representatives, \
+    quadric_errors_representatives
+from session import ClusteringSession
+from streaming import cluster_mesh_streaming
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+MESHES = sorted(os.path.basename(filename) for filename in glob.glob(os.path.join(DATA_DIRECTORY, '*.off')))
+METHODS = [dummy_representatives, mean_representatives, median_representatives, quadric_errors_representatives]
+EPSILON_FRACTIONS = [0.0213, 0.0731]  # not round, so that no vertices lie on cells' boundaries
+
+
+def load_mesh(name):
+    return OffLoader(os.path.join(DATA_DIRECTORY, name)).to_arrays()
+
+
+def epsilons(vertices):
+    extent = float((vertices.max(axis=0) - vertices.min(axis=0)).max())
+    return [fraction * extent for fraction in EPSILON_FRACTIONS]
+
+
+def rebuild_faces_loop(faces, cluster_ids):
+    """
+    Face loop of cluster (the per-face reference implementation of rebuild_faces).
+    """
+    faces_set = set()
+    result_faces = []
+    for face in faces.tolist():
+        clustered = [int(cluster_ids[v]) for v in face]
+        if len(set(clustered)) != 3:
+            continue
+        rotations = [tuple(clustered[i - j] for i in range(3)) for j in range(3)]
+        if any(rotation in faces_set for rotation in rotations):
+            continue
+        faces_set.update(rotations)
+        result_faces.append(clustered)
+    return np.array(result_faces, dtype=np.int64).reshape((-1, 3))
+
+
+@pytest.mark.parametrize('name', MESHES)
+def test_rebuild_faces_matches_faces_loop(name):
+    vertices, faces = load_mesh(name)
+    for epsilon in epsilons(vertices):
+        _, cluster_ids = assign_clusters(vertices, epsilon)
+        assert np.array_equal(rebuild_faces(faces, cluster_ids), rebuild_faces_loop(faces, cluster_ids))
+
+
+@pytest.mark.parametrize('name', MESHES)
+def test_parallel_matches_serial(name, tmp_path):
+    vertices, faces = load_mesh(name)
+    for epsilon in epsilons(vertices):
+        for method in METHODS:
+            expected_vertices, expected_faces = cluster_arrays(vertices, faces, epsilon, method,
+                                                               str(tmp_path / 'serial.off'))
+            result_vertices, result_faces = cluster_arrays_parallel(vertices, faces, epsilon, method,
+                                                                    str(tmp_path / 'parallel.off'), 2)
+            assert np.array_equal(result_vertices, expected_vertices)
+            assert np.array_equal(result_faces, expected_faces)
+
+
+@pytest.mark.parametrize('name', MESHES)
+def test_session_matches_cluster_arrays(name, tmp_path):
+    vertices, faces = load_mesh(name)
+    session = ClusteringSession(vertices, faces)
+    for _ in range(2):  # the second round is served from the caches
+        for epsilon in epsilons(vertices):
+            for method in METHODS:
+                expected_vertices, expected_faces = cluster_arrays(vertices, faces, epsilon, method,
+                                                                   str(tmp_path / 'expected.off'))
+                result_vertices, result_faces = session.cluster(epsilon, method)
+                assert np.array_equal(result_vertices, expected_vertices)
+                assert np.array_equal(result_faces, expected_faces)
+
+
+def test_session_shares_input_arrays_read_only():
+    vertices, faces = load_mesh(MESHES[0])
+    session = ClusteringSession(vertices, faces)
+    assert np.shares_memory(session.vertices, vertices) and np.shares_memory(session.faces, faces)
+    assert not session.vertices.flags.writeable and not session.faces.flags.writeable
+    assert vertices.flags.writeable and faces.flags.writeable
+
+
+@pytest.mark.parametrize('name', MESHES)
+@pytest.mark.parametrize('method', METHODS)
+def test_lod_levels_match_cluster_arrays(name, method, tmp_path):
+    vertices, faces = load_mesh(name)
+    epsilon = epsilons(vertices)[0] / 3
+    for level_epsilon, result_vertices, result_faces in lod_levels(vertices, faces, epsilon, 3, method):
+        expected_vertices, expected_faces = cluster_arrays(vertices, faces, level_epsilon, method,
+                                                           str(tmp_path / 'expected.off'))
+        assert np.array_equal(result_faces, expected_faces)
+        # levels merge statistics of children clusters, so only summation order differs
+        tolerance = 1e-6 if method is quadric_errors_representatives else 1e-12
+        assert np.allclose(result_vertices, expected_vertices, rtol=0, atol=tolerance * level_epsilon)
+
+
+@pytest.mark.parametrize('name', MESHES)
+@pytest.mark.parametrize('function, method', [('center', dummy_representatives), ('mean', mean_representatives),
+                                              ('quadric', quadric_errors_representatives)])
+def test_streaming_matches_cluster_arrays(name, function, method, tmp_path):
+    vertices, faces = load_mesh(name)
+    for epsilon in epsilons(vertices):
+        cluster_arrays(vertices, faces, epsilon, method, str(tmp_path / 'expected.off'))
+        cluster_mesh_streaming(os.path.join(DATA_DIRECTORY, name), epsilon, function, str(tmp_path / 'result.off'),
+                               lines_per_chunk=100)
+        expected_vertices, expected_faces = OffLoader(str(tmp_path / 'expected.off')).to_arrays()
+        result_vertices, result_faces = OffLoader(str(tmp_path / 'result.off')).to_arrays()
+        assert np.array_equal(result_faces, expected_faces)
+        # accumulators are summed chunk by chunk (quadrics' solutions are sensitive to the summation order)
+        tolerance = 1e-3 * epsilon if function == 'quadric' else 1e-9
+        assert np.allclose(result_vertices, expected_vertices, rtol=0, atol=tolerance)
+
+
+def test_streaming_rejects_faces_before_vertices(tmp_path):
+    mesh_filename = str(tmp_path / 'faces_first.obj')
+    with open(mesh_filename, 'w') as f:
+        f.write('f 1 2 3\nv 0 0 0\nv 1 0 0\nv 0 1 0\n')
+    with pytest.raises(ValueError):
+        cluster_mesh_streaming(mesh_filename, 0.1, 'mean', str(tmp_path / 'result.off'), lines_per_chunk=1)
@@ -0,0 +1,60 @@
+# coding: utf-8
+import glob
+import os
+
+import pytest
+
+from bucket import assign_clusters
+from clustering import rebuild_faces
+from epsilon_search import EpsilonSearch, VERTICES, FACES
+from mesh_loader import OffLoader
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+MESHES = sorted(os.path.basename(filename) for filename in glob.glob(os.path.join(DATA_DIRECTORY, '*.off')))
+EPSILON_FRACTIONS = [0.0071, 0.0213, 0.0731, 0.2467]
+
+
+def load_mesh(name):
+    return OffLoader(os.path.join(DATA_DIRECTORY, name)).to_arrays()
+
+
+def epsilons(vertices):
+    extent = float((vertices.max(axis=0) - vertices.min(axis=0)).max())
+    return [fraction * extent for fraction in EPSILON_FRACTIONS]
+
+
+@pytest.mark.parametrize('name', MESHES)
+def test_amounts_match_clustering(name):
+    vertices, faces = load_mesh(name)
+    search = EpsilonSearch(vertices, faces)
+    for epsilon in epsilons(vertices):
+        cells, cluster_ids = assign_clusters(vertices, epsilon)
+        assert search.amount(epsilon, VERTICES) == len(cells)
+        assert search.amount(epsilon, FACES) == len(rebuild_faces(faces, cluster_ids))
+
+
+@pytest.mark.parametrize('name', MESHES)
+@pytest.mark.parametrize('target_kind', [VERTICES, FACES])
+def test_found_epsilon_gives_at_most_target(name, target_kind):
+    vertices, faces = load_mesh(name)
+    search = EpsilonSearch(vertices, faces)
+    for target in [1, 10, len(vertices) // 3]:
+        for max_probes in [2, 5, 64]:
+            try:
+                epsilon = search.find_epsilon(target, target_kind, max_probes=max_probes)
+            except ValueError:  # not found in max_probes probes
+                assert max_probes < 64
+                continue
+            assert search.amount(epsilon, target_kind) <= target
+
+
+@pytest.mark.parametrize('name', MESHES)
+def test_unreachable_target_is_rejected(name):
+    vertices, faces = load_mesh(name)
+    search = EpsilonSearch(vertices, faces)
+    with pytest.raises(ValueError):
+        search.find_epsilon(len(vertices) + 1)
+    with pytest.raises(ValueError):
+        search.find_epsilon(len(faces) + 1, FACES)
@@ -0,0 +1,68 @@
+# coding: utf-8
+import numpy as np
+import pytest
+
+from mesh_loader import ObjLoader
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+VERTICES = [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (1.0, 1.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0), (1.0, 0.0, 1.0)]
+
+
+def write_obj(path, vertices_lines, faces_lines):
+    with open(str(path), 'w') as f:
+        f.write('# test mesh\n')
+        for line in vertices_lines:
+            f.write('v %s\n' % line)
+        for line in faces_lines:
+            f.write('f %s\n' % line)
+    return ObjLoader(str(path))
+
+
+def vertices_lines():
+    return ['%r %r %r' % vertex for vertex in VERTICES]
+
+
+def loaded_chunks(loader, lines_per_chunk):
+    chunks = {'vertices': [np.zeros((0, 3))], 'faces': [np.zeros((0, 3), dtype=np.int64)]}
+    for kind, chunk in loader.iter_arrays(lines_per_chunk):
+        chunks[kind].append(chunk)
+    return np.concatenate(chunks['vertices']), np.concatenate(chunks['faces'])
+
+
+@pytest.mark.parametrize('lines_per_chunk', [1, 3, 100])
+def test_polygons_are_split_into_triangles(tmp_path, lines_per_chunk):
+    loader = write_obj(tmp_path / 'mesh.obj', vertices_lines(), ['1 2 3 4', '2/1 6/2 5/3', '1//1 2//2 6//3 5//4 4//5'])
+    expected_faces = [[0, 1, 2], [0, 2, 3], [1, 5, 4], [0, 1, 5], [0, 5, 4], [0, 4, 3]]
+    vertices, faces = loader.to_arrays()
+    assert np.array_equal(vertices, VERTICES)
+    assert np.array_equal(faces, expected_faces)
+    vertices, faces = loaded_chunks(loader, lines_per_chunk)
+    assert np.array_equal(vertices, VERTICES)
+    assert np.array_equal(faces, expected_faces)
+
+
+def test_three_quads_are_not_read_as_four_triangles(tmp_path):
+    loader = write_obj(tmp_path / 'mesh.obj', vertices_lines(), ['1 2 3 4', '1 2 6 5', '4 3 2 1'])
+    assert len(loader.to_arrays()[1]) == 6
+
+
+def test_extra_vertex_components_are_ignored(tmp_path):
+    loader = write_obj(tmp_path / 'mesh.obj', ['%s 1.0' % line for line in vertices_lines()], ['1 2 3'])
+    vertices, faces = loader.to_arrays()
+    assert np.array_equal(vertices, VERTICES)
+    assert np.array_equal(faces, [[0, 1, 2]])
+
+
+@pytest.mark.parametrize('vertices, faces', [
+    (['0.0 0.0'], ['1 2 3']),  # vertex without z
+    (['0.0 x 0.0'], ['1 2 3']),  # malformed number
+    (vertices_lines(), ['1 2']),  # face of two vertices
+    (vertices_lines(), ['1 2 3', '1 two 3'])  # malformed index
+])
+def test_malformed_lines_are_rejected(tmp_path, vertices, faces):
+    loader = write_obj(tmp_path / 'mesh.obj', vertices, faces)
+    with pytest.raises(ValueError):
+        loader.to_arrays()
+    with pytest.raises(ValueError):
+        loaded_chunks(loader, 2)
@@ -0,0 +1,24 @@
+# coding: utf-8
+import numpy as np
+import pytest
+
+from representative_functions import cluster_segments, segments_means
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_segments_means_match_np_average(seed):
+    rng = np.random.RandomState(seed)
+    counts = rng.choice([1, 3, 7, 8, 9, 15, 16, 17, 127, 128, 129, 255, 256, 300, 1000], size=30)
+    cluster_ids = rng.permutation(np.repeat(np.arange(len(counts)), counts))
+    vertices = rng.standard_normal((len(cluster_ids), 3)) * 10 ** rng.uniform(-3, 3, size=(len(cluster_ids), 1))
+
+    means = segments_means(vertices, *cluster_segments(cluster_ids, len(counts)))
+
+    for cluster in range(len(counts)):
+        members = vertices[cluster_ids == cluster]
+        expected = [np.average(members[:, i]) for i in range(3)]
+        # summation order differs, so the error is bounded by the sum of absolute values
+        tolerance = 1e-12 * np.abs(members).sum(axis=0) / len(members)
+        assert np.all(np.abs(means[cluster] - expected) <= tolerance)
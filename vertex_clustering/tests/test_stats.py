@@ -0,0 +1,43 @@
+# coding: utf-8
+import pstats
+
+import numpy as np
+import pytest
+
+from stats import ClusteringStats
+
+__author__ = "Michał Ciołczyk, Michał Janczykowski"
+
+
+def _allocate(megabytes):
+    return np.ones(megabytes << 17).sum()
+
+
+def test_stages_report_their_own_peak_memory():
+    pytest.importorskip('tracemalloc')
+    stats = ClusteringStats(trace_memory=True)
+    with stats.stage('outer'):
+        with stats.stage('large'):
+            _allocate(64)
+        with stats.stage('small'):
+            _allocate(1)
+    with stats.stage('later'):
+        _allocate(1)
+
+    peaks = dict((name, stage['peak_memory']) for name, stage in stats.stages.items())
+    assert peaks['large'] >= 64 << 20
+    assert peaks['outer'] >= peaks['large']
+    assert peaks['small'] < 8 << 20
+    assert peaks['later'] < 8 << 20
+
+
+def test_profiles_accumulate_all_calls_of_stage(tmp_path):
+    stats = ClusteringStats(['summing'], str(tmp_path))
+    for _ in range(3):
+        with stats.stage('summing'):
+            _allocate(1)
+    profiles = stats.dump_profiles()
+
+    calls = pstats.Stats(profiles['summing']).stats
+    assert max(primitive_calls for primitive_calls, _, _, _, _ in calls.values()) == 3
+    assert stats.stages['summing']['calls'] == 3